@@ -1,11 +1,40 @@
 import os
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, g, has_app_context, has_request_context, Response, stream_with_context, make_response, url_for
+from markupsafe import Markup
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import sqlite3
 import json
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 import hashlib
+import hmac
 import secrets
+import threading
+import queue
+import atexit
+import base64
+import csv
+import io
+import zlib
+import gzip
+import mimetypes
+import posixpath
+import re
+import string
+import functools
+import itertools
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+try:
+    import brotli
+except ImportError:  # optional: only used to pre-compress the frontend
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # optional: zstd Content-Encoding for API responses
+    zstandard = None
 
 app = Flask(__name__)
 # Allow CORS from all origins in development (more permissive than production)
@@ -15,6 +44,12 @@ CORS(app,
     allow_headers=['Content-Type', 'Authorization', 'X-Requested-With', 'Access-Control-Allow-Origin'],
     methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
 app.secret_key = os.environ.get('SECRET_KEY', 'school-admin-portal-secret-key-change-in-production')
+# Railway terminates TLS at its proxy; trust X-Forwarded-Proto/Host from that
+# many proxies so absolute URLs (the receipt stylesheet) come out as https.
+# Set TRUSTED_PROXIES=0 when clients reach the app directly.
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 1))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=TRUSTED_PROXIES, x_host=TRUSTED_PROXIES)
 
 # Use DATABASE_URL from environment (for Railway), fallback to local
 # Get the database path, resolving relative paths correctly
@@ -25,12 +60,379 @@ if not os.path.isabs(_raw_db_path) and not _raw_db_path.startswith("sqlite"):
 else:
     DB_PATH = _raw_db_path
 
+# Connection pool tuning (override via environment, e.g. in Railway dashboard)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+DB_CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 16384))
+DB_MMAP_SIZE_MB = int(os.environ.get('DB_MMAP_SIZE_MB', 128))
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool"""
+
+    pool = None
+    lease = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    # every statement is counted and timed for /metrics (see record_query)
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_query(sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        # count rows as sqlite3 pulls them; list() would hold a whole
+        # generator-fed insert in memory just to take its length
+        first, rows = (), 0
+
+        def counted():
+            nonlocal first, rows
+            for parameters in seq_of_parameters:
+                if not rows:
+                    first = parameters
+                rows += 1
+                yield parameters
+
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, counted())
+        finally:
+            record_query(sql, first, time.perf_counter() - started, rows=rows)
+
+
+class ConnectionPool:
+    """Keeps up to `size` idle SQLite connections for reuse across requests.
+
+    Connections are handed out LIFO so a gunicorn worker thread keeps getting
+    the same warm connection (and page cache) back. When the pool is empty a
+    new connection is opened; when it is full a released connection is
+    closed for real. A size of 0 disables pooling.
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=max(size, 1))
+        self._lock = threading.Lock()
+        self._next_lease = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=False, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row
+        # WAL lets dashboard reads run while fee entry is writing
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE_MB * 1024 * 1024}")
+        conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        with self._lock:
+            self._next_lease += 1
+            conn.lease = self._next_lease
+        return conn
+
+    def release(self, conn, lease=None):
+        # lease guards against releasing a connection twice, or releasing one
+        # that has since been handed to another request
+        with self._lock:
+            if conn.lease is None or (lease is not None and conn.lease != lease):
+                return
+            conn.lease = None
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+            if self.size > 0:
+                self._idle.put_nowait(conn)
+                return
+        except (queue.Full, sqlite3.Error):
+            pass
+        sqlite3.Connection.close(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            sqlite3.Connection.close(conn)
+
+
+_pool = ConnectionPool(DB_PATH, DB_POOL_SIZE)
+atexit.register(_pool.close_all)
+
+
 def get_db():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+    conn = _pool.acquire()
+    if has_app_context():
+        # remembered so the connection is returned even if the handler
+        # bails out before calling conn.close()
+        g.setdefault('_db_leases', []).append((conn, conn.lease))
     return conn
 
 
+@app.teardown_appcontext
+def release_db(exc):
+    for conn, lease in g.pop('_db_leases', []):
+        _pool.release(conn, lease)
+
+
+# ===========================
+# STREAMING LIST RESPONSES
+# ===========================
+# Large list endpoints can stream their rows instead of building the whole
+# list in memory.  Opt in with `Accept: application/x-ndjson` (one JSON
+# object per line) or `?stream=1` (a regular JSON array, sent row by row).
+
+STREAM_BATCH_SIZE = 500
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def _stream_format():
+    """Return 'ndjson', 'json' or None depending on what the client asked for"""
+    if request.accept_mimetypes.best == NDJSON_MIMETYPE or request.args.get('format') == 'ndjson':
+        return 'ndjson'
+    if request.args.get('stream') in ('1', 'true', 'yes'):
+        return 'json'
+    return None
+
+
+def stream_rows(query, params, fmt, transform=None):
+    """Stream the result of `query` as NDJSON or a JSON array.
+
+    Rows are pulled with fetchmany() so memory stays flat however large the
+    table is; the connection is held only while the response is being sent.
+    """
+    def generate():
+        conn = get_db()
+        try:
+            cursor = conn.execute(query, params)
+            first = True
+            if fmt == 'json':
+                yield '['
+            while True:
+                rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                chunk = []
+                for row in rows:
+                    item = dict(row)
+                    if transform:
+                        item = transform(item)
+                    encoded = json.dumps(item, default=str, separators=(',', ':'))
+                    if fmt == 'ndjson':
+                        chunk.append(encoded + '\n')
+                    else:
+                        chunk.append(encoded if first else ',' + encoded)
+                    first = False
+                yield ''.join(chunk)
+            if fmt == 'json':
+                yield ']'
+        finally:
+            conn.close()
+
+    mimetype = NDJSON_MIMETYPE if fmt == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+# ===========================
+# METRICS
+# ===========================
+# Per-process request/SQL instrumentation exported in Prometheus text format
+# on /metrics.  Under gunicorn each worker keeps its own numbers, so scrape
+# every worker (or run one worker) for complete totals.  With SERVER_TIMING=1
+# (or app.debug) every response also carries a Server-Timing header.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+# lets a scraper read /metrics with "Authorization: Bearer <token>"; without
+# it only a logged-in admin can
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') == '1'
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Cumulative-bucket histogram (caller holds the registry lock)"""
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = {}         # (route, method, status) -> count
+        self.latency = {}          # (route, method) -> Histogram
+        self.queries = {}          # (route, statement kind) -> count
+        self.query_latency = {}    # statement kind -> Histogram
+        self.slow_queries = 0
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, route, method, status, seconds):
+        with self._lock:
+            self.in_flight -= 1
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.setdefault((route, method), Histogram()).observe(seconds)
+
+    def query(self, route, kind, seconds, slow):
+        with self._lock:
+            self.queries[(route, kind)] = self.queries.get((route, kind), 0) + 1
+            self.query_latency.setdefault(kind, Histogram()).observe(seconds)
+            if slow:
+                self.slow_queries += 1
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+
+        def labels(**kw):
+            return ','.join(f'{k}="{_escape_label(v)}"' for k, v in kw.items())
+
+        def histogram(name, key_labels, hist):
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f'{name}_bucket{{{labels(**key_labels, le=bound)}}} {count}')
+            lines.append(f'{name}_bucket{{{labels(**key_labels, le="+Inf")}}} {hist.total}')
+            lines.append(f'{name}_sum{{{labels(**key_labels)}}} {hist.sum:.6f}')
+            lines.append(f'{name}_count{{{labels(**key_labels)}}} {hist.total}')
+
+        with self._lock:
+            lines += ['# HELP http_requests_in_flight Requests currently being handled',
+                      '# TYPE http_requests_in_flight gauge',
+                      f'http_requests_in_flight {self.in_flight}',
+                      '# HELP http_requests_total Requests by route, method and status code',
+                      '# TYPE http_requests_total counter']
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{{labels(route=route, method=method, status=status)}}} {count}')
+            lines += ['# HELP http_request_duration_seconds Time until the response is handed to the server',
+                      '# TYPE http_request_duration_seconds histogram']
+            for (route, method), hist in sorted(self.latency.items()):
+                histogram('http_request_duration_seconds', {'route': route, 'method': method}, hist)
+            lines += ['# HELP db_queries_total SQL statements by route and statement kind',
+                      '# TYPE db_queries_total counter']
+            for (route, kind), count in sorted(self.queries.items()):
+                lines.append(f'db_queries_total{{{labels(route=route, kind=kind)}}} {count}')
+            lines += ['# HELP db_query_duration_seconds Time spent in execute()/executemany()',
+                      '# TYPE db_query_duration_seconds histogram']
+            for kind, hist in sorted(self.query_latency.items()):
+                histogram('db_query_duration_seconds', {'kind': kind}, hist)
+            lines += [f'# HELP db_slow_queries_total Statements slower than {SLOW_QUERY_MS:g}ms',
+                      '# TYPE db_slow_queries_total counter',
+                      f'db_slow_queries_total {self.slow_queries}']
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+def _route_label():
+    # the URL rule, not the path, so /api/students/<int:student_id> is one series
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def _param_shape(params):
+    """Types of the bound parameters, never their values (they may be PII)"""
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{k}: {type(v).__name__}' for k, v in params.items()) + '}'
+    if isinstance(params, (list, tuple)):
+        return '(' + ', '.join(type(v).__name__ for v in params) + ')'
+    return type(params).__name__
+
+
+def record_query(sql, params, seconds, rows=None):
+    """Called by PooledConnection for every execute()/executemany()"""
+    if not METRICS_ENABLED:
+        return
+    kind = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else 'EMPTY'
+    slow = seconds * 1000 >= SLOW_QUERY_MS
+    if has_request_context():
+        route = _route_label()
+        g._sql_count = g.get('_sql_count', 0) + 1
+        g._sql_seconds = g.get('_sql_seconds', 0.0) + seconds
+    else:
+        route = 'background'
+    metrics.query(route, kind, seconds, slow)
+    if slow:
+        shape = f'{rows} rows x {_param_shape(params)}' if rows is not None else _param_shape(params)
+        app.logger.warning("slow query %.1fms on %s: %s params=%s",
+                           seconds * 1000, route, ' '.join(sql.split()), shape)
+
+
+@app.before_request
+def start_request_timer():
+    if METRICS_ENABLED:
+        g._request_started = time.perf_counter()
+        metrics.request_started()
+
+
+@app.after_request
+def record_request_metrics(response):
+    # registered before the CORS/compression hooks, so it runs after them
+    started = g.pop('_request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    metrics.request_finished(_route_label(), request.method, response.status_code, elapsed)
+    if SERVER_TIMING or app.debug:
+        sql_ms = g.get('_sql_seconds', 0.0) * 1000
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, db;dur={sql_ms:.1f};desc="{g.get("_sql_count", 0)} queries"')
+    return response
+
+
+@app.teardown_request
+def record_failed_request(exc):
+    # an unhandled exception skips after_request; count it as a 500
+    started = g.pop('_request_started', None)
+    if started is not None:
+        metrics.request_finished(_route_label(), request.method, 500, time.perf_counter() - started)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape target: METRICS_TOKEN as a bearer token, or an admin session"""
+    authorization = request.headers.get('Authorization', '').encode()
+    if not (METRICS_TOKEN and hmac.compare_digest(authorization, f'Bearer {METRICS_TOKEN}'.encode())):
+        denied = _admin_required()
+        if denied:
+            return denied
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.after_request
 def add_cors_headers(response):
     # Be explicit about CORS headers to satisfy browser preflight checks
@@ -42,6 +444,97 @@ def add_cors_headers(response):
     response.headers['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,OPTIONS'
     response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization,X-Requested-With,Access-Control-Allow-Origin'
     response.headers['Access-Control-Allow-Credentials'] = 'true'
+    response.headers['Access-Control-Expose-Headers'] = 'X-Receipt-Count,X-Missing-Payment-Ids'
+    return response
+
+
+# ===========================
+# RESPONSE COMPRESSION
+# ===========================
+# Compresses JSON/NDJSON/HTML/CSV bodies for clients that accept it.
+# Buffered bodies under COMPRESS_MIN_BYTES are sent as-is; streamed bodies
+# are compressed chunk by chunk (flushed after each chunk so NDJSON batches
+# still arrive as they are produced).  Decorate a view with @no_compress to
+# opt it out.  zstd is offered when the optional zstandard package is
+# installed.
+COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', '1') != '0'
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+COMPRESS_ZSTD_LEVEL = int(os.environ.get('COMPRESS_ZSTD_LEVEL', 3))
+COMPRESS_MIMETYPES = {'application/json', NDJSON_MIMETYPE, 'text/html', 'text/csv'}
+COMPRESS_ENCODINGS = (('zstd',) if zstandard is not None else ()) + ('gzip', 'deflate')
+
+
+def no_compress(view):
+    """Never compress this view's responses"""
+    view.no_compress = True
+    return view
+
+
+def _compressor(encoding):
+    """Return (compress(data), flush(), finish()) for a Content-Encoding"""
+    if encoding == 'zstd':
+        obj = zstandard.ZstdCompressor(level=COMPRESS_ZSTD_LEVEL).compressobj()
+        return obj.compress, lambda: obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), obj.flush
+    # gzip framing for "gzip", zlib framing for HTTP "deflate"
+    obj = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31 if encoding == 'gzip' else 15)
+    return obj.compress, lambda: obj.flush(zlib.Z_SYNC_FLUSH), obj.flush
+
+
+def _compress_stream(chunks, encoding):
+    compress, flush, finish = _compressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield compress(chunk) + flush()
+        yield finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _negotiate_encoding():
+    best, best_q = None, 0
+    for encoding in COMPRESS_ENCODINGS:
+        q = request.accept_encodings[encoding]
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+@app.after_request
+def compress_response(response):
+    if (not COMPRESS_ENABLED
+            or request.method == 'HEAD'
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES
+            or getattr(app.view_functions.get(request.endpoint), 'no_compress', False)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+        compress, _, finish = _compressor(encoding)
+        response.set_data(compress(data) + finish())
+    response.headers['Content-Encoding'] = encoding
+    # a strong validator must change with the encoding; weak ones may not
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
     return response
 
 def init_db():
@@ -170,37 +663,643 @@ def init_db():
                 conn.execute(stmt)
             except Exception:
                 pass
+    ensure_indexes(conn)
+    ensure_dashboard_aggregates(conn)
+    ensure_attendance_rollup(conn)
+    ensure_fee_ledger(conn)
+    ensure_search_index(conn)
+    ensure_change_log(conn)
+    ensure_table_versions(conn)
+    normalize_admission_dates(conn)
     conn.commit()
     conn.close()
 
+
+def normalize_admission_dates(conn):
+    """Rewrite legacy DD-MM-YYYY admission dates as YYYY-MM-DD (caller commits).
+
+    Every write path normalizes through _normalize_date, but rows stored
+    before that still carry the old format, and the fee ledger reads the
+    admission month as the first seven characters.  Once they are fixed the
+    check is a single pass over students that changes nothing.
+    """
+    legacy = []
+    for row in conn.execute(
+        "SELECT id, admission_date FROM students WHERE admission_date NOT GLOB '[0-9][0-9][0-9][0-9]-*'"
+    ):
+        value = _normalize_date(row['admission_date'])
+        if value != row['admission_date']:
+            legacy.append((value, row['id']))
+    if legacy:
+        conn.executemany("UPDATE students SET admission_date = ? WHERE id = ?", legacy)
+        # expected fees start from the admission month
+        refresh_fee_balances(conn)
+
+
+# Secondary indexes backing the hot queries below.  Keep this in sync with
+# backend/check_query_plans.py, which fails if a hot query falls back to a
+# full table scan.
+INDEXES = {
+    # bulk payment import matches settlement rows by transaction_id
+    'idx_payments_transaction': "CREATE INDEX IF NOT EXISTS idx_payments_transaction ON payments(transaction_id)",
+    # get_payments(status=...) and dashboard revenue by month
+    'idx_payments_status_date': "CREATE INDEX IF NOT EXISTS idx_payments_status_date ON payments(status, payment_date)",
+    # get_payments(student_id=...), the per-student payment history and the
+    # fee ledger's paid totals (covering: status and amount are in the index)
+    'idx_payments_student_status': "CREATE INDEX IF NOT EXISTS idx_payments_student_status "
+                                   "ON payments(student_id, payment_date, status, amount)",
+    # unfiltered payment list ordered by date
+    'idx_payments_date': "CREATE INDEX IF NOT EXISTS idx_payments_date ON payments(payment_date)",
+    # get_parent() children lookup, already in roll_no order
+    'idx_students_parent': "CREATE INDEX IF NOT EXISTS idx_students_parent ON students(parent_id, roll_no)",
+    # class/section filters on the student list, already in roll_no order
+    'idx_students_class_section': "CREATE INDEX IF NOT EXISTS idx_students_class_section ON students(class_name, section, roll_no)",
+    # recent admissions on the dashboard
+    'idx_students_admission': "CREATE INDEX IF NOT EXISTS idx_students_admission ON students(admission_date)",
+    # get_attendance(date=...) and per-month summaries over a date range
+    # (covering: the summary never reads the table itself)
+    'idx_attendance_date_status': "CREATE INDEX IF NOT EXISTS idx_attendance_date_status ON attendance(attendance_date, status, student_id)",
+    # per-student and per-class attendance summaries, covering
+    'idx_attendance_student_date_status': "CREATE INDEX IF NOT EXISTS idx_attendance_student_date_status ON attendance(student_id, attendance_date, status)",
+}
+
+# superseded by a wider index above; dropped on startup
+OBSOLETE_INDEXES = ('idx_attendance_date', 'idx_payments_student')
+
+
+def ensure_indexes(conn):
+    """Create any missing managed indexes (safe to run on every startup)"""
+    for name in OBSOLETE_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    for stmt in INDEXES.values():
+        conn.execute(stmt)
+    # refresh planner statistics for tables whose indexes changed
+    conn.execute("PRAGMA optimize")
+
+
+# ===========================
+# DASHBOARD AGGREGATES
+# ===========================
+# /api/stats/dashboard reads pre-computed totals instead of aggregating the
+# payments history on every refresh.  Triggers keep them current inside the
+# same transaction as the write that changed them, so create/update/delete
+# handlers (and any bulk path) cannot forget to update them.  If they ever
+# drift, rebuild with:  flask --app 01_app rebuild-stats
+
+DASHBOARD_COUNTERS = ('total_students', 'total_teachers', 'total_revenue', 'pending_payments')
+
+# payment rows contribute to revenue when Completed and to the pending count
+# when Pending; {row} is NEW or OLD and {sign} is + or -
+_PAYMENT_AGGREGATE_SQL = """
+        UPDATE stats_counters SET value = value {sign} {row}.amount
+         WHERE name = 'total_revenue' AND {row}.status = 'Completed';
+        INSERT INTO stats_monthly_revenue (month, total)
+             SELECT substr({row}.payment_date, 1, 7), {sign}{row}.amount WHERE {row}.status = 'Completed'
+        ON CONFLICT(month) DO UPDATE SET total = total + excluded.total;
+        UPDATE stats_counters SET value = value {sign} 1
+         WHERE name = 'pending_payments' AND {row}.status = 'Pending';"""
+
+# students per (class, status) for the dashboard charts; NULLs count as ''
+_STUDENT_GROUP_SQL = """
+        INSERT INTO stats_student_groups (class_name, status, students)
+        VALUES (COALESCE({row}.class_name, ''), COALESCE({row}.status, ''), {sign}1)
+        ON CONFLICT(class_name, status) DO UPDATE SET students = students + excluded.students;"""
+
+DASHBOARD_TRIGGERS = {
+    'trg_stats_students_insert': """CREATE TRIGGER IF NOT EXISTS trg_stats_students_insert AFTER INSERT ON students
+        BEGIN UPDATE stats_counters SET value = value + 1 WHERE name = 'total_students'; END""",
+    'trg_stats_students_delete': """CREATE TRIGGER IF NOT EXISTS trg_stats_students_delete AFTER DELETE ON students
+        BEGIN UPDATE stats_counters SET value = value - 1 WHERE name = 'total_students'; END""",
+    'trg_stats_teachers_insert': """CREATE TRIGGER IF NOT EXISTS trg_stats_teachers_insert AFTER INSERT ON teachers
+        BEGIN UPDATE stats_counters SET value = value + 1 WHERE name = 'total_teachers'; END""",
+    'trg_stats_teachers_delete': """CREATE TRIGGER IF NOT EXISTS trg_stats_teachers_delete AFTER DELETE ON teachers
+        BEGIN UPDATE stats_counters SET value = value - 1 WHERE name = 'total_teachers'; END""",
+    'trg_stats_payments_insert': f"""CREATE TRIGGER IF NOT EXISTS trg_stats_payments_insert AFTER INSERT ON payments
+        BEGIN {_PAYMENT_AGGREGATE_SQL.format(row='NEW', sign='+')}
+        END""",
+    'trg_stats_payments_delete': f"""CREATE TRIGGER IF NOT EXISTS trg_stats_payments_delete AFTER DELETE ON payments
+        BEGIN {_PAYMENT_AGGREGATE_SQL.format(row='OLD', sign='-')}
+        END""",
+    'trg_stats_payments_update': f"""CREATE TRIGGER IF NOT EXISTS trg_stats_payments_update
+        AFTER UPDATE OF amount, status, payment_date ON payments
+        BEGIN {_PAYMENT_AGGREGATE_SQL.format(row='OLD', sign='-')}
+        {_PAYMENT_AGGREGATE_SQL.format(row='NEW', sign='+')}
+        END""",
+    'trg_stats_student_groups_insert': f"""CREATE TRIGGER IF NOT EXISTS trg_stats_student_groups_insert
+        AFTER INSERT ON students
+        BEGIN {_STUDENT_GROUP_SQL.format(row='NEW', sign='+')}
+        END""",
+    'trg_stats_student_groups_delete': f"""CREATE TRIGGER IF NOT EXISTS trg_stats_student_groups_delete
+        AFTER DELETE ON students
+        BEGIN {_STUDENT_GROUP_SQL.format(row='OLD', sign='-')}
+        END""",
+    'trg_stats_student_groups_update': f"""CREATE TRIGGER IF NOT EXISTS trg_stats_student_groups_update
+        AFTER UPDATE OF class_name, status ON students
+        BEGIN {_STUDENT_GROUP_SQL.format(row='OLD', sign='-')}
+        {_STUDENT_GROUP_SQL.format(row='NEW', sign='+')}
+        END""",
+}
+
+
+def ensure_dashboard_aggregates(conn):
+    """Create the summary tables and triggers; seed them on first run"""
+    # value is untyped so counts stay integers and revenue stays REAL
+    conn.execute("CREATE TABLE IF NOT EXISTS stats_counters (name TEXT PRIMARY KEY, value)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS stats_monthly_revenue (month TEXT PRIMARY KEY, total REAL NOT NULL DEFAULT 0)"
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS stats_student_groups (
+               class_name TEXT NOT NULL,
+               status TEXT NOT NULL,
+               students INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (class_name, status)
+           ) WITHOUT ROWID"""
+    )
+    for stmt in DASHBOARD_TRIGGERS.values():
+        conn.execute(stmt)
+    seeded = conn.execute("SELECT COUNT(*) FROM stats_counters").fetchone()[0]
+    # stats_student_groups came later than the counters; seed it on its own
+    # for databases created before it
+    grouped = conn.execute("SELECT 1 FROM stats_student_groups LIMIT 1").fetchone()
+    if seeded < len(DASHBOARD_COUNTERS) or (
+            grouped is None and conn.execute("SELECT 1 FROM students LIMIT 1").fetchone() is not None):
+        rebuild_dashboard_aggregates(conn)
+
+
+def rebuild_dashboard_aggregates(conn):
+    """Recompute every dashboard aggregate from the base tables (caller commits)"""
+    conn.execute("DELETE FROM stats_counters")
+    conn.execute("DELETE FROM stats_monthly_revenue")
+    conn.execute("DELETE FROM stats_student_groups")
+    conn.execute(
+        """INSERT INTO stats_counters (name, value)
+           SELECT 'total_students', COUNT(*) FROM students
+           UNION ALL SELECT 'total_teachers', COUNT(*) FROM teachers
+           UNION ALL SELECT 'total_revenue', COALESCE(SUM(amount), 0) FROM payments WHERE status = 'Completed'
+           UNION ALL SELECT 'pending_payments', COUNT(*) FROM payments WHERE status = 'Pending'"""
+    )
+    conn.execute(
+        """INSERT INTO stats_monthly_revenue (month, total)
+           SELECT substr(payment_date, 1, 7), SUM(amount) FROM payments
+            WHERE status = 'Completed' GROUP BY substr(payment_date, 1, 7)"""
+    )
+    conn.execute(
+        """INSERT INTO stats_student_groups (class_name, status, students)
+           SELECT COALESCE(class_name, ''), COALESCE(status, ''), COUNT(*) FROM students
+            GROUP BY COALESCE(class_name, ''), COALESCE(status, '')"""
+    )
+
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute dashboard aggregates, the attendance rollup, fee balances and the search index (recovery from drift)"""
+    conn = get_db()
+    with conn:
+        rebuild_dashboard_aggregates(conn)
+        rebuild_attendance_rollup(conn)
+        refresh_fee_balances(conn)
+        rebuild_search_index(conn)
+    conn.close()
+    print("✅ Dashboard aggregates rebuilt")
+
+# ===========================
+# ATTENDANCE ROLLUP
+# ===========================
+# Per-student monthly present/absent/leave counts, kept current by triggers
+# like the dashboard aggregates.  /api/attendance/summary reads whole months
+# from here and only touches raw attendance rows for partial months at the
+# edges of the requested range, so multi-year summaries stay cheap.
+
+# {row} is NEW or OLD; {sign} is + or -
+_ATTENDANCE_ROLLUP_SQL = """
+        INSERT INTO attendance_monthly (student_id, month, present, absent, leave)
+        VALUES ({row}.student_id, substr({row}.attendance_date, 1, 7),
+                {sign}({row}.status = 'Present'), {sign}({row}.status = 'Absent'), {sign}({row}.status = 'Leave'))
+        ON CONFLICT (student_id, month) DO UPDATE SET
+            present = present + excluded.present,
+            absent = absent + excluded.absent,
+            leave = leave + excluded.leave;"""
+
+ATTENDANCE_ROLLUP_TRIGGERS = {
+    'trg_rollup_attendance_insert': f"""CREATE TRIGGER IF NOT EXISTS trg_rollup_attendance_insert
+        AFTER INSERT ON attendance
+        BEGIN {_ATTENDANCE_ROLLUP_SQL.format(row='NEW', sign='+')}
+        END""",
+    'trg_rollup_attendance_delete': f"""CREATE TRIGGER IF NOT EXISTS trg_rollup_attendance_delete
+        AFTER DELETE ON attendance
+        BEGIN {_ATTENDANCE_ROLLUP_SQL.format(row='OLD', sign='-')}
+        END""",
+    'trg_rollup_attendance_update': f"""CREATE TRIGGER IF NOT EXISTS trg_rollup_attendance_update
+        AFTER UPDATE OF student_id, attendance_date, status ON attendance
+        BEGIN {_ATTENDANCE_ROLLUP_SQL.format(row='OLD', sign='-')}
+        {_ATTENDANCE_ROLLUP_SQL.format(row='NEW', sign='+')}
+        END""",
+}
+
+
+def ensure_attendance_rollup(conn):
+    """Create attendance_monthly and its triggers; seed it on first run"""
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS attendance_monthly (
+               student_id INTEGER NOT NULL,
+               month TEXT NOT NULL,
+               present INTEGER NOT NULL DEFAULT 0,
+               absent INTEGER NOT NULL DEFAULT 0,
+               leave INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (student_id, month)
+           ) WITHOUT ROWID"""
+    )
+    for stmt in ATTENDANCE_ROLLUP_TRIGGERS.values():
+        conn.execute(stmt)
+    if (conn.execute("SELECT 1 FROM attendance_monthly LIMIT 1").fetchone() is None
+            and conn.execute("SELECT 1 FROM attendance LIMIT 1").fetchone() is not None):
+        rebuild_attendance_rollup(conn)
+
+
+def rebuild_attendance_rollup(conn):
+    """Recompute attendance_monthly from the attendance table (caller commits)"""
+    conn.execute("DELETE FROM attendance_monthly")
+    conn.execute(
+        """INSERT INTO attendance_monthly (student_id, month, present, absent, leave)
+           SELECT student_id, substr(attendance_date, 1, 7),
+                  SUM(status = 'Present'), SUM(status = 'Absent'), SUM(status = 'Leave')
+             FROM attendance GROUP BY student_id, substr(attendance_date, 1, 7)"""
+    )
+
+# ===========================
+# CONDITIONAL GET (ETag / Last-Modified)
+# ===========================
+# Every write to a versioned table bumps its row in table_versions (via
+# triggers, so no handler can forget).  GET endpoints decorated with
+# @conditional(...) derive an ETag from the versions of the tables they read
+# and answer a matching If-None-Match with 304 before touching any rows.
+
+VERSIONED_TABLES = ('students', 'parents', 'teachers', 'attendance', 'payments')
+
+
+def ensure_table_versions(conn):
+    """Create table_versions and the triggers that bump it"""
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS table_versions (
+               name TEXT PRIMARY KEY,
+               version INTEGER NOT NULL DEFAULT 0,
+               modified INTEGER NOT NULL DEFAULT 0
+           )"""
+    )
+    for table in VERSIONED_TABLES:
+        conn.execute(
+            "INSERT OR IGNORE INTO table_versions (name, version, modified) "
+            "VALUES (?, 1, CAST(strftime('%s', 'now') AS INTEGER))",
+            (table,)
+        )
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(
+                f"""CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{event.lower()} AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE table_versions SET version = version + 1,
+                               modified = CAST(strftime('%s', 'now') AS INTEGER)
+                         WHERE name = '{table}';
+                    END"""
+            )
+
+
+def _table_versions(conn, tables):
+    marks = ','.join('?' * len(tables))
+    return conn.execute(
+        f"SELECT name, version, modified FROM table_versions WHERE name IN ({marks}) ORDER BY name",
+        tables
+    ).fetchall()
+
+
+def conditional(*tables):
+    """Add ETag/Last-Modified to a GET view and short-circuit to 304 when unchanged"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            conn = get_db()
+            versions = _table_versions(conn, tables)
+            conn.close()
+            # the same tables answer many different queries, so the URL and
+            # the negotiated format are part of the tag
+            key = '|'.join([request.full_path, request.headers.get('Accept', '')] +
+                           [f"{row['name']}:{row['version']}" for row in versions])
+            etag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+            modified = max((row['modified'] for row in versions), default=0)
+            # cached_entity() keys on these, so the body matches the tag
+            g.table_versions = tuple((row['name'], row['version']) for row in versions)
+            last_modified = datetime.fromtimestamp(modified, timezone.utc)
+
+            if request.if_none_match:
+                fresh = request.if_none_match.contains_weak(etag)
+            else:
+                # modified has one-second resolution: a write in the same
+                # second as the client's copy must not look unchanged
+                since = request.if_modified_since
+                fresh = since is not None and modified < since.timestamp()
+            if fresh:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            # cache, but always revalidate: the data changes at arbitrary times
+            response.cache_control.no_cache = True
+            response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
+
+
+# ===========================
+# ENTITY CACHE
+# ===========================
+# Read-through cache for the single-record GET endpoints (student, teacher,
+# parent with children, payment with student).  Entries are the encoded JSON
+# body; each carries tags such as ('student', 7) so a write to student 7 also
+# drops the parent and payment entries that embed that student.
+#
+# Invalidation alone can't keep entries fresh: another gunicorn worker's
+# write never reaches this process's cache, and a read can land between a
+# write's commit and its invalidate().  The views are @conditional, so
+# their ETag comes from table_versions read before the body; a stale body
+# served under the new tag would then be revalidated with 304s until the
+# next write.  So cached_entity() puts those versions in the key: any write
+# to a table the view reads moves every such view to a fresh key.  The TTL
+# only bounds how long superseded entries take up space.
+# Set ENTITY_CACHE_SIZE=0 to disable.
+
+ENTITY_CACHE_SIZE = int(os.environ.get('ENTITY_CACHE_SIZE', 2000))
+ENTITY_CACHE_MAX_BYTES = int(os.environ.get('ENTITY_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+ENTITY_CACHE_TTL = float(os.environ.get('ENTITY_CACHE_TTL', 60))
+
+
+class EntityCache:
+    """Bounded LRU + TTL cache of JSON bodies keyed by (kind, id)"""
+
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (body, expires, tags)
+        self._tagged = {}              # tag -> set of keys carrying it
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, body, tags=()):
+        if not self.enabled or len(body) > self.max_bytes:
+            return
+        tags = {key, *tags}
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (body, time.monotonic() + self.ttl, tags)
+            self._bytes += len(body)
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """Drop every entry keyed or tagged with one of `tags`, e.g. ('student', 7)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tagged.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def invalidate_kind(self, kind):
+        """Drop every entry of one kind (used after bulk writes)"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == kind]:
+                self._drop(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+            self._bytes = 0
+
+    def _drop(self, key):
+        body, _, tags = self._entries.pop(key)
+        self._bytes -= len(body)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+entity_cache = EntityCache(ENTITY_CACHE_SIZE, ENTITY_CACHE_MAX_BYTES, ENTITY_CACHE_TTL)
+
+
+def cached_entity(key, load):
+    """Serve `key` from entity_cache, calling load() -> (obj, tags) on a miss.
+
+    Returns None when load() finds nothing, so the caller can 404.  Under
+    @conditional the table versions behind the ETag are part of the entry's
+    key; `key` itself stays a tag, so invalidate(key) still drops it.
+    """
+    versioned = (*key, g.get('table_versions'))
+    body = entity_cache.get(versioned)
+    if body is None:
+        obj, tags = load()
+        if obj is None:
+            return None
+        body = app.json.dumps(obj)
+        entity_cache.set(versioned, body, (key, *tags))
+    return Response(body, mimetype='application/json')
+
+
+@app.route('/api/admin/cache', methods=['GET', 'DELETE'])
+def entity_cache_admin():
+    """GET: hit/miss/eviction counters.  DELETE: empty the cache.  Admins only."""
+    denied = _admin_required()
+    if denied:
+        return denied
+    if request.method == 'DELETE':
+        entity_cache.clear()
+        receipt_cache.clear()
+    return jsonify(entity_cache.stats())
+
+
 # ===========================
 # AUTHENTICATION HELPERS
 # ===========================
 
+# PBKDF2 is deliberately slow, so it runs on a small dedicated thread pool:
+# at most PASSWORD_HASH_WORKERS hashes run at once, up to PASSWORD_HASH_QUEUE
+# more may wait, and anything beyond that (or waiting longer than
+# PASSWORD_HASH_TIMEOUT seconds) is refused with 503 instead of tying up
+# every worker when all the staff log in at once.
+PASSWORD_ITERATIONS = int(os.environ.get('PASSWORD_ITERATIONS', 100000))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+# hashes created before the iteration count was stored ("salt$hash")
+LEGACY_PASSWORD_ITERATIONS = 100000
+PASSWORD_HASH_SCHEME = 'pbkdf2_sha256'
+
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='pbkdf2')
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+class PasswordHasherBusy(Exception):
+    """The password hashing pool is saturated; the client should retry"""
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations).hex()
+
+
+def _run_password_job(fn, *args):
+    if not _password_slots.acquire(timeout=PASSWORD_HASH_TIMEOUT):
+        raise PasswordHasherBusy()
+    try:
+        future = _password_executor.submit(fn, *args)
+    except Exception:
+        _password_slots.release()
+        raise
+    future.add_done_callback(lambda f: _password_slots.release())
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FuturesTimeoutError:
+        future.cancel()
+        raise PasswordHasherBusy()
+
+
+def _parse_password_hash(password_hash):
+    """Return (iterations, salt, hex digest); raises ValueError if malformed"""
+    parts = password_hash.split('$')
+    if len(parts) == 4 and parts[0] == PASSWORD_HASH_SCHEME:
+        return int(parts[1]), parts[2], parts[3]
+    if len(parts) == 2:
+        return LEGACY_PASSWORD_ITERATIONS, parts[0], parts[1]
+    raise ValueError('Unrecognised password hash')
+
+
 def hash_password(password):
-    """Hash password using SHA256 with salt"""
+    """Hash password using PBKDF2-SHA256 with a random salt.
+
+    Stored as pbkdf2_sha256$<iterations>$<salt>$<hash> so the cost can be
+    raised later without invalidating existing passwords.
+    """
     salt = secrets.token_hex(32)
-    pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000)
-    return f"{salt}${pwd_hash.hex()}"
+    digest = _run_password_job(_pbkdf2, password, salt, PASSWORD_ITERATIONS)
+    return f"{PASSWORD_HASH_SCHEME}${PASSWORD_ITERATIONS}${salt}${digest}"
 
 def verify_password(password, password_hash):
-    """Verify password against hash"""
+    """Verify password against hash (raises PasswordHasherBusy when saturated)"""
+    try:
+        iterations, salt, expected = _parse_password_hash(password_hash)
+    except (ValueError, AttributeError):
+        return False
+    digest = _run_password_job(_pbkdf2, password, salt, iterations)
+    return hmac.compare_digest(digest, expected)
+
+def password_needs_rehash(password_hash):
+    """True for legacy hashes or ones made with a different iteration count"""
     try:
-        salt, pwd_hash = password_hash.split('$')
-        new_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000)
-        return new_hash.hex() == pwd_hash
-    except:
+        iterations, _, _ = _parse_password_hash(password_hash)
+    except ValueError:
         return False
+    return not password_hash.startswith(PASSWORD_HASH_SCHEME + '$') or iterations != PASSWORD_ITERATIONS
+
+def _hasher_busy_response():
+    response = jsonify({'error': 'Server is busy verifying other logins, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+# How long a profile cached in the session is trusted before it is re-read
+# from the users table.  This bounds how long a deactivated or edited user
+# keeps their old session view.
+AUTH_RECHECK_SECONDS = int(os.environ.get('AUTH_RECHECK_SECONDS', 60))
+
+# profile fields kept in the (signed) session cookie; never the password hash
+SESSION_USER_FIELDS = ('id', 'username', 'email', 'full_name', 'role', 'is_active', 'created_at', 'updated_at')
+
+
+def _cache_user_in_session(user):
+    session['user'] = {f: user[f] for f in SESSION_USER_FIELDS}
+    session['user_checked_at'] = time.time()
+
 
 def get_current_user():
-    """Get the current authenticated user from session"""
+    """Get the current authenticated user from session.
+
+    The profile is cached in the signed session at login and re-validated
+    against the database at most every AUTH_RECHECK_SECONDS, so routine
+    auth checks do no database work.
+    """
     user_id = session.get('user_id')
     if not user_id:
         return None
+    cached = session.get('user')
+    checked_at = session.get('user_checked_at', 0)
+    if cached and cached.get('id') == user_id and time.time() - checked_at < AUTH_RECHECK_SECONDS:
+        return dict(cached)
     conn = get_db()
     user = conn.execute("SELECT * FROM users WHERE id = ? AND is_active = 1", (user_id,)).fetchone()
     conn.close()
-    return dict(user) if user else None
+    if not user:
+        # deactivated or deleted since login
+        session.clear()
+        return None
+    _cache_user_in_session(user)
+    return dict(user)
+
+
+def _admin_required():
+    """401/403 error response unless the session belongs to an admin, else None"""
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Not authenticated'}), 401
+    if user.get('role') != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    return None
 
 # ===========================
 # AUTHENTICATION ENDPOINTS
@@ -246,6 +1345,8 @@ def register():
             'message': 'User registered successfully',
             'user_id': user_id
         }), 201
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -269,12 +1370,21 @@ def login():
         
         if not user or not verify_password(password, user['password_hash']):
             return jsonify({'error': 'Invalid username/email or password'}), 401
+
+        # transparently upgrade legacy hashes / old iteration counts
+        if password_needs_rehash(user['password_hash']):
+            conn = get_db()
+            conn.execute("UPDATE users SET password_hash = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                         (hash_password(password), user['id']))
+            conn.commit()
+            conn.close()
         
         # Create session
         session['user_id'] = user['id']
         session['username'] = user['username']
         session['full_name'] = user['full_name']
         session['role'] = user['role']
+        _cache_user_in_session(user)
         
         return jsonify({
             'success': True,
@@ -287,6 +1397,8 @@ def login():
                 'role': user['role']
             }
         }), 200
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -330,8 +1442,6 @@ def verify_auth():
 # STUDENTS ENDPOINTS
 # ===========================
 
-@app.route('/api/students', methods=['POST'])
-
 # helper to convert a user-supplied date into ISO (YYYY-MM-DD).  Accepts
 # either the correct ISO form or common `DD-MM-YYYY` used in India, as well
 # as a value that's already None/empty.
@@ -354,6 +1464,14 @@ def _normalize_date(val):
     # otherwise leave as‑is (might already be yyyy-mm-dd)
     return val
 
+
+def _is_iso_date(val):
+    """True for a real calendar date written exactly as YYYY-MM-DD"""
+    try:
+        return datetime.strptime(val, '%Y-%m-%d').strftime('%Y-%m-%d') == val
+    except (TypeError, ValueError):
+        return False
+
 @app.route('/api/students', methods=['POST'])
 def create_student():
     try:
@@ -372,42 +1490,149 @@ def create_student():
              data.get('address'), data.get('parent_name'), data.get('parent_phone'),
              data.get('aadhar_number'), data.get('admission_date'), data.get('father_name'),
              data.get('mother_name'), data.get('status') or 'Active'))
-        conn.commit()
         student_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        refresh_fee_balances(conn, [student_id])
+        conn.commit()
+        publish_event('student.created', id=student_id)
         row = conn.execute("SELECT * FROM students WHERE id = ?", (student_id,)).fetchone()
         conn.close()
         return jsonify(dict(row)), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+# columns a client may ask for via ?fields= on GET /api/students
+STUDENT_COLUMNS = (
+    'id', 'roll_no', 'name', 'email', 'phone', 'class_name', 'section',
+    'date_of_birth', 'address', 'parent_name', 'parent_phone', 'aadhar_number',
+    'admission_date', 'father_name', 'mother_name', 'status', 'parent_id',
+    'created_at', 'updated_at'
+)
+STUDENT_FILTERS = ('class_name', 'section', 'status')
+STUDENTS_MAX_PAGE = 500
+
+
+def _encode_cursor(roll_no):
+    return base64.urlsafe_b64encode(roll_no.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    try:
+        return base64.b64decode(cursor.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def _student_query(args):
+    """Build the SELECT for GET /api/students from the query string.
+
+    Returns (sql, params, columns, limit); limit is None for the legacy
+    unpaginated dump.
+    """
+    fields = args.get('fields')
+    if fields:
+        columns = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in columns if f not in STUDENT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        # id and roll_no are always needed to address rows and build cursors
+        for required in ('roll_no', 'id'):
+            if required not in columns:
+                columns.insert(0, required)
+        select = ', '.join(columns)
+    else:
+        columns = None
+        select = '*'
+
+    query = f"SELECT {select} FROM students WHERE 1=1"
+    params = []
+    for key in STUDENT_FILTERS:
+        value = args.get(key)
+        if value:
+            query += f" AND {key} = ?"
+            params.append(value)
+
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    if limit is None and cursor is None:
+        query += " ORDER BY roll_no"
+        return query, params, columns, None
+
+    try:
+        limit = int(limit) if limit is not None else 100
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    limit = max(1, min(limit, STUDENTS_MAX_PAGE))
+    if cursor:
+        query += " AND roll_no > ?"
+        params.append(_decode_cursor(cursor))
+    # fetch one extra row to know whether there is a next page
+    query += " ORDER BY roll_no LIMIT ?"
+    params.append(limit + 1)
+    return query, params, columns, limit
+
+
 @app.route('/api/students', methods=['GET'])
+@conditional('students')
 def get_students():
+    """List students.
+
+    Without query parameters this returns every student as a JSON array (the
+    original behaviour). Optional parameters:
+      limit, cursor  keyset pagination on roll_no; response becomes
+                     {"students": [...], "next_cursor": "..."}
+      fields         comma separated column projection, e.g. fields=name,class_name
+      class_name, section, status   exact-match filters
+      stream=1 / Accept: application/x-ndjson   stream the unpaginated list
+    """
     try:
-        conn = get_db()
-        rows = conn.execute("SELECT * FROM students ORDER BY roll_no").fetchall()
-        students = []
-        for row in rows:
-            stu = dict(row)
+        query, params, columns, limit = _student_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        normalize = columns is None or 'admission_date' in columns
+
+        def clean(stu):
             # make sure the date is returned in ISO form so the <input type=date>
             # control can render it.  normalize any old DD-MM-YYYY records.
-            stu['admission_date'] = _normalize_date(stu.get('admission_date'))
-            students.append(stu)
+            if normalize:
+                stu['admission_date'] = _normalize_date(stu.get('admission_date'))
+            return stu
+
+        fmt = _stream_format()
+        if fmt and limit is None:
+            return stream_rows(query, params, fmt, clean)
+        conn = get_db()
+        rows = conn.execute(query, params).fetchall()
         conn.close()
-        return jsonify(students)
+        students = [clean(dict(row)) for row in rows]
+        if limit is None:
+            return jsonify(students)
+        next_cursor = None
+        if len(students) > limit:
+            students = students[:limit]
+            next_cursor = _encode_cursor(students[-1]['roll_no'])
+        return jsonify({'students': students, 'next_cursor': next_cursor, 'limit': limit})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/students/<int:student_id>', methods=['GET'])
+@conditional('students')
 def get_student(student_id):
-    try:
+    def load():
         conn = get_db()
         row = conn.execute("SELECT * FROM students WHERE id = ?", (student_id,)).fetchone()
         conn.close()
         if not row:
-            return jsonify({'error': 'Student not found'}), 404
+            return None, ()
         stu = dict(row)
         stu['admission_date'] = _normalize_date(stu.get('admission_date'))
-        return jsonify(stu)
+        return stu, [('parent', stu['parent_id'])] if stu.get('parent_id') else []
+
+    try:
+        response = cached_entity(('student', student_id), load)
+        if response is None:
+            return jsonify({'error': 'Student not found'}), 404
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -431,7 +1656,12 @@ def update_student(student_id):
              data.get('date_of_birth'), data.get('address'), data.get('parent_name'),
              data.get('parent_phone'), data.get('aadhar_number'), data.get('admission_date'),
              data.get('father_name'), data.get('mother_name'), data.get('status') or 'Active', student_id))
+        # class, admission date and status all change what the student owes
+        refresh_fee_balances(conn, [student_id])
         conn.commit()
+        entity_cache.invalidate(('student', student_id))
+        receipt_cache.invalidate(('student', student_id))
+        publish_event('student.updated', id=student_id)
         row = conn.execute("SELECT * FROM students WHERE id = ?", (student_id,)).fetchone()
         conn.close()
         if not row:
@@ -449,7 +1679,10 @@ def delete_student(student_id):
     try:
         conn = get_db()
         conn.execute("DELETE FROM students WHERE id = ?", (student_id,))
+        conn.execute("DELETE FROM fee_balances WHERE student_id = ?", (student_id,))
         conn.commit()
+        entity_cache.invalidate(('student', student_id))
+        publish_event('student.deleted', id=student_id)
         conn.close()
         return jsonify({'success': True})
     except Exception as e:
@@ -463,13 +1696,158 @@ def delete_student_by_roll(roll_no):
         return jsonify({'success': True})
     try:
         conn = get_db()
+        ids = [row['id'] for row in conn.execute("SELECT id FROM students WHERE roll_no = ?", (roll_no,))]
+        conn.execute("DELETE FROM fee_balances WHERE student_id IN (SELECT id FROM students WHERE roll_no = ?)",
+                     (roll_no,))
         conn.execute("DELETE FROM students WHERE roll_no = ?", (roll_no,))
         conn.commit()
+        entity_cache.invalidate(*[('student', i) for i in ids])
+        for student_id in ids:
+            publish_event('student.deleted', id=student_id)
         conn.close()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+# ===========================
+# BULK STUDENT IMPORT
+# ===========================
+
+# columns the bulk import can set, in INSERT order
+STUDENT_IMPORT_COLUMNS = (
+    'roll_no', 'name', 'email', 'phone', 'class_name', 'section', 'date_of_birth',
+    'address', 'parent_name', 'parent_phone', 'aadhar_number', 'admission_date',
+    'father_name', 'mother_name', 'status'
+)
+# header names used by sample_students.csv and the frontend's student objects
+STUDENT_IMPORT_ALIASES = {
+    'roll': 'roll_no',
+    'class': 'class_name',
+    'dob': 'date_of_birth',
+    'aadhar': 'aadhar_number',
+}
+BULK_CHUNK_SIZE = 500
+BULK_MAX_ERRORS = 1000
+
+# Existing rows are updated in place; a blank/missing field never wipes a
+# value that is already stored.
+_STUDENT_UPSERT_SQL = """INSERT INTO students ({cols}) VALUES ({values})
+    ON CONFLICT(roll_no) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP""".format(
+    cols=', '.join(STUDENT_IMPORT_COLUMNS),
+    values=', '.join("COALESCE(:status, 'Active')" if c == 'status' else f':{c}' for c in STUDENT_IMPORT_COLUMNS),
+    updates=', '.join(f"{c} = COALESCE(:{c}, students.{c})" for c in STUDENT_IMPORT_COLUMNS if c != 'roll_no'),
+)
+
+
+def _bulk_rows(key):
+    """Rows of a bulk upload: a streamed CSV reader (text/csv body or multipart
+    `file`), or a JSON array (bare or under `key`).  None if neither."""
+    if 'file' in request.files:
+        return csv.DictReader(io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig', newline=''))
+    if request.mimetype in ('text/csv', 'application/csv', 'text/plain'):
+        return csv.DictReader(io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline=''))
+    data = request.get_json(silent=True)
+    rows = data.get(key) if isinstance(data, dict) else data
+    return rows if isinstance(rows, list) else None
+
+
+def _clean_student_row(raw):
+    """Map an import row (CSV or JSON) onto STUDENT_IMPORT_COLUMNS.
+
+    Returns the parameter dict, or raises ValueError with a message for the
+    per-row error report.
+    """
+    row = dict.fromkeys(STUDENT_IMPORT_COLUMNS)
+    for key, value in raw.items():
+        if key is None:
+            continue
+        key = key.strip().lower()
+        key = STUDENT_IMPORT_ALIASES.get(key, key)
+        if key in row:
+            if isinstance(value, str):
+                value = value.strip()
+            row[key] = value if value not in ('', None) else None
+    if not row['roll_no']:
+        raise ValueError('roll_no is required')
+    if not row['name']:
+        raise ValueError('name is required')
+    row['roll_no'] = str(row['roll_no'])
+    row['admission_date'] = _normalize_date(row['admission_date'])
+    return row
+
+
+def _import_students(conn, rows, report):
+    """Upsert an iterable of raw rows in chunks; updates `report` in place"""
+    seen = set()
+    chunk = []
+
+    def flush():
+        if not chunk:
+            return
+        marks = ','.join('?' * len(chunk))
+        existing = {r[0] for r in conn.execute(
+            f"SELECT roll_no FROM students WHERE roll_no IN ({marks})", [r['roll_no'] for r in chunk])}
+        conn.executemany(_STUDENT_UPSERT_SQL, chunk)
+        report['updated'] += len(existing)
+        report['inserted'] += len(chunk) - len(existing)
+        chunk.clear()
+
+    for number, raw in enumerate(rows, start=1):
+        report['total'] += 1
+        try:
+            if not isinstance(raw, dict):
+                raise ValueError('row must be an object')
+            row = _clean_student_row(raw)
+            if row['roll_no'] in seen:
+                raise ValueError('duplicate roll_no in this import')
+        except ValueError as e:
+            report['failed'] += 1
+            if len(report['errors']) < BULK_MAX_ERRORS:
+                report['errors'].append({'row': number, 'roll_no': raw.get('roll_no') or raw.get('roll')
+                                         if isinstance(raw, dict) else None, 'error': str(e)})
+            continue
+        seen.add(row['roll_no'])
+        chunk.append(row)
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            flush()
+    flush()
+
+
+@app.route('/api/students/bulk', methods=['POST'])
+def bulk_import_students():
+    """Create or update many students in one transaction, keyed by roll_no.
+
+    Accepts either a JSON array of student objects (API or CSV field names),
+    or a CSV file with the sample_students.csv header (roll, admission_date,
+    name, dob, aadhar, father_name, mother_name, class, section, phone,
+    status) sent as text/csv or as the `file` field of a multipart upload.
+    CSV bodies are parsed as a stream and written in chunks, so very large
+    files never have to fit in memory.  Rows that fail validation are
+    skipped and listed in `errors` (row numbers are 1-based data rows).
+    """
+    try:
+        rows = _bulk_rows('students')
+        if rows is None:
+            return jsonify({'error': 'Expected a JSON array of students or a CSV file'}), 400
+
+        report = {'total': 0, 'inserted': 0, 'updated': 0, 'failed': 0, 'errors': []}
+        conn = get_db()
+        with conn:
+            _import_students(conn, rows, report)
+            if report['inserted'] or report['updated']:
+                refresh_fee_balances(conn)
+        conn.close()
+        if report['updated']:
+            entity_cache.invalidate_kind('student')
+            entity_cache.invalidate_kind('parent')
+            entity_cache.invalidate_kind('payment')
+        if report['inserted'] or report['updated']:
+            publish_event('student.imported', inserted=report['inserted'], updated=report['updated'])
+        report['errors_truncated'] = report['failed'] > len(report['errors'])
+        return jsonify(report), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
 # ===========================
 # PARENTS ENDPOINTS (multi-child -> one-parent)
 # ===========================
@@ -493,6 +1871,7 @@ def create_parent():
 
 
 @app.route('/api/parents', methods=['GET'])
+@conditional('parents')
 def get_parents():
     try:
         conn = get_db()
@@ -505,18 +1884,26 @@ def get_parents():
 
 
 @app.route('/api/parents/<int:parent_id>', methods=['GET'])
+@conditional('parents', 'students')
 def get_parent(parent_id):
-    try:
+    def load():
         conn = get_db()
         parent = conn.execute("SELECT * FROM parents WHERE id = ?", (parent_id,)).fetchone()
         if not parent:
             conn.close()
-            return jsonify({'error': 'Parent not found'}), 404
+            return None, ()
         children = conn.execute("SELECT * FROM students WHERE parent_id = ? ORDER BY roll_no", (parent_id,)).fetchall()
         parent_obj = dict(parent)
         parent_obj['children'] = [dict(c) for c in children]
         conn.close()
-        return jsonify(parent_obj)
+        # any write to one of the children must drop this entry too
+        return parent_obj, [('student', c['id']) for c in children]
+
+    try:
+        response = cached_entity(('parent', parent_id), load)
+        if response is None:
+            return jsonify({'error': 'Parent not found'}), 404
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -531,6 +1918,7 @@ def update_parent(parent_id):
             (data.get('name'), data.get('email'), data.get('phone'), data.get('address'), data.get('relation'), parent_id)
         )
         conn.commit()
+        entity_cache.invalidate(('parent', parent_id))
         row = conn.execute("SELECT * FROM parents WHERE id = ?", (parent_id,)).fetchone()
         conn.close()
         if not row:
@@ -550,6 +1938,7 @@ def delete_parent(parent_id):
         conn.execute("UPDATE students SET parent_id = NULL WHERE parent_id = ?", (parent_id,))
         conn.execute("DELETE FROM parents WHERE id = ?", (parent_id,))
         conn.commit()
+        entity_cache.invalidate(('parent', parent_id))
         conn.close()
         return jsonify({'success': True})
     except Exception as e:
@@ -576,6 +1965,8 @@ def attach_student_to_parent(parent_id):
             return jsonify({'error': 'Student not found'}), 404
         conn.execute("UPDATE students SET parent_id = ? WHERE id = ?", (parent_id, student_id))
         conn.commit()
+        # the student tag also drops the previous parent's entry
+        entity_cache.invalidate(('student', student['id']), ('parent', parent_id))
         row = conn.execute("SELECT * FROM students WHERE id = ?", (student_id,)).fetchone()
         conn.close()
         return jsonify(dict(row))
@@ -591,6 +1982,7 @@ def detach_student_from_parent(parent_id, student_id):
         conn = get_db()
         conn.execute("UPDATE students SET parent_id = NULL WHERE id = ? AND parent_id = ?", (student_id, parent_id))
         conn.commit()
+        entity_cache.invalidate(('student', student_id), ('parent', parent_id))
         conn.close()
         return jsonify({'success': True})
     except Exception as e:
@@ -622,6 +2014,7 @@ def create_teacher():
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/teachers', methods=['GET'])
+@conditional('teachers')
 def get_teachers():
     try:
         conn = get_db()
@@ -633,14 +2026,19 @@ def get_teachers():
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/teachers/<int:teacher_id>', methods=['GET'])
+@conditional('teachers')
 def get_teacher(teacher_id):
-    try:
+    def load():
         conn = get_db()
         row = conn.execute("SELECT * FROM teachers WHERE id = ?", (teacher_id,)).fetchone()
         conn.close()
-        if not row:
+        return (dict(row) if row else None), ()
+
+    try:
+        response = cached_entity(('teacher', teacher_id), load)
+        if response is None:
             return jsonify({'error': 'Teacher not found'}), 404
-        return jsonify(dict(row))
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -658,6 +2056,7 @@ def update_teacher(teacher_id):
              teacher_id)
         )
         conn.commit()
+        entity_cache.invalidate(('teacher', teacher_id))
         conn.close()
         return jsonify(data)
     except Exception as e:
@@ -671,6 +2070,7 @@ def delete_teacher(teacher_id):
         conn = get_db()
         conn.execute("DELETE FROM teachers WHERE id = ?", (teacher_id,))
         conn.commit()
+        entity_cache.invalidate(('teacher', teacher_id))
         conn.close()
         return jsonify({'success': True})
     except Exception as e:
@@ -694,17 +2094,19 @@ def create_attendance():
         conn.commit()
         attendance_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
         conn.close()
+        publish_event('attendance.created', id=attendance_id, student_id=data.get('student_id'),
+                      date=data.get('attendance_date'))
         data['id'] = attendance_id
         return jsonify(data), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/attendance', methods=['GET'])
+@conditional('attendance', 'students')
 def get_attendance():
     try:
         date_filter = request.args.get('date')
         student_id = request.args.get('student_id')
-        conn = get_db()
         query = "SELECT a.*, s.name, s.roll_no FROM attendance a JOIN students s ON a.student_id = s.id WHERE 1=1"
         params = []
         if date_filter:
@@ -714,6 +2116,10 @@ def get_attendance():
             query += " AND a.student_id = ?"
             params.append(student_id)
         query += " ORDER BY a.attendance_date DESC, s.roll_no"
+        fmt = _stream_format()
+        if fmt:
+            return stream_rows(query, params, fmt)
+        conn = get_db()
         rows = conn.execute(query, params).fetchall()
         attendance = [dict(row) for row in rows]
         conn.close()
@@ -721,6 +2127,117 @@ def get_attendance():
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+# group_by -> (SELECT columns, GROUP BY/ORDER BY, needs the students join)
+ATTENDANCE_SUMMARY_GROUPS = {
+    'student': ("s.id AS student_id, s.roll_no, s.name, s.class_name, s.section",
+                "GROUP BY s.id HAVING total > 0 ORDER BY s.class_name, s.section, s.roll_no", True),
+    'class': ("s.class_name, s.section",
+              "GROUP BY s.class_name, s.section HAVING total > 0 ORDER BY s.class_name, s.section", True),
+    'month': ("u.month", "GROUP BY u.month HAVING total > 0 ORDER BY u.month", False),
+}
+
+# counts and percentages per group, computed in SQLite over rollup/raw parts
+_ATTENDANCE_COUNTS_SQL = """
+    SUM(u.present) AS present,
+    SUM(u.absent) AS absent,
+    SUM(u.leave) AS leave,
+    SUM(u.present + u.absent + u.leave) AS total,
+    ROUND(100.0 * SUM(u.present) / SUM(u.present + u.absent + u.leave), 1) AS present_pct,
+    ROUND(100.0 * SUM(u.absent) / SUM(u.present + u.absent + u.leave), 1) AS absent_pct,
+    ROUND(100.0 * SUM(u.leave) / SUM(u.present + u.absent + u.leave), 1) AS leave_pct
+"""
+
+_ROLLUP_PART_SQL = "SELECT student_id, month, present, absent, leave FROM attendance_monthly WHERE month BETWEEN ? AND ?"
+_RAW_PART_SQL = """SELECT student_id, substr(attendance_date, 1, 7) AS month, SUM(status = 'Present') AS present,
+       SUM(status = 'Absent') AS absent, SUM(status = 'Leave') AS leave
+  FROM attendance WHERE attendance_date BETWEEN ? AND ?"""
+
+SUMMARY_OPEN_FROM = '0001-01-01'
+SUMMARY_OPEN_TO = '9999-12-31'
+
+
+def _summary_date(name, default):
+    value = _normalize_date(request.args.get(name))
+    if not value:
+        return default
+    datetime.strptime(value, '%Y-%m-%d')  # ValueError -> 400
+    return value
+
+
+def _month_split(date_from, date_to):
+    """Split an inclusive date range into whole months and leftover day ranges.
+
+    Returns ((first 'YYYY-MM', last 'YYYY-MM') or None, [(from, to), ...]).
+    """
+    start = datetime.strptime(date_from, '%Y-%m-%d').date()
+    end = datetime.strptime(date_to, '%Y-%m-%d').date()
+    full_start = start if start.day == 1 else date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    ends_month = (end.month == 12 and end.day == 31) or (end + timedelta(days=1)).day == 1
+    full_end = end if ends_month else end.replace(day=1) - timedelta(days=1)
+    if full_start > full_end:
+        return None, [(date_from, date_to)]
+    raw = []
+    if start < full_start:
+        raw.append((date_from, (full_start - timedelta(days=1)).isoformat()))
+    if full_end < end:
+        raw.append(((full_end + timedelta(days=1)).isoformat(), date_to))
+    return (f"{full_start.year:04d}-{full_start.month:02d}", f"{full_end.year:04d}-{full_end.month:02d}"), raw
+
+
+@app.route('/api/attendance/summary', methods=['GET'])
+@conditional('attendance', 'students')
+def get_attendance_summary():
+    """Present/absent/leave counts and percentages per student, class/section or month.
+
+    ?group_by=student|class|month (default student), optional ?from= / ?to=
+    (inclusive), ?class_name=, ?section=, ?student_id=.  Whole months come
+    from attendance_monthly; partial months at either end of the range are
+    counted from attendance rows via the covering indexes.
+    """
+    try:
+        group_by = request.args.get('group_by', 'student')
+        if group_by not in ATTENDANCE_SUMMARY_GROUPS:
+            return jsonify({'error': f"group_by must be one of {', '.join(ATTENDANCE_SUMMARY_GROUPS)}"}), 400
+        columns, grouping, join_students = ATTENDANCE_SUMMARY_GROUPS[group_by]
+        date_from = _summary_date('from', SUMMARY_OPEN_FROM)
+        date_to = _summary_date('to', SUMMARY_OPEN_TO)
+
+        # restrict every part to the selected students so each one stays an index lookup
+        student_sql, student_params = '', []
+        if request.args.get('student_id'):
+            student_sql, student_params = ' AND student_id = ?', [request.args['student_id']]
+        else:
+            conds = [(f"{col} = ?", request.args[col]) for col in ('class_name', 'section') if request.args.get(col)]
+            if conds:
+                student_sql = (" AND student_id IN (SELECT id FROM students WHERE "
+                               + ' AND '.join(c for c, _ in conds) + ")")
+                student_params = [v for _, v in conds]
+
+        months, raw_ranges = _month_split(date_from, date_to)
+        parts, params = [], []
+        if months:
+            parts.append(_ROLLUP_PART_SQL + student_sql)
+            params += [*months, *student_params]
+        for lo, hi in raw_ranges:
+            parts.append(f"{_RAW_PART_SQL}{student_sql} GROUP BY student_id, month")
+            params += [lo, hi, *student_params]
+
+        source = f"({' UNION ALL '.join(parts)}) u"
+        if join_students:
+            source += " JOIN students s ON s.id = u.student_id"
+        query = f"SELECT {columns}, {_ATTENDANCE_COUNTS_SQL} FROM {source} {grouping}"
+        conn = get_db()
+        rows = conn.execute(query, params).fetchall()
+        conn.close()
+        return jsonify({
+            'group_by': group_by,
+            'from': None if date_from == SUMMARY_OPEN_FROM else date_from,
+            'to': None if date_to == SUMMARY_OPEN_TO else date_to,
+            'rows': [dict(row) for row in rows],
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/api/attendance/<int:attendance_id>', methods=['PUT'])
 def update_attendance(attendance_id):
     try:
@@ -732,6 +2249,7 @@ def update_attendance(attendance_id):
         )
         conn.commit()
         conn.close()
+        publish_event('attendance.updated', id=attendance_id)
         return jsonify(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -745,10 +2263,140 @@ def delete_attendance(attendance_id):
         conn.execute("DELETE FROM attendance WHERE id = ?", (attendance_id,))
         conn.commit()
         conn.close()
+        publish_event('attendance.deleted', id=attendance_id)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+# compact codes accepted by the batch endpoint, mapped to attendance.status
+ATTENDANCE_CODES = {'P': 'Present', 'A': 'Absent', 'L': 'Leave'}
+
+
+def _attendance_status(value):
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    return ATTENDANCE_CODES.get(value.upper()) or next(
+        (s for s in ATTENDANCE_CODES.values() if s.lower() == value.lower()), None)
+
+
+@app.route('/api/attendance/batch', methods=['POST'])
+def mark_attendance_batch():
+    """Mark a whole class/section for one day in a single transaction.
+
+    Request body:
+    {
+        "class_name": "X",
+        "section": "A",                 (optional: whole class if omitted)
+        "attendance_date": "2026-02-26",
+        "default_status": "P",          (optional: applied to everyone not in statuses)
+        "statuses": {"1001": "A", "1007": "L"},   roll_no -> P/A/L or full status
+        "remarks": {"1007": "Medical"}  (optional)
+    }
+
+    Only rows that are new or whose status/remarks changed are written, so
+    re-submitting the same register is a single read.  Students without an
+    entry in remarks keep the remark they already have for the day (send ""
+    to clear it).  Returns a summary rather than the rows.
+    """
+    try:
+        data = request.json or {}
+        class_name = data.get('class_name')
+        section = data.get('section')
+        attendance_date = _normalize_date(data.get('attendance_date'))
+        statuses = data.get('statuses') or {}
+        remarks = data.get('remarks') or {}
+        if not class_name or not attendance_date:
+            return jsonify({'error': 'class_name and attendance_date are required'}), 400
+        if not _is_iso_date(attendance_date):
+            return jsonify({'error': 'attendance_date must be a date in YYYY-MM-DD format'}), 400
+        if not isinstance(statuses, dict) or not isinstance(remarks, dict):
+            return jsonify({'error': 'statuses and remarks must be objects keyed by roll_no'}), 400
+
+        default_status = None
+        if data.get('default_status'):
+            default_status = _attendance_status(data['default_status'])
+            if not default_status:
+                return jsonify({'error': f"Invalid default_status: {data['default_status']}"}), 400
+        wanted = {}
+        invalid = []
+        for roll_no, value in statuses.items():
+            status = _attendance_status(value)
+            if status:
+                wanted[str(roll_no)] = status
+            else:
+                invalid.append(str(roll_no))
+        if invalid:
+            return jsonify({'error': 'Invalid status for roll_no(s): ' + ', '.join(invalid)}), 400
+
+        conn = get_db()
+        where = "class_name = ?"
+        params = [class_name]
+        if section:
+            where += " AND section = ?"
+            params.append(section)
+        roster = {row['roll_no']: row['id']
+                  for row in conn.execute(f"SELECT id, roll_no FROM students WHERE {where}", params)}
+        current = {}
+        if roster:
+            # that day's existing marks for this section only
+            for row in conn.execute(
+                f"""SELECT student_id, status, remarks FROM attendance
+                    WHERE attendance_date = ? AND student_id IN (SELECT id FROM students WHERE {where})""",
+                [attendance_date] + params
+            ):
+                current[row['student_id']] = (row['status'], row['remarks'])
+
+        changes = []
+        inserted = updated = unchanged = 0
+        counts = dict.fromkeys(ATTENDANCE_CODES.values(), 0)
+        for roll_no, student_id in roster.items():
+            status = wanted.get(roll_no, default_status)
+            if status is None:
+                continue
+            counts[status] += 1
+            before = current.get(student_id)
+            remark = remarks.get(roll_no)
+            if remark is None and before is not None:
+                remark = before[1]
+            if before == (status, remark):
+                unchanged += 1
+                continue
+            if before is None:
+                inserted += 1
+            else:
+                updated += 1
+            changes.append((student_id, attendance_date, status, remark))
+
+        if changes:
+            with conn:
+                conn.executemany(
+                    """INSERT INTO attendance (student_id, attendance_date, status, remarks)
+                       VALUES (?, ?, ?, ?)
+                       ON CONFLICT(student_id, attendance_date)
+                       DO UPDATE SET status = excluded.status,
+                                     remarks = COALESCE(excluded.remarks, attendance.remarks)""",
+                    changes
+                )
+            publish_event('attendance.marked', class_name=class_name, section=section, date=attendance_date,
+                          inserted=inserted, updated=updated)
+        conn.close()
+        return jsonify({
+            'success': True,
+            'class_name': class_name,
+            'section': section,
+            'attendance_date': attendance_date,
+            'students': len(roster),
+            'marked': inserted + updated + unchanged,
+            'inserted': inserted,
+            'updated': updated,
+            'unchanged': unchanged,
+            'counts': counts,
+            'unknown_roll_nos': sorted(r for r in wanted if r not in roster)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
 # ===========================
 # PAYMENTS ENDPOINTS
 # ===========================
@@ -766,20 +2414,23 @@ def create_payment():
              data.get('payment_method'), data.get('transaction_id'), data.get('purpose'),
              data.get('status', 'Completed'), data.get('remarks'))
         )
-        conn.commit()
         payment_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        refresh_fee_balances(conn, [data.get('student_id')])
+        conn.commit()
         conn.close()
+        publish_event('payment.created', id=payment_id, student_id=data.get('student_id'),
+                      amount=data.get('amount'), status=data.get('status', 'Completed'))
         data['id'] = payment_id
         return jsonify(data), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/payments', methods=['GET'])
+@conditional('payments', 'students')
 def get_payments():
     try:
         student_id = request.args.get('student_id')
         status = request.args.get('status')
-        conn = get_db()
         query = "SELECT p.*, s.name, s.roll_no FROM payments p JOIN students s ON p.student_id = s.id WHERE 1=1"
         params = []
         if student_id:
@@ -789,6 +2440,10 @@ def get_payments():
             query += " AND p.status = ?"
             params.append(status)
         query += " ORDER BY p.payment_date DESC"
+        fmt = _stream_format()
+        if fmt:
+            return stream_rows(query, params, fmt)
+        conn = get_db()
         rows = conn.execute(query, params).fetchall()
         payments = [dict(row) for row in rows]
         conn.close()
@@ -797,8 +2452,9 @@ def get_payments():
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/payments/<int:payment_id>', methods=['GET'])
+@conditional('payments', 'students')
 def get_payment(payment_id):
-    try:
+    def load():
         conn = get_db()
         row = conn.execute(
             "SELECT p.*, s.name, s.roll_no FROM payments p JOIN students s ON p.student_id = s.id WHERE p.id = ?",
@@ -806,8 +2462,14 @@ def get_payment(payment_id):
         ).fetchone()
         conn.close()
         if not row:
+            return None, ()
+        return dict(row), [('student', row['student_id'])]
+
+    try:
+        response = cached_entity(('payment', payment_id), load)
+        if response is None:
             return jsonify({'error': 'Payment not found'}), 404
-        return jsonify(dict(row))
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -824,8 +2486,13 @@ def update_payment(payment_id):
              data.get('transaction_id'), data.get('purpose'), data.get('status'),
              data.get('remarks'), payment_id)
         )
+        refresh_fee_balances(conn, [row['student_id'] for row in conn.execute(
+            "SELECT student_id FROM payments WHERE id = ?", (payment_id,))])
         conn.commit()
+        entity_cache.invalidate(('payment', payment_id))
+        receipt_cache.invalidate(('payment', payment_id))
         conn.close()
+        publish_event('payment.updated', id=payment_id)
         return jsonify(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -836,42 +2503,1155 @@ def delete_payment(payment_id):
         return jsonify({'success': True})
     try:
         conn = get_db()
+        student_ids = [row['student_id'] for row in conn.execute(
+            "SELECT student_id FROM payments WHERE id = ?", (payment_id,))]
         conn.execute("DELETE FROM payments WHERE id = ?", (payment_id,))
+        refresh_fee_balances(conn, student_ids)
         conn.commit()
+        entity_cache.invalidate(('payment', payment_id))
+        receipt_cache.invalidate(('payment', payment_id))
         conn.close()
+        publish_event('payment.deleted', id=payment_id)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+# ===========================
+# BULK PAYMENT IMPORT
+# ===========================
+# Fee-counter batches and bank/UPI settlement files, keyed by transaction_id.
+# Rows are matched to students through an in-memory roll_no index built once
+# per import; existing payments are looked up per chunk through
+# idx_payments_transaction.  transaction_id is not unique in the schema
+# (older data may repeat one), so the upsert is a lookup followed by INSERT
+# or UPDATE rather than ON CONFLICT.
+
+PAYMENT_IMPORT_COLUMNS = ('transaction_id', 'roll_no', 'student_id', 'amount', 'payment_date',
+                          'payment_method', 'purpose', 'status', 'remarks')
+# header names seen in bank and UPI settlement exports
+PAYMENT_IMPORT_ALIASES = {
+    'txn_id': 'transaction_id',
+    'utr': 'transaction_id',
+    'reference': 'transaction_id',
+    'ref': 'transaction_id',
+    'roll': 'roll_no',
+    'date': 'payment_date',
+    'method': 'payment_method',
+    'mode': 'payment_method',
+}
+PAYMENT_STATUS_ALIASES = {
+    'completed': 'Completed', 'success': 'Completed', 'settled': 'Completed', 'paid': 'Completed',
+    'pending': 'Pending',
+    'failed': 'Failed', 'failure': 'Failed',
+}
+# what an import may change on an existing payment
+_PAYMENT_IMPORT_FIELDS = ('student_id', 'amount', 'payment_date', 'payment_method', 'purpose', 'status', 'remarks')
+
+_PAYMENT_INSERT_SQL = """INSERT INTO payments (transaction_id, {cols})
+    VALUES (:transaction_id, {values})""".format(
+    cols=', '.join(_PAYMENT_IMPORT_FIELDS),
+    values=', '.join("COALESCE(:status, 'Completed')" if c == 'status' else f':{c}' for c in _PAYMENT_IMPORT_FIELDS),
+)
+_PAYMENT_UPDATE_SQL = "UPDATE payments SET {sets}, updated_at = CURRENT_TIMESTAMP WHERE id = :id".format(
+    sets=', '.join(f"{c} = :{c}" for c in _PAYMENT_IMPORT_FIELDS))
+
+
+def _clean_payment_row(raw):
+    """Map an import row (CSV or JSON) onto PAYMENT_IMPORT_COLUMNS.
+
+    Only transaction_id is required here: amount and payment_date are needed
+    for new payments, but a settlement row may just confirm a status.
+    Raises ValueError with a message for the per-row error report.
+    """
+    row = dict.fromkeys(PAYMENT_IMPORT_COLUMNS)
+    for key, value in raw.items():
+        if key is None:
+            continue
+        key = key.strip().lower()
+        key = PAYMENT_IMPORT_ALIASES.get(key, key)
+        if key in row:
+            if isinstance(value, str):
+                value = value.strip()
+            row[key] = value if value not in ('', None) else None
+    if not row['transaction_id']:
+        raise ValueError('transaction_id is required')
+    row['transaction_id'] = str(row['transaction_id'])
+    if row['roll_no'] is not None:
+        row['roll_no'] = str(row['roll_no'])
+    if row['student_id'] is not None:
+        try:
+            row['student_id'] = int(row['student_id'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid student_id: {row['student_id']}")
+    if row['amount'] is not None:
+        try:
+            row['amount'] = float(str(row['amount']).replace(',', '').lstrip('₹').strip())
+        except ValueError:
+            raise ValueError(f"Invalid amount: {row['amount']}")
+        if row['amount'] <= 0:
+            raise ValueError('amount must be positive')
+    if row['payment_date'] is not None:
+        try:
+            # fromisoformat: strptime was ~40% of row cleaning on large files
+            value = date.fromisoformat(_normalize_date(str(row['payment_date']).replace('/', '-')))
+        except ValueError:
+            raise ValueError(f"Invalid payment_date: {row['payment_date']}")
+        row['payment_date'] = value.isoformat()
+    if row['status'] is not None:
+        status = PAYMENT_STATUS_ALIASES.get(str(row['status']).lower())
+        if status is None:
+            raise ValueError(f"Invalid status: {row['status']}")
+        row['status'] = status
+    return row
+
+
+def _import_payments(conn, rows, report, rolls):
+    """Insert or update an iterable of raw rows in chunks; updates `report` in place.
+
+    `rolls` maps roll_no -> student id.  Returns (ids of students whose
+    payments changed, ids of updated payments).
+    """
+    student_ids = set(rolls.values())
+    seen = {}  # transaction_id -> row number of its first occurrence
+    affected, updated_ids = set(), []
+    chunk = []
+
+    def note(kind, entry):
+        if len(report[kind]) < BULK_MAX_ERRORS:
+            report[kind].append(entry)
+        else:
+            report['truncated'] = True
+
+    def flush():
+        if not chunk:
+            return
+        marks = ','.join('?' * len(chunk))
+        existing = {}
+        for row in conn.execute(
+            f"""SELECT id, transaction_id, {', '.join(_PAYMENT_IMPORT_FIELDS)} FROM payments
+                 WHERE transaction_id IN ({marks})""", [row['transaction_id'] for _, row in chunk]
+        ):
+            existing.setdefault(row['transaction_id'], []).append(row)
+        inserts, updates = [], []
+        for number, row in chunk:
+            matches = existing.get(row['transaction_id'], [])
+            if len(matches) > 1:
+                report['duplicates'] += 1
+                note('duplicate_rows', {'row': number, 'transaction_id': row['transaction_id'],
+                                        'reason': f"matches {len(matches)} existing payments"})
+            elif matches:
+                old = dict(matches[0])
+                new = {c: old[c] if row[c] is None else row[c] for c in _PAYMENT_IMPORT_FIELDS}
+                if all(new[c] == old[c] for c in _PAYMENT_IMPORT_FIELDS):
+                    report['unchanged'] += 1
+                    continue
+                new['id'] = old['id']
+                updates.append(new)
+                affected.update((old['student_id'], new['student_id']))
+                updated_ids.append(old['id'])
+            elif row['student_id'] is None:
+                report['unmatched'] += 1
+                note('unmatched_rows', {'row': number, 'transaction_id': row['transaction_id'],
+                                        'roll_no': None, 'student_id': None})
+            elif row['amount'] is None or row['payment_date'] is None:
+                report['failed'] += 1
+                note('errors', {'row': number, 'transaction_id': row['transaction_id'],
+                                'error': 'amount and payment_date are required for a new payment'})
+            else:
+                inserts.append(row)
+                affected.add(row['student_id'])
+        conn.executemany(_PAYMENT_INSERT_SQL, inserts)
+        conn.executemany(_PAYMENT_UPDATE_SQL, updates)
+        report['inserted'] += len(inserts)
+        report['updated'] += len(updates)
+        chunk.clear()
+
+    for number, raw in enumerate(rows, start=1):
+        report['total'] += 1
+        try:
+            if not isinstance(raw, dict):
+                raise ValueError('row must be an object')
+            row = _clean_payment_row(raw)
+        except ValueError as e:
+            report['failed'] += 1
+            note('errors', {'row': number, 'transaction_id': raw.get('transaction_id')
+                            if isinstance(raw, dict) else None, 'error': str(e)})
+            continue
+        first = seen.get(row['transaction_id'])
+        if first is not None:
+            report['duplicates'] += 1
+            note('duplicate_rows', {'row': number, 'transaction_id': row['transaction_id'],
+                                    'reason': f"repeats row {first}"})
+            continue
+        seen[row['transaction_id']] = number
+        # the file names the student by roll_no (or id); a row naming nobody
+        # we know is unmatched, one naming nobody at all can still update
+        # an existing payment (flush() reports it if there is none)
+        if row['roll_no'] is not None:
+            row['student_id'] = rolls.get(row['roll_no'])
+            known = row['student_id'] is not None
+        else:
+            known = row['student_id'] is None or row['student_id'] in student_ids
+        if not known:
+            report['unmatched'] += 1
+            note('unmatched_rows', {'row': number, 'transaction_id': row['transaction_id'],
+                                    'roll_no': row['roll_no'], 'student_id': row['student_id']})
+            continue
+        chunk.append((number, row))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            flush()
+    flush()
+    return affected, updated_ids
+
+
+@app.route('/api/payments/bulk', methods=['POST'])
+def bulk_import_payments():
+    """Record or reconcile many payments in one transaction, keyed by transaction_id.
+
+    Accepts a JSON array of payment objects (or {"payments": [...]}), or a
+    CSV with a header row sent as text/csv or as the `file` field of a
+    multipart upload.  Columns: transaction_id (required), roll_no or
+    student_id, amount, payment_date, payment_method, purpose, status,
+    remarks; common settlement headers (utr, ref, date, mode...) are
+    accepted too.  A new transaction_id becomes a payment; a known one
+    updates that payment, and blank fields keep their stored values.
+
+    Rows whose roll_no matches no student are listed in `unmatched_rows`;
+    a transaction_id repeated in the file, or matching several stored
+    payments, in `duplicate_rows`; invalid rows in `errors`.  None of those
+    are written.  ?dry_run=1 runs everything and rolls it back, to preview a
+    reconciliation.
+    """
+    try:
+        rows = _bulk_rows('payments')
+        if rows is None:
+            return jsonify({'error': 'Expected a JSON array of payments or a CSV file'}), 400
+        dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+
+        report = {'total': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'unmatched': 0, 'duplicates': 0,
+                  'failed': 0, 'unmatched_rows': [], 'duplicate_rows': [], 'errors': [], 'truncated': False,
+                  'dry_run': dry_run}
+        conn = get_db()
+        # roll_no -> id for every student, once: one indexed scan instead of a
+        # lookup per row
+        rolls = {row['roll_no']: row['id'] for row in conn.execute("SELECT roll_no, id FROM students")}
+        affected, updated_ids = _import_payments(conn, rows, report, rolls)
+        affected.discard(None)
+        if affected:
+            # one refresh for the whole batch; past a chunk's worth of
+            # students a full recompute is cheaper than a long IN list
+            refresh_fee_balances(conn, None if len(affected) > BULK_CHUNK_SIZE else sorted(affected))
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+        conn.close()
+        if not dry_run and (report['inserted'] or report['updated']):
+            entity_cache.invalidate(*[('payment', i) for i in updated_ids])
+            receipt_cache.invalidate(*[('payment', i) for i in updated_ids])
+            publish_event('payment.imported', inserted=report['inserted'], updated=report['updated'])
+        return jsonify(report), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# ===========================
+# FEE LEDGER
+# ===========================
+# fee_structures lists what each class is charged: monthly tuition, quarterly
+# or annual fees, one-off admission/exam fees.  A student's dues over a period
+# are the charges their class incurred in the months they were enrolled, minus
+# their Completed payments dated in that period.  Payment purposes are free
+# text, so the ledger matches money to students, not to individual fee heads.
+# _ledger_query() computes this for a class or a set of students in a single
+# set-based statement.
+#
+# fee_balances is a snapshot of every active student's dues as of one month,
+# read by /api/fees/defaulters.  Payment and student handlers refresh the rows
+# they touch in the same transaction; the whole snapshot is recomputed when
+# the month rolls over, the fee structure changes, or via rebuild-stats.
+
+# frequency -> months between charges ('once' is charged in start_month only)
+FEE_FREQUENCIES = {'monthly': 1, 'quarterly': 3, 'half-yearly': 6, 'annual': 12, 'once': 1000000}
+FEE_OPEN_FROM = '0001-01'
+FEE_DUES_LIMIT = int(os.environ.get('FEE_DUES_LIMIT', 50))  # rows per class on /api/fees/dues
+FEE_DEFAULTERS_MAX_PAGE = 500
+
+
+def _month_index(expr):
+    """SQL turning a 'YYYY-MM...' expression into a month number"""
+    return f"(CAST(substr({expr}, 1, 4) AS INTEGER) * 12 + CAST(substr({expr}, 6, 2) AS INTEGER))"
+
+
+_FEE_EVERY_SQL = "CASE f.frequency " + ' '.join(
+    f"WHEN '{name}' THEN {months}" for name, months in FEE_FREQUENCIES.items()) + " END"
+# first and last month the fee applies to this student within the period
+_FEE_FIRST_SQL = (f"MAX(:from_idx, {_month_index('f.start_month')}, "
+                  f"COALESCE({_month_index('s.admission_date')}, 0))")
+_FEE_LAST_SQL = f"MIN(:to_idx, COALESCE({_month_index('f.end_month')}, :to_idx))"
+# number of charges: due months start_month + k * every that fall in [first, last]
+_FEE_CHARGES_SQL = """CASE WHEN {last} < {first} THEN 0
+         ELSE ({last} - {start}) / ({every}) - ({first} - {start} + ({every}) - 1) / ({every}) + 1 END""".format(
+    first=_FEE_FIRST_SQL, last=_FEE_LAST_SQL, start=_month_index('f.start_month'), every=_FEE_EVERY_SQL)
+
+# grouped per student in idx_students_class_section order (roll_no is unique)
+# so a class shard is an index range rather than a walk over every student
+_LEDGER_SQL = f"""
+    WITH charged AS (
+        SELECT s.id AS student_id, SUM(f.amount * ({_FEE_CHARGES_SQL})) AS expected,
+               (SELECT COALESCE(SUM(p.amount), 0) FROM payments p
+                 WHERE p.student_id = s.id AND p.status = 'Completed'
+                   AND p.payment_date BETWEEN :date_from AND :date_to) AS paid
+          FROM students s JOIN fee_structures f ON f.class_name = s.class_name
+         WHERE s.status = 'Active' {{where}}
+         GROUP BY s.class_name, s.section, s.roll_no
+    )
+    SELECT s.id AS student_id, s.roll_no, s.name, s.class_name, s.section,
+           ROUND(c.expected, 2) AS expected, ROUND(c.paid, 2) AS paid, ROUND(c.expected - c.paid, 2) AS due
+      FROM charged c JOIN students s ON s.id = c.student_id"""
+
+
+def _ledger_query(month_from, month_to, where='', params=None):
+    """Dues of every matching active student over [month_from, month_to] ('YYYY-MM').
+
+    `where` is extra SQL on students `s` with named parameters in `params`.
+    Returns (sql, params); the result has one row per student whose class has
+    fee structures.
+    """
+    from_year, from_month = map(int, month_from.split('-'))
+    to_year, to_month = map(int, month_to.split('-'))
+    return _LEDGER_SQL.format(where=where), {
+        **(params or {}),
+        'from_idx': from_year * 12 + from_month,
+        'to_idx': to_year * 12 + to_month,
+        'date_from': f"{month_from}-01",
+        'date_to': f"{month_to}-31",
+    }
+
+
+def _fee_month(value, default=None):
+    """Parse 'YYYY-MM' (or a date, whose month is used); ValueError -> 400"""
+    if not value:
+        return default
+    return datetime.strptime(_normalize_date(value)[:7], '%Y-%m').strftime('%Y-%m')
+
+
+def ensure_fee_ledger(conn):
+    """Create fee_structures and the fee_balances snapshot"""
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS fee_structures (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               class_name TEXT NOT NULL,
+               fee_head TEXT NOT NULL,
+               amount REAL NOT NULL CHECK(amount >= 0),
+               frequency TEXT NOT NULL DEFAULT 'monthly'
+                   CHECK(frequency IN ('monthly', 'quarterly', 'half-yearly', 'annual', 'once')),
+               start_month TEXT NOT NULL,
+               end_month TEXT,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               UNIQUE(class_name, fee_head, start_month)
+           )"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS fee_balances (
+               student_id INTEGER PRIMARY KEY,
+               class_name TEXT,
+               section TEXT,
+               expected REAL NOT NULL,
+               paid REAL NOT NULL,
+               due REAL NOT NULL,
+               as_of TEXT NOT NULL
+           )"""
+    )
+    # defaulters overall and per class, largest dues first
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fee_balances_due ON fee_balances(due)")
+    # snapshot month checks via MIN(as_of)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fee_balances_as_of ON fee_balances(as_of)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fee_balances_class_due ON fee_balances(class_name, due)")
+
+
+def refresh_fee_balances(conn, student_ids=None, class_name=None):
+    """Recompute fee_balances for some students, one class, or everyone (caller commits).
+
+    A partial refresh keeps the snapshot's as-of month so all rows stay
+    comparable; a full refresh moves it to the current month.
+    """
+    if student_ids is None and class_name is None:
+        as_of = date.today().strftime('%Y-%m')
+        conn.execute("DELETE FROM fee_balances")
+        where, params = '', {}
+    else:
+        as_of = (conn.execute("SELECT MIN(as_of) FROM fee_balances").fetchone()[0]
+                 or date.today().strftime('%Y-%m'))
+        if student_ids is not None:
+            params = {f"s{i}": sid for i, sid in enumerate(student_ids)}
+            marks = ', '.join(f":{name}" for name in params)
+            conn.execute(f"DELETE FROM fee_balances WHERE student_id IN ({marks})", params)
+            where = f"AND s.id IN ({marks})"
+        else:
+            params = {'class_name': class_name}
+            conn.execute("DELETE FROM fee_balances WHERE class_name = :class_name", params)
+            where = "AND s.class_name = :class_name"
+    query, params = _ledger_query(FEE_OPEN_FROM, as_of, where, params)
+    conn.execute(
+        f"""INSERT INTO fee_balances (student_id, class_name, section, expected, paid, due, as_of)
+            SELECT student_id, class_name, section, expected, paid, due, :as_of FROM ({query})""",
+        {**params, 'as_of': as_of}
+    )
+
+
+def _roll_fee_balances(conn):
+    """Bring the snapshot up to the current month if it is behind"""
+    month = date.today().strftime('%Y-%m')
+    as_of = conn.execute("SELECT MIN(as_of) FROM fee_balances").fetchone()[0]
+    if as_of is None:
+        stale = conn.execute("SELECT 1 FROM fee_structures LIMIT 1").fetchone() is not None
+    else:
+        stale = as_of != month
+    if stale:
+        with conn:
+            refresh_fee_balances(conn)
+    return month
+
+
+def _fee_structure_payload(data):
+    """Validate a fee structure body; returns the column values"""
+    missing = [k for k in ('class_name', 'fee_head', 'amount', 'start_month') if data.get(k) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    frequency = data.get('frequency') or 'monthly'
+    if frequency not in FEE_FREQUENCIES:
+        raise ValueError(f"frequency must be one of {', '.join(FEE_FREQUENCIES)}")
+    amount = float(data['amount'])
+    if amount < 0:
+        raise ValueError("amount must not be negative")
+    start_month = _fee_month(str(data['start_month']))
+    end_month = _fee_month(data.get('end_month'))
+    if end_month and end_month < start_month:
+        raise ValueError("end_month is before start_month")
+    return (str(data['class_name']).strip(), str(data['fee_head']).strip(), amount, frequency,
+            start_month, end_month)
+
+
+@app.route('/api/fees/structure', methods=['GET'])
+def get_fee_structures():
+    try:
+        query = "SELECT * FROM fee_structures"
+        params = []
+        if request.args.get('class_name'):
+            query += " WHERE class_name = ?"
+            params.append(request.args['class_name'])
+        query += " ORDER BY class_name, start_month, fee_head"
+        conn = get_db()
+        rows = conn.execute(query, params).fetchall()
+        conn.close()
+        return jsonify([dict(row) for row in rows])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/fees/structure', methods=['POST'])
+def create_fee_structure():
+    """Add a fee, or update the one with the same class, fee_head and start_month"""
+    try:
+        values = _fee_structure_payload(request.json or {})
+        conn = get_db()
+        with conn:
+            conn.execute(
+                """INSERT INTO fee_structures (class_name, fee_head, amount, frequency, start_month, end_month)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(class_name, fee_head, start_month) DO UPDATE SET
+                       amount = excluded.amount, frequency = excluded.frequency,
+                       end_month = excluded.end_month, updated_at = CURRENT_TIMESTAMP""",
+                values
+            )
+            refresh_fee_balances(conn, class_name=values[0])
+        row = conn.execute(
+            "SELECT * FROM fee_structures WHERE class_name = ? AND fee_head = ? AND start_month = ?",
+            (values[0], values[1], values[4])
+        ).fetchone()
+        conn.close()
+        return jsonify(dict(row)), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/fees/structure/<int:fee_id>', methods=['PUT'])
+def update_fee_structure(fee_id):
+    try:
+        values = _fee_structure_payload(request.json or {})
+        conn = get_db()
+        old = conn.execute("SELECT class_name FROM fee_structures WHERE id = ?", (fee_id,)).fetchone()
+        if not old:
+            conn.close()
+            return jsonify({'error': 'Fee structure not found'}), 404
+        with conn:
+            conn.execute(
+                """UPDATE fee_structures SET class_name = ?, fee_head = ?, amount = ?, frequency = ?,
+                       start_month = ?, end_month = ?, updated_at = CURRENT_TIMESTAMP
+                   WHERE id = ?""",
+                (*values, fee_id)
+            )
+            for class_name in {old['class_name'], values[0]}:
+                refresh_fee_balances(conn, class_name=class_name)
+        row = conn.execute("SELECT * FROM fee_structures WHERE id = ?", (fee_id,)).fetchone()
+        conn.close()
+        return jsonify(dict(row))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/fees/structure/<int:fee_id>', methods=['DELETE', 'OPTIONS'])
+def delete_fee_structure(fee_id):
+    if request.method == 'OPTIONS':
+        return jsonify({'success': True})
+    try:
+        conn = get_db()
+        old = conn.execute("SELECT class_name FROM fee_structures WHERE id = ?", (fee_id,)).fetchone()
+        if old:
+            with conn:
+                conn.execute("DELETE FROM fee_structures WHERE id = ?", (fee_id,))
+                refresh_fee_balances(conn, class_name=old['class_name'])
+        conn.close()
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/fees/ledger/<int:student_id>', methods=['GET'])
+def get_fee_ledger(student_id):
+    """One student's charges per fee head and Completed payments over ?from= / ?to= (YYYY-MM)"""
+    try:
+        month_from = _fee_month(request.args.get('from'), FEE_OPEN_FROM)
+        month_to = _fee_month(request.args.get('to'), date.today().strftime('%Y-%m'))
+        _, params = _ledger_query(month_from, month_to, params={'student_id': student_id})
+        conn = get_db()
+        student = conn.execute(
+            "SELECT id, roll_no, name, class_name, section, admission_date, status FROM students WHERE id = ?",
+            (student_id,)
+        ).fetchone()
+        if not student:
+            conn.close()
+            return jsonify({'error': 'Student not found'}), 404
+        charges = conn.execute(
+            f"""SELECT f.id AS fee_id, f.fee_head, f.frequency, f.amount, f.start_month, f.end_month,
+                       {_FEE_CHARGES_SQL} AS charges
+                  FROM students s JOIN fee_structures f ON f.class_name = s.class_name
+                 WHERE s.id = :student_id
+                 ORDER BY f.start_month, f.fee_head""",
+            params
+        ).fetchall()
+        payments = conn.execute(
+            """SELECT id, amount, payment_date, payment_method, transaction_id, purpose FROM payments
+                WHERE student_id = :student_id AND status = 'Completed'
+                  AND payment_date BETWEEN :date_from AND :date_to
+                ORDER BY payment_date, id""",
+            params
+        ).fetchall()
+        conn.close()
+        lines = [{**dict(row), 'total': round(row['amount'] * row['charges'], 2)} for row in charges]
+        expected = round(sum(line['total'] for line in lines), 2)
+        paid = round(sum(row['amount'] for row in payments), 2)
+        return jsonify({
+            'student': dict(student),
+            'from': None if month_from == FEE_OPEN_FROM else month_from,
+            'to': month_to,
+            'charges': lines,
+            'payments': [dict(row) for row in payments],
+            'expected': expected,
+            'paid': paid,
+            'due': round(expected - paid, 2),
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/fees/dues', methods=['GET'])
+def get_fee_dues():
+    """Students owing money over ?from= / ?to= (YYYY-MM), largest dues first, per class.
+
+    The ledger runs once per class (shard), each an index-driven query over
+    that class's students, so the cost grows with class size rather than
+    with the whole school.  ?class_name= (and ?section=) select one shard;
+    ?limit= caps the rows returned per class, totals cover every student.
+    """
+    try:
+        month_from = _fee_month(request.args.get('from'), FEE_OPEN_FROM)
+        month_to = _fee_month(request.args.get('to'), date.today().strftime('%Y-%m'))
+        limit = min(int(request.args.get('limit', FEE_DUES_LIMIT)), FEE_DEFAULTERS_MAX_PAGE)
+        conn = get_db()
+        if request.args.get('class_name'):
+            classes = [request.args['class_name']]
+        else:
+            classes = [row[0] for row in conn.execute(
+                "SELECT DISTINCT class_name FROM fee_structures ORDER BY class_name")]
+        shards = []
+        for class_name in classes:
+            where, params = "AND s.class_name = :class_name", {'class_name': class_name}
+            if request.args.get('section'):
+                where += " AND s.section = :section"
+                params['section'] = request.args['section']
+            query, params = _ledger_query(month_from, month_to, where, params)
+            rows = conn.execute(f"SELECT * FROM ({query}) WHERE due > 0 ORDER BY due DESC, roll_no",
+                                params).fetchall()
+            shards.append({
+                'class_name': class_name,
+                'students_owing': len(rows),
+                'total_due': round(sum(row['due'] for row in rows), 2),
+                'rows': [dict(row) for row in rows[:limit]],
+            })
+        conn.close()
+        shards.sort(key=lambda shard: -shard['total_due'])
+        return jsonify({
+            'from': None if month_from == FEE_OPEN_FROM else month_from,
+            'to': month_to,
+            'total_due': round(sum(shard['total_due'] for shard in shards), 2),
+            'classes': shards,
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/fees/defaulters', methods=['GET'])
+def get_fee_defaulters():
+    """Students with dues as of the current month, from the fee_balances snapshot.
+
+    ?class_name=, ?section=, ?min_due= filter; ?limit= / ?offset= page the
+    list, which is ordered by amount owed.
+    """
+    try:
+        limit = min(int(request.args.get('limit', 100)), FEE_DEFAULTERS_MAX_PAGE)
+        offset = int(request.args.get('offset', 0))
+        min_due = float(request.args.get('min_due', 0))
+        conn = get_db()
+        as_of = _roll_fee_balances(conn)
+        where, params = "b.due > ?", [min_due]
+        for col in ('class_name', 'section'):
+            if request.args.get(col):
+                where += f" AND b.{col} = ?"
+                params.append(request.args[col])
+        totals = conn.execute(
+            f"SELECT COUNT(*) AS students_owing, ROUND(COALESCE(SUM(b.due), 0), 2) AS total_due "
+            f"FROM fee_balances b WHERE {where}", params
+        ).fetchone()
+        # page the snapshot first so the walk down idx_fee_balances_due drives the query
+        rows = conn.execute(
+            f"""SELECT b.student_id, s.roll_no, s.name, b.class_name, b.section, b.expected, b.paid, b.due
+                  FROM (SELECT * FROM fee_balances b WHERE {where} ORDER BY b.due DESC LIMIT ? OFFSET ?) b
+                  JOIN students s ON s.id = b.student_id
+                 ORDER BY b.due DESC""",
+            params + [limit, offset]
+        ).fetchall()
+        conn.close()
+        return jsonify({'as_of': as_of, **dict(totals), 'rows': [dict(row) for row in rows]})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/fees/defaulters/summary', methods=['GET'])
+def get_fee_defaulters_summary():
+    """Students owing and total dues per class, from the fee_balances snapshot"""
+    try:
+        conn = get_db()
+        as_of = _roll_fee_balances(conn)
+        rows = conn.execute(
+            """SELECT class_name, COUNT(*) AS students_owing, ROUND(SUM(due), 2) AS total_due
+                 FROM fee_balances WHERE due > 0
+                GROUP BY class_name ORDER BY total_due DESC"""
+        ).fetchall()
+        conn.close()
+        return jsonify({'as_of': as_of, 'classes': [dict(row) for row in rows]})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# ===========================
+# FULL-TEXT SEARCH
+# ===========================
+# search_index is an FTS5 table over students, parents and teachers: names,
+# roll/employee numbers, father/mother/parent names and phone numbers.
+# Triggers keep it current like the dashboard aggregates, so every write path
+# (handlers, bulk import, the sample-data loader) is covered.  Each source row
+# maps to a fixed FTS rowid (id * 4 + kind code), so updates and deletes are
+# rowid lookups rather than searches.  Rebuild with rebuild-stats.
+
+SEARCH_KINDS = {'student': 1, 'parent': 2, 'teacher': 3}
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+# above this many matches, skip bm25 and rank by matching column (see _search_ids)
+SEARCH_RANK_LIMIT = int(os.environ.get('SEARCH_RANK_LIMIT', 500))
+# bm25 weights for the name, code, family and phone columns
+SEARCH_WEIGHTS = (10.0, 8.0, 3.0, 2.0)
+
+def _words(*exprs):
+    """SQL joining nullable text columns with spaces"""
+    return "TRIM(" + " || ' ' || ".join(f"COALESCE({e}, '')" for e in exprs) + ")"
+
+
+# kind -> (source table, name, code, family, phone, detail) as SQL over {row}
+_SEARCH_SOURCES = {
+    'student': ('students', "{row}.name", "{row}.roll_no",
+                _words('{row}.father_name', '{row}.mother_name', '{row}.parent_name'),
+                _words('{row}.phone', '{row}.parent_phone'),
+                "{row}.class_name || '-' || {row}.section"),
+    'parent': ('parents', "{row}.name", "NULL", "NULL", "{row}.phone", "{row}.relation"),
+    'teacher': ('teachers', "{row}.name", "{row}.emp_id", "NULL", "{row}.phone", "{row}.subject"),
+}
+
+# source columns that feed the index; other updates leave it alone
+_SEARCH_COLUMNS = {
+    'student': 'name, roll_no, father_name, mother_name, parent_name, phone, parent_phone, class_name, section',
+    'parent': 'name, phone, relation',
+    'teacher': 'name, emp_id, phone, subject',
+}
+
+_SEARCH_INSERT_SQL = "INSERT INTO search_index (rowid, name, code, family, phone, kind, detail) "
+
+
+def _search_values(kind, row):
+    """SQL values of the search_index row for source row {row} (NEW or a table name)"""
+    _, *columns = _SEARCH_SOURCES[kind]
+    name, code, family, phone, detail = (col.format(row=row) for col in columns)
+    return f"{row}.id * 4 + {SEARCH_KINDS[kind]}, {name}, {code}, {family}, {phone}, '{kind}', {detail}"
+
+
+def _search_triggers(kind):
+    """The insert/delete/update triggers mirroring one source table"""
+    table = _SEARCH_SOURCES[kind][0]
+    delete = f"DELETE FROM search_index WHERE rowid = OLD.id * 4 + {SEARCH_KINDS[kind]}"
+    insert = f"{_SEARCH_INSERT_SQL}VALUES ({_search_values(kind, 'NEW')})"
+    return {
+        f'trg_search_{table}_insert': f"""CREATE TRIGGER IF NOT EXISTS trg_search_{table}_insert
+            AFTER INSERT ON {table} BEGIN {insert}; END""",
+        f'trg_search_{table}_delete': f"""CREATE TRIGGER IF NOT EXISTS trg_search_{table}_delete
+            AFTER DELETE ON {table} BEGIN {delete}; END""",
+        f'trg_search_{table}_update': f"""CREATE TRIGGER IF NOT EXISTS trg_search_{table}_update
+            AFTER UPDATE OF {_SEARCH_COLUMNS[kind]} ON {table} BEGIN {delete}; {insert}; END""",
+    }
+
+
+SEARCH_TRIGGERS = {name: stmt for kind in _SEARCH_SOURCES for name, stmt in _search_triggers(kind).items()}
+
+
+def ensure_search_index(conn):
+    """Create search_index and its triggers; fill it on first run"""
+    # prefix indexes make 1-4 character autocomplete prefixes a single lookup
+    conn.execute(
+        """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+               name, code, family, phone, kind UNINDEXED, detail UNINDEXED,
+               tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3 4'
+           )"""
+    )
+    for stmt in SEARCH_TRIGGERS.values():
+        conn.execute(stmt)
+    if conn.execute("SELECT 1 FROM search_index LIMIT 1").fetchone() is None:
+        rebuild_search_index(conn)
+
+
+def rebuild_search_index(conn):
+    """Refill search_index from students, parents and teachers (caller commits)"""
+    conn.execute("DELETE FROM search_index")
+    for kind, (table, *_) in _SEARCH_SOURCES.items():
+        conn.execute(f"{_SEARCH_INSERT_SQL}SELECT {_search_values(kind, table)} FROM {table}")
+    conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+
+_SEARCH_TOKEN = re.compile(r'\w+', re.UNICODE)
+_SEARCH_COLUMN_ORDER = ('name', 'code', 'family', 'phone')
+
+
+def _search_match(q):
+    """Turn user input into an FTS5 query: every word must match as a prefix"""
+    return ' '.join(f'"{token}"*' for token in _SEARCH_TOKEN.findall(q))
+
+
+def _search_ids(conn, match, kinds, limit):
+    """rowids of the best `limit` matches, best first.
+
+    bm25 scores every matching row, which is cheap for a specific query but
+    not for a one- or two-letter prefix that matches half the school.  When
+    more than SEARCH_RANK_LIMIT rows match, rank by which column matched
+    instead (names, then roll/employee numbers, parent names, phones); each
+    tier stops reading as soon as it has enough rows.
+    """
+    kind_sql = f" AND rowid % 4 IN ({','.join(str(SEARCH_KINDS[k]) for k in kinds)})" if kinds else ''
+    many = conn.execute(f"SELECT 1 FROM search_index WHERE search_index MATCH ?{kind_sql} LIMIT 1 OFFSET ?",
+                        (match, SEARCH_RANK_LIMIT)).fetchone()
+    if not many:
+        weights = ', '.join(map(str, SEARCH_WEIGHTS))
+        return [row[0] for row in conn.execute(
+            f"SELECT rowid FROM search_index WHERE search_index MATCH ?{kind_sql} "
+            f"ORDER BY bm25(search_index, {weights}) LIMIT ?", (match, limit))]
+    ids = []
+    for tier in [f"{{{column}}} : ({match})" for column in _SEARCH_COLUMN_ORDER] + [match]:
+        seen = ','.join(map(str, ids)) or '0'
+        ids += [row[0] for row in conn.execute(
+            f"SELECT rowid FROM search_index WHERE search_index MATCH ?{kind_sql} "
+            f"AND rowid NOT IN ({seen}) LIMIT ?", (tier, limit - len(ids)))]
+        if len(ids) >= limit:
+            break
+    return ids
+
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    """Ranked prefix search over students, parents and teachers.
+
+    ?q= is split into words, each matched as a prefix of a name, roll_no /
+    emp_id, parent name or phone number; ?kind=student,teacher narrows the
+    sources; ?limit= (default 10, max 50).
+    """
+    try:
+        q = request.args.get('q', '')
+        match = _search_match(q)
+        limit = max(1, min(int(request.args.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT))
+        kinds = [k for k in request.args.get('kind', '').split(',') if k]
+        if set(kinds) - set(SEARCH_KINDS):
+            return jsonify({'error': f"kind must be among {', '.join(SEARCH_KINDS)}"}), 400
+        results = []
+        if match:
+            conn = get_db()
+            ids = _search_ids(conn, match, kinds, limit)
+            rows = conn.execute(
+                f"SELECT rowid, kind, name, code, detail, phone FROM search_index "
+                f"WHERE rowid IN ({','.join('?' * len(ids))})", ids
+            ).fetchall() if ids else []
+            conn.close()
+            by_id = {row['rowid']: row for row in rows}
+            results = [{'kind': row['kind'], 'id': row['rowid'] // 4, 'name': row['name'], 'code': row['code'],
+                        'detail': row['detail'], 'phone': row['phone']}
+                       for row in (by_id[i] for i in ids)]
+        return jsonify({'q': q, 'results': results})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# ===========================
+# DELTA SYNC
+# ===========================
+# change_log records the latest change to every row of the synced tables
+# under a monotonically increasing seq (AUTOINCREMENT, never reused).
+# Triggers append to it in the same transaction as the write, so every path
+# is covered.  Each row keeps only its most recent entry (unique on
+# (entity, entity_id)), so the log is bounded by the number of rows ever
+# written, and a client catching up gets each changed row once.  Deleted
+# rows stay in the log as tombstones.
+#
+# Only tables a client actually applies are synced: every write to a synced
+# table pays for the trigger, and attendance and payments are written far
+# more often than anything else.  The frontend only keeps students this way.
+
+SYNC_TABLES = ('students',)
+# no longer synced; their triggers and log entries are dropped on startup
+OBSOLETE_SYNC_TABLES = ('parents', 'teachers', 'attendance', 'payments')
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 5000))  # changes per /api/sync response
+
+# delete + insert rather than INSERT OR REPLACE: a trigger's conflict clause is
+# overridden by the one on the statement that fired it (e.g. an upsert)
+_CHANGE_LOG_SQL = """DELETE FROM change_log WHERE entity = '{table}' AND entity_id = {row}.id;
+            INSERT INTO change_log (entity, entity_id, op) VALUES ('{table}', {row}.id, '{op}')"""
+
+def _sync_triggers(table):
+    """The insert/update/delete triggers logging one synced table"""
+    return {
+        f'trg_sync_{table}_{event.lower()}': f"""CREATE TRIGGER IF NOT EXISTS trg_sync_{table}_{event.lower()}
+            AFTER {event} ON {table} BEGIN {_CHANGE_LOG_SQL.format(table=table, row=row, op=op)}; END"""
+        for event, row, op in (('INSERT', 'NEW', 'upsert'), ('UPDATE', 'NEW', 'upsert'), ('DELETE', 'OLD', 'delete'))
+    }
+
+
+SYNC_TRIGGERS = {name: stmt for table in SYNC_TABLES for name, stmt in _sync_triggers(table).items()}
+
+
+def ensure_change_log(conn):
+    """Create change_log and its triggers; log existing rows on first run"""
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS change_log (
+               seq INTEGER PRIMARY KEY AUTOINCREMENT,
+               entity TEXT NOT NULL,
+               entity_id INTEGER NOT NULL,
+               op TEXT NOT NULL CHECK(op IN ('upsert', 'delete')),
+               UNIQUE(entity, entity_id)
+           )"""
+    )
+    for table in OBSOLETE_SYNC_TABLES:
+        for name in _sync_triggers(table):
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute("DELETE FROM change_log WHERE entity = ?", (table,))
+    for stmt in SYNC_TRIGGERS.values():
+        conn.execute(stmt)
+    if conn.execute("SELECT 1 FROM change_log LIMIT 1").fetchone() is None:
+        # so that ?since=0 returns everything, including rows written before
+        # the log existed
+        for table in SYNC_TABLES:
+            conn.execute(f"INSERT INTO change_log (entity, entity_id, op) SELECT '{table}', id, 'upsert' FROM {table}")
+
+
+@app.route('/api/sync', methods=['GET'])
+def sync():
+    """Rows inserted, updated or deleted since ?since=<token>.
+
+    Without ?since= only the current token is returned (start tracking
+    here); ?since=0 returns every row.  At most ?limit= changes (default and
+    max SYNC_PAGE_SIZE) come back per response; when `more` is true, call
+    again with the returned token.  `reset` means the token is unknown to
+    this database and the client should reload from ?since=0.
+    """
+    try:
+        limit = max(1, min(int(request.args.get('limit', SYNC_PAGE_SIZE)), SYNC_PAGE_SIZE))
+        since = request.args.get('since')
+        conn = get_db()
+        # one read transaction, so the page and the rows it lists are a single
+        # consistent snapshot (close() rolls it back)
+        conn.execute("BEGIN")
+        latest = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+        if since is None:
+            conn.close()
+            return jsonify({'token': str(latest), 'more': False, 'reset': False, 'changes': {}})
+        since = int(since)
+        if since > latest:
+            conn.close()
+            return jsonify({'token': str(latest), 'more': False, 'reset': True, 'changes': {}})
+
+        log = conn.execute("SELECT seq, entity, entity_id, op FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+                           (since, limit)).fetchall()
+        changes = {}
+        for table in SYNC_TABLES:
+            ids = [row['entity_id'] for row in log if row['entity'] == table and row['op'] == 'upsert']
+            deletes = [row['entity_id'] for row in log if row['entity'] == table and row['op'] == 'delete']
+            if not ids and not deletes:
+                continue
+            upserts = conn.execute(
+                f"SELECT * FROM {table} WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id", ids
+            ).fetchall() if ids else []
+            changes[table] = {'upserts': [dict(row) for row in upserts], 'deletes': deletes}
+        conn.close()
+        token = log[-1]['seq'] if log else since
+        return jsonify({'token': str(token), 'more': token < latest, 'reset': False, 'changes': changes})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# ===========================
+# EVENT STREAM (Server-Sent Events)
+# ===========================
+# Write handlers publish a small notification after they commit (e.g.
+# 'payment.created' with the payment and student ids); /api/events pushes
+# them to every open EventSource so other tabs can refresh just what changed.
+# The bus is in-process: recent events are kept in a bounded ring buffer so a
+# client reconnecting with Last-Event-ID gets what it missed.  Event ids are
+# '<epoch>-<n>' where epoch changes on every restart; an id from another
+# epoch, or one that has fallen out of the buffer, gets a 'reset' event
+# (reload everything) instead.  With several gunicorn workers each has its
+# own bus, so a tab only hears about writes served by the same worker.
+
+EVENTS_BUFFER = int(os.environ.get('EVENTS_BUFFER', 1000))                # events kept for resuming
+EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', 15))          # seconds between pings
+EVENTS_STREAM_SECONDS = float(os.environ.get('EVENTS_STREAM_SECONDS', 300))  # then the browser reconnects
+EVENTS_RETRY_MS = 3000
+
+
+class EventBus:
+    """Bounded in-process fan-out of change notifications"""
+
+    def __init__(self, size):
+        self.epoch = format(int(time.time() * 1000), 'x')
+        self._events = deque(maxlen=size)  # (n, name, json data)
+        self._next = 1
+        self._lock = threading.Lock()
+        self._listeners = set()
+
+    def publish(self, name, data):
+        with self._lock:
+            self._events.append((self._next, name, json.dumps(data)))
+            self._next += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def subscribe(self, listener):
+        """Call listener() (from the publishing thread) after every publish"""
+        with self._lock:
+            self._listeners.add(listener)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            self._listeners.discard(listener)
+
+    def resume(self, last_event_id):
+        """(cursor, lost) for a client's Last-Event-ID; lost means it missed events we no longer have"""
+        with self._lock:
+            latest = self._next - 1
+            if not last_event_id:
+                return latest, False
+            epoch, _, n = last_event_id.partition('-')
+            if epoch != self.epoch or not n.isdigit() or int(n) > latest:
+                return latest, True
+            return self._clamp(int(n))
+
+    def _clamp(self, cursor):
+        oldest = self._events[0][0] if self._events else self._next
+        if cursor < oldest - 1:
+            return self._next - 1, True
+        return cursor, False
+
+    def since(self, cursor):
+        """(events after cursor, new cursor, lost)"""
+        with self._lock:
+            cursor, lost = self._clamp(cursor)
+            if lost:
+                return [], cursor, True
+            oldest = self._events[0][0] if self._events else self._next
+            pending = list(itertools.islice(self._events, cursor - oldest + 1, None))
+            return pending, self._next - 1, False
+
+    def event_id(self, n):
+        return f"{self.epoch}-{n}"
+
+    def frames(self, pending, cursor, lost):
+        """SSE wire format for a since() result; a ping when there is nothing to send"""
+        if lost:
+            return f"id: {self.event_id(cursor)}\nevent: reset\ndata: {{}}\n\n".encode()
+        if not pending:
+            return f"event: ping\ndata: {int(time.time())}\n\n".encode()
+        return ''.join(f"id: {self.event_id(n)}\nevent: {name}\ndata: {data}\n\n"
+                       for n, name, data in pending).encode()
+
+    def prelude(self, cursor, lost):
+        """First frames of a stream: reconnect delay, hello (or reset)"""
+        hello = json.dumps({'heartbeat': EVENTS_HEARTBEAT})
+        head = f"retry: {EVENTS_RETRY_MS}\nid: {self.event_id(cursor)}\nevent: hello\ndata: {hello}\n\n".encode()
+        return head + self.frames([], cursor, True) if lost else head
+
+
+events = EventBus(EVENTS_BUFFER)
+
+
+def publish_event(name, **data):
+    """Notify /api/events subscribers; call after the write has committed"""
+    events.publish(name, data)
+
+
+@app.route('/api/events', methods=['GET'])
+@no_compress
+def event_stream():
+    """Server-Sent Events: change notifications, a ping every EVENTS_HEARTBEAT seconds.
+
+    Browsers resume with the Last-Event-ID header automatically; a new
+    EventSource can pass ?last_event_id= instead.  Each stream ends after EVENTS_STREAM_SECONDS and the browser reconnects.
+    Only the opening frames come from here; asgi.py streams the rest from
+    its event loop without holding a thread per subscriber.  Any other
+    server would tie up a worker per open tab for minutes, so it gets 503
+    and the frontend polls /health instead (which says whether streams are
+    available).
+    """
+    if not request.environ.get('school.async_events'):
+        return jsonify({'error': 'Event stream needs the ASGI server (asgi.py); poll /health instead'}), 503
+    cursor, lost = events.resume(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'X-Event-Cursor': str(cursor)}
+    return Response(events.prelude(cursor, lost), mimetype='text/event-stream', headers=headers)
+
+
 # ===========================
 # STATISTICS ENDPOINTS
 # ===========================
 
 @app.route('/api/stats/dashboard', methods=['GET'])
+@conditional('students', 'teachers', 'payments')
 def get_dashboard_stats():
     try:
         conn = get_db()
-        total_students = conn.execute("SELECT COUNT(*) as count FROM students").fetchone()['count']
-        total_teachers = conn.execute("SELECT COUNT(*) as count FROM teachers").fetchone()['count']
-        # lifetime revenue (all completed payments)
-        total_revenue = conn.execute(
-            "SELECT COALESCE(SUM(amount), 0) as total FROM payments WHERE status = 'Completed'"
-        ).fetchone()['total']
+        # maintained by the DASHBOARD_TRIGGERS, so this is O(1) regardless
+        # of how much payment history there is
+        counters = {row['name']: row['value'] for row in conn.execute("SELECT name, value FROM stats_counters")}
         # revenue for the current month only (used by dashboard KPI)
         current_month = datetime.now().strftime('%Y-%m')
-        month_revenue = conn.execute(
-            "SELECT COALESCE(SUM(amount), 0) as total FROM payments \
-             WHERE status = 'Completed' AND substr(payment_date,1,7) = ?",
-            (current_month,)
-        ).fetchone()['total']
-        pending_payments = conn.execute("SELECT COUNT(*) as count FROM payments WHERE status = 'Pending'").fetchone()['count']
+        month = conn.execute(
+            "SELECT total FROM stats_monthly_revenue WHERE month = ?", (current_month,)
+        ).fetchone()
+        conn.close()
+        return jsonify({
+            'total_students': counters.get('total_students', 0),
+            'total_teachers': counters.get('total_teachers', 0),
+            # lifetime revenue (all completed payments)
+            'total_revenue': counters.get('total_revenue', 0),
+            'month_revenue': month['total'] if month else 0,
+            'pending_payments': counters.get('pending_payments', 0)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+DASHBOARD_RECENT_LIMIT = 10   # default length of the recent payments/admissions lists
+DASHBOARD_RECENT_MAX = 50
+
+
+@app.route('/api/dashboard/bootstrap', methods=['GET'])
+def get_dashboard_bootstrap():
+    """Everything the dashboard renders, in one response.
+
+    KPIs, students per status and per class, ?date='s (default today)
+    attendance per class, and the last ?limit= payments and admissions.
+    Every query reads an aggregate table, one day of attendance or a LIMIT,
+    so the cost does not grow with years of history.  All of it comes from
+    one connection inside one read transaction, i.e. a single snapshot.
+    """
+    try:
+        day = _summary_date('date', date.today().isoformat())
+        limit = max(1, min(int(request.args.get('limit', DASHBOARD_RECENT_LIMIT)), DASHBOARD_RECENT_MAX))
+        conn = get_db()
+        # close() rolls the read transaction back
+        conn.execute("BEGIN")
+        counters = {row['name']: row['value'] for row in conn.execute("SELECT name, value FROM stats_counters")}
+        month = conn.execute(
+            "SELECT total FROM stats_monthly_revenue WHERE month = ?", (day[:7],)
+        ).fetchone()
+        by_status, by_class = {}, {}
+        for row in conn.execute("SELECT class_name, status, students FROM stats_student_groups WHERE students > 0"):
+            by_status[row['status']] = by_status.get(row['status'], 0) + row['students']
+            by_class[row['class_name']] = by_class.get(row['class_name'], 0) + row['students']
+
+        attendance = dict.fromkeys(ATTENDANCE_CODES.values(), 0)
+        attendance_by_class = {}
+        for row in conn.execute(
+            """SELECT COALESCE(s.class_name, '') AS class_name, a.status, COUNT(*) AS n
+                 FROM attendance a JOIN students s ON s.id = a.student_id
+                WHERE a.attendance_date = ?
+                GROUP BY 1, 2""",
+            (day,)
+        ):
+            counts = attendance_by_class.setdefault(row['class_name'], dict.fromkeys(ATTENDANCE_CODES.values(), 0))
+            counts[row['status']] = counts.get(row['status'], 0) + row['n']
+            attendance[row['status']] = attendance.get(row['status'], 0) + row['n']
+
+        # page payments first so the planner walks idx_payments_date backwards
+        # instead of joining every payment and sorting
+        payments = conn.execute(
+            """SELECT p.id, p.student_id, s.roll_no, s.name, p.amount, p.payment_date, p.payment_method,
+                      p.transaction_id, p.purpose, p.status
+                 FROM (SELECT * FROM payments ORDER BY payment_date DESC, id DESC LIMIT ?) p
+                 LEFT JOIN students s ON p.student_id = s.id
+                ORDER BY p.payment_date DESC, p.id DESC""",
+            (limit,)
+        ).fetchall()
+        admissions = conn.execute(
+            """SELECT id, roll_no, name, class_name, section, admission_date, status FROM students
+                ORDER BY admission_date DESC, id DESC LIMIT ?""",
+            (limit,)
+        ).fetchall()
         conn.close()
+
+        recent_admissions = []
+        for row in admissions:
+            stu = dict(row)
+            stu['admission_date'] = _normalize_date(stu['admission_date'])
+            recent_admissions.append(stu)
         return jsonify({
-            'total_students': total_students,
-            'total_teachers': total_teachers,
-            'total_revenue': total_revenue,
-            'month_revenue': month_revenue,
-            'pending_payments': pending_payments
+            'date': day,
+            'kpis': {
+                'total_students': counters.get('total_students', 0),
+                'total_teachers': counters.get('total_teachers', 0),
+                'total_revenue': counters.get('total_revenue', 0),
+                'month_revenue': month['total'] if month else 0,
+                'pending_payments': counters.get('pending_payments', 0),
+            },
+            'students': {'by_status': by_status, 'by_class': by_class},
+            'attendance': {
+                'marked': sum(attendance.values()),
+                'counts': attendance,
+                'by_class': attendance_by_class,
+            },
+            'recent_payments': [dict(row) for row in payments],
+            'recent_admissions': recent_admissions,
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -881,8 +3661,11 @@ def get_dashboard_stats():
 # ===========================
 
 @app.route('/health', methods=['GET'])
+@no_compress
 def health_check():
-    return jsonify({'status': 'ok', 'message': 'School Admin Portal API is running'})
+    # `events`: /api/events is served (asgi.py); otherwise clients keep polling this
+    return jsonify({'status': 'ok', 'message': 'School Admin Portal API is running',
+                    'events': bool(request.environ.get('school.async_events'))})
 
 
 # ===========================
@@ -895,19 +3678,244 @@ from flask import send_from_directory
 
 FRONTEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
 
+# The frontend is read into memory once at startup: every file gets a
+# content fingerprint and gzip/brotli variants, and the HTML pages are
+# rewritten to reference the fingerprinted asset names (style.3f2a9c1b7d.css)
+# which are served with an immutable Cache-Control.  Restart the server after
+# editing the frontend, or set FRONTEND_CACHE=0 to serve straight from disk.
+FRONTEND_CACHE = os.environ.get('FRONTEND_CACHE', '1') != '0'
+STATIC_MIN_COMPRESS_BYTES = 1024
+STATIC_COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+STATIC_EXCLUDE = ('.py', '.backup')
+STATIC_IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_ASSET_REF = re.compile(r"""((?:href|src)=["'])([^"':?#]+)(["'])""")
+
+
+class StaticFile:
+    def __init__(self, path, data):
+        self.path = path
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.set_content(data)
+
+    def set_content(self, data):
+        self.fingerprint = hashlib.sha1(data).hexdigest()[:10]
+        self.variants = {None: data}
+        if len(data) >= STATIC_MIN_COMPRESS_BYTES and self.mimetype.startswith(STATIC_COMPRESSIBLE):
+            compressed = {'gzip': gzip.compress(data, 9, mtime=0)}
+            if brotli is not None:
+                compressed['br'] = brotli.compress(data)
+            for encoding, body in compressed.items():
+                if len(body) < len(data):
+                    self.variants[encoding] = body
+
+    @property
+    def fingerprinted_path(self):
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{self.fingerprint}{ext}"
+
+
+def load_frontend(directory):
+    """Map URL path -> StaticFile for every servable file under directory"""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.startswith('.') or name.endswith(STATIC_EXCLUDE):
+                continue
+            full = os.path.join(root, name)
+            path = os.path.relpath(full, directory).replace(os.sep, '/')
+            with open(full, 'rb') as f:
+                files[path] = StaticFile(path, f.read())
+
+    # point HTML pages at the fingerprinted asset URLs
+    for page in files.values():
+        if page.mimetype != 'text/html':
+            continue
+        base = posixpath.dirname(page.path)
+
+        def fingerprint(match):
+            target = files.get(posixpath.normpath(posixpath.join(base, match.group(2))))
+            if target is None or target.mimetype == 'text/html':
+                return match.group(0)
+            ref = posixpath.relpath(target.fingerprinted_path, base or '.')
+            return f"{match.group(1)}{ref}{match.group(3)}"
+
+        page.set_content(_ASSET_REF.sub(fingerprint, page.variants[None].decode('utf-8')).encode('utf-8'))
+
+    for static in list(files.values()):
+        if static.mimetype != 'text/html':
+            files[static.fingerprinted_path] = static
+    return files
+
+
+frontend_files = load_frontend(FRONTEND_DIR) if FRONTEND_CACHE else {}
+
+
+def _serve_static(static, immutable):
+    encoding = None
+    for candidate in ('br', 'gzip'):
+        if candidate in static.variants and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+    response = Response(static.variants[encoding], mimetype=static.mimetype)
+    response.set_etag(static.fingerprint + (f"-{encoding}" if encoding else ''))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if len(static.variants) > 1:
+        response.vary.add('Accept-Encoding')
+    # HTML (and assets requested by their plain name) revalidate every time
+    response.headers['Cache-Control'] = STATIC_IMMUTABLE if immutable else 'no-cache'
+    return response.make_conditional(request)
+
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve_frontend(path):
     # if requested file exists in the frontend folder, return it;
     # otherwise fall back to index.html so client-side routing continues
-    if path and os.path.isfile(os.path.join(FRONTEND_DIR, path)):
-        return send_from_directory(FRONTEND_DIR, path)
-    return send_from_directory(FRONTEND_DIR, 'index.html')
+    if not FRONTEND_CACHE:
+        if path and os.path.isfile(os.path.join(FRONTEND_DIR, path)):
+            return send_from_directory(FRONTEND_DIR, path)
+        return send_from_directory(FRONTEND_DIR, 'index.html')
+    static = frontend_files.get(path)
+    if static is None:
+        return _serve_static(frontend_files['index.html'], immutable=False)
+    return _serve_static(static, immutable=path != static.path)
 
 # ===========================
 # THERMAL PRINTER RECEIPT ENDPOINTS
 # ===========================
 
+# Single-byte code page the printers are set to (cp437 is the ESC/POS power-on
+# default); characters it can't represent print as "?"
+THERMAL_ENCODING = os.environ.get('THERMAL_ENCODING', 'cp437')
+RECEIPT_BATCH_MAX = int(os.environ.get('RECEIPT_BATCH_MAX', 500))
+ESCPOS_MIMETYPE = 'application/octet-stream'
+
+
+class EscPosTemplate:
+    """ESC/POS document compiled once into static byte runs and {field} slots.
+
+    Parts are raw command bytes or text with str.format-style fields; the
+    literal text is encoded at compile time so render() only encodes the
+    variable values.
+    """
+
+    def __init__(self, *parts, encoding=THERMAL_ENCODING):
+        self.encoding = encoding
+        self.segments = []
+        formatter = string.Formatter()
+        for part in parts:
+            if isinstance(part, bytes):
+                self._literal(part)
+                continue
+            for literal, field, spec, _ in formatter.parse(part):
+                self._literal(literal.encode(encoding, 'replace'))
+                if field is not None:
+                    self.segments.append((field, spec))
+
+    def _literal(self, data):
+        if not data:
+            return
+        if self.segments and isinstance(self.segments[-1], bytes):
+            self.segments[-1] += data
+        else:
+            self.segments.append(data)
+
+    def render(self, fields):
+        out = []
+        for segment in self.segments:
+            if isinstance(segment, bytes):
+                out.append(segment)
+            else:
+                name, spec = segment
+                out.append(format(fields[name], spec).encode(self.encoding, 'replace'))
+        return b''.join(out)
+
+
+ESC_RESET = b'\x1b\x40'
+ESC_ALIGN_LEFT = b'\x1b\x61\x00'
+ESC_ALIGN_CENTER = b'\x1b\x61\x01'
+ESC_TEXT_LARGE = b'\x1b\x21\x08'
+ESC_TEXT_NORMAL = b'\x1b\x21\x00'
+ESC_PARTIAL_CUT = b'\x1d\x56\x41'
+
+# 32 columns: the width of 58mm paper (80mm paper fits 42-48)
+THERMAL_RECEIPT = EscPosTemplate(
+    ESC_RESET,
+    ESC_ALIGN_CENTER,
+    ESC_TEXT_LARGE, "KHUSHI PUBLIC SCHOOL\n", ESC_TEXT_NORMAL,
+    "Fee Receipt\n"
+    "================================\n",
+    ESC_ALIGN_LEFT,
+    "\n"
+    "Receipt No.: {receipt_number}\n"
+    "Date: {payment_date}\n"
+    "Student: {student_name}\n"
+    "Admission No.: {roll_no}\n"
+    "\n"
+    "--------------------------------\n"
+    "Purpose: {purpose}\n"
+    "Amount: Rs. {amount:,.2f}\n"
+    "Method: {payment_method}\n"
+    "--------------------------------\n"
+    "\n",
+    ESC_ALIGN_CENTER,
+    "Thank You!\n"
+    "For Payment\n"
+    "\n"
+    "(Original Receipt)\n"
+    "\n"
+    "================================\n",
+    ESC_PARTIAL_CUT,
+    b'\n\n\n',
+)
+
+_RECEIPT_QUERY = """
+    SELECT p.id AS payment_id, p.amount, p.payment_date, p.payment_method, p.purpose,
+           p.student_id, p.updated_at, s.name AS student_name, s.roll_no,
+           s.updated_at AS student_updated_at
+    FROM payments p
+    LEFT JOIN students s ON p.student_id = s.id
+"""
+
+
+def _requested_payment_id(data):
+    """payment_id from a request body as an int, or None if it wasn't sent"""
+    payment_id = data.get('payment_id')
+    if payment_id is None or payment_id == '':
+        return None
+    if isinstance(payment_id, bool) or not str(payment_id).strip().isdigit():
+        raise ValueError('payment_id must be a number')
+    return int(payment_id)
+
+
+def _receipt_fields(data):
+    """Fill in defaults for the variable parts of a receipt"""
+    payment_id = _requested_payment_id(data)
+    return {
+        'receipt_number': data.get('receipt_number') or
+                          (f"RCP-{payment_id:05d}" if payment_id is not None else 'N/A'),
+        'payment_date': data.get('payment_date') or datetime.now().strftime('%d-%m-%Y'),
+        'student_name': data.get('student_name') or 'N/A',
+        'roll_no': data.get('roll_no') or 'N/A',
+        'amount': float(data.get('amount') or 0),
+        'payment_method': data.get('payment_method') or 'N/A',
+        'purpose': data.get('purpose') or 'School Fee',
+    }
+
+
+def _load_receipts(conn, payment_ids):
+    """Receipt rows for payment_ids keyed by id (missing ids are absent)"""
+    placeholders = ','.join('?' * len(payment_ids))
+    rows = conn.execute(f"{_RECEIPT_QUERY} WHERE p.id IN ({placeholders})", payment_ids).fetchall()
+    return {row['payment_id']: dict(row) for row in rows}
+
+
+def _wants_raw_receipt():
+    return request.args.get('format') == 'raw' or request.accept_mimetypes.best == ESCPOS_MIMETYPE
+
+
 @app.route('/api/receipt/thermal', methods=['POST'])
 def generate_thermal_receipt():
     """
@@ -924,75 +3932,31 @@ def generate_thermal_receipt():
         "receipt_number": "RCP001",
         "payment_date": "2026-02-26"
     }
+
+    With a payment_id the details are read from the payment record and
+    any other fields sent are ignored; without one the posted fields are
+    printed as-is. With "Accept: application/octet-stream" (or ?format=raw)
+    the raw ESC/POS bytes are returned instead of the JSON wrapper, which
+    is the only form to send to a printer.
     """
     try:
         data = request.json
-        
-        # ESC/POS commands for thermal printer (80mm width)
-        receipt = []
-        
-        # Initialize printer
-        receipt.append(b'\x1b\x40')  # Reset printer
-        
-        # Center align
-        receipt.append(b'\x1b\x61\x01')  # Center text
-        
-        # Header - School Name
-        receipt.append(b'\x1b\x21\x08')  # Large text
-        receipt.append("KHUSHI PUBLIC SCHOOL\n".encode('utf-8'))
-        receipt.append(b'\x1b\x21\x00')  # Normal text
-        
-        # Address
-        receipt.append("Fee Receipt\n".encode('utf-8'))
-        receipt.append("================================\n".encode('utf-8'))
-        
-        # Left align for details
-        receipt.append(b'\x1b\x61\x00')  # Left align
-        receipt.append("\n".encode('utf-8'))
-        
-        # Receipt details
-        receipt_num = data.get('receipt_number', 'N/A')
-        payment_date = data.get('payment_date', datetime.now().strftime('%d-%m-%Y'))
-        student_name = data.get('student_name', 'N/A')
-        roll_no = data.get('roll_no', 'N/A')
-        amount = data.get('amount', 0)
-        method = data.get('payment_method', 'N/A')
-        purpose = data.get('purpose', 'School Fee')
-        
-        # Details
-        receipt.append(f"Receipt No.: {receipt_num}\n".encode('utf-8'))
-        receipt.append(f"Date: {payment_date}\n".encode('utf-8'))
-        receipt.append(f"Student: {student_name}\n".encode('utf-8'))
-        receipt.append(f"Admission No.: {roll_no}\n".encode('utf-8'))
-        receipt.append("\n".encode('utf-8'))
-        
-        # Item details
-        receipt.append("--------------------------------\n".encode('utf-8'))
-        receipt.append(f"Purpose: {purpose}\n".encode('utf-8'))
-        receipt.append(f"Amount: Rs. {amount:,.2f}\n".encode('utf-8'))
-        receipt.append(f"Method: {method}\n".encode('utf-8'))
-        receipt.append("--------------------------------\n".encode('utf-8'))
-        receipt.append("\n".encode('utf-8'))
-        
-        # Center align for signature
-        receipt.append(b'\x1b\x61\x01')  # Center
-        receipt.append("Thank You!\n".encode('utf-8'))
-        receipt.append("For Payment\n".encode('utf-8'))
-        receipt.append("\n".encode('utf-8'))
-        receipt.append("(Original Receipt)\n".encode('utf-8'))
-        receipt.append("\n".encode('utf-8'))
-        receipt.append("================================\n".encode('utf-8'))
-        
-        # Cut paper
-        receipt.append(b'\x1d\x56\x41')  # Partial cut
-        receipt.append(b'\n\n\n')
-        
-        # Combine all bytes
-        receipt_data = b''.join(receipt)
+        payment_id = _requested_payment_id(data)
+        if payment_id is not None:
+            conn = get_db()
+            data = _load_receipts(conn, [payment_id]).get(payment_id)
+            conn.close()
+            if not data:
+                return jsonify({'error': 'Payment not found'}), 404
+
+        receipt_data = THERMAL_RECEIPT.render(_receipt_fields(data))
+        if _wants_raw_receipt():
+            return Response(receipt_data, mimetype=ESCPOS_MIMETYPE)
         
         return jsonify({
             'success': True,
-            'receipt': receipt_data.decode('latin-1'),  # Send as string for JavaScript
+            # for display/preview; decoded with the printer's code page
+            'receipt': receipt_data.decode(THERMAL_RECEIPT.encoding, 'replace'),
             'message': 'Receipt generated successfully'
         })
         
@@ -1000,189 +3964,200 @@ def generate_thermal_receipt():
         return jsonify({'error': str(e)}), 400
 
 
+@app.route('/api/receipt/thermal/batch', methods=['POST'])
+def generate_thermal_receipt_batch():
+    """
+    Render receipts for many payments into a single ESC/POS print job
+    (end-of-day reprints).
+
+    Request body: {"payment_ids": [1, 2, 3]}  or  {"payment_date": "2026-02-26"}
+
+    Receipts are printed in the order given (by id for a date); ids that
+    don't exist are listed in the X-Missing-Payment-Ids header.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        conn = get_db()
+        if data.get('payment_date'):
+            rows = conn.execute(f"{_RECEIPT_QUERY} WHERE p.payment_date = ? ORDER BY p.id LIMIT ?",
+                                (data['payment_date'], RECEIPT_BATCH_MAX + 1)).fetchall()
+            payment_ids = [row['payment_id'] for row in rows]
+            records = {row['payment_id']: dict(row) for row in rows}
+        else:
+            payment_ids = [int(pid) for pid in data.get('payment_ids') or []]
+            records = _load_receipts(conn, payment_ids) if 0 < len(payment_ids) <= RECEIPT_BATCH_MAX else {}
+        conn.close()
+
+        if not payment_ids:
+            return jsonify({'error': 'payment_ids or payment_date is required'}), 400
+        if len(payment_ids) > RECEIPT_BATCH_MAX:
+            return jsonify({'error': f'At most {RECEIPT_BATCH_MAX} receipts per batch'}), 400
+
+        missing = [pid for pid in payment_ids if pid not in records]
+        job = b''.join(THERMAL_RECEIPT.render(_receipt_fields(records[pid]))
+                       for pid in payment_ids if pid in records)
+        if not job:
+            return jsonify({'error': 'No matching payments', 'missing': missing}), 404
+
+        response = Response(job, mimetype=ESCPOS_MIMETYPE)
+        response.headers['X-Receipt-Count'] = str(len(payment_ids) - len(missing))
+        if missing:
+            response.headers['X-Missing-Payment-Ids'] = ','.join(map(str, missing))
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+# ===========================
+# HTML RECEIPTS
+# ===========================
+
+# Rendered receipts are keyed by (payment id, payment updated_at, student
+# updated_at), so a reprint of an unchanged payment is a dictionary lookup.
+RECEIPT_CACHE_SIZE = int(os.environ.get('RECEIPT_CACHE_SIZE', 5000))
+RECEIPT_CACHE_MAX_BYTES = int(os.environ.get('RECEIPT_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+RECEIPT_CACHE_TTL = float(os.environ.get('RECEIPT_CACHE_TTL', 3600))
+
+receipt_cache = EntityCache(RECEIPT_CACHE_SIZE, RECEIPT_CACHE_MAX_BYTES, RECEIPT_CACHE_TTL)
+
+with open(os.path.join(FRONTEND_DIR, 'receipt.css'), 'rb') as _css:
+    RECEIPT_CSS = _css.read()
+RECEIPT_CSS_VERSION = hashlib.sha1(RECEIPT_CSS).hexdigest()[:12]
+
+# compiled once; Flask's environment autoescapes string templates
+RECEIPT_TEMPLATE = app.jinja_env.from_string("""\
+<div class="receipt">
+    <div class="header">
+        <h1>KHUSHI PUBLIC SCHOOL</h1>
+        <p>Fee Receipt</p>
+    </div>
+    <div class="details">
+        <div class="detail-row"><span class="label">Receipt No.:</span><span class="value">{{ receipt_number }}</span></div>
+        <div class="detail-row"><span class="label">Date:</span><span class="value">{{ payment_date }}</span></div>
+    </div>
+    <div class="separator"></div>
+    <div class="details">
+        <div class="detail-row"><span class="label">Student Name:</span><span class="value">{{ student_name }}</span></div>
+        <div class="detail-row"><span class="label">Admission No.:</span><span class="value">{{ roll_no }}</span></div>
+    </div>
+    <div class="separator"></div>
+    <div class="details">
+        <div class="detail-row"><span class="label">Purpose:</span><span class="value">{{ purpose }}</span></div>
+        <div class="detail-row"><span class="label">Method:</span><span class="value">{{ payment_method }}</span></div>
+    </div>
+    <div class="separator"></div>
+    <div class="amount-section">
+        <div>Amount Paid</div>
+        <div class="amount">Rs. {{ '{:,.2f}'.format(amount) }}</div>
+    </div>
+    <div class="footer">
+        <p>Thank You For Payment</p>
+        <div class="original">(Original Receipt)</div>
+    </div>
+</div>
+""")
+
+RECEIPT_PAGE_TEMPLATE = app.jinja_env.from_string("""\
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{{ title }}</title>
+    <link rel="stylesheet" href="{{ css_url }}">
+</head>
+<body>
+    <button class="print-button no-print" onclick="window.print()">Print {{ 'Receipts' if count > 1 else 'Receipt' }}</button>
+{{ receipts }}
+</body>
+</html>
+""")
+
+
+def _render_receipt(record):
+    """Receipt fragment for a payments/students row, from receipt_cache if unchanged"""
+    key = ('receipt', record['payment_id'], record['updated_at'], record['student_updated_at'])
+    html = receipt_cache.get(key)
+    if html is None:
+        html = RECEIPT_TEMPLATE.render(_receipt_fields(record))
+        receipt_cache.set(key, html, [('payment', record['payment_id']), ('student', record['student_id'])])
+    return html
+
+
+def _receipt_page(fragments, title):
+    page = RECEIPT_PAGE_TEMPLATE.render(
+        title=title,
+        # absolute: the page is often written with document.write() into a
+        # blank window opened by a frontend on another origin
+        css_url=url_for('receipt_css', v=RECEIPT_CSS_VERSION, _external=True),
+        count=len(fragments),
+        receipts=Markup(''.join(fragments)),
+    )
+    return page, 200, {'Content-Type': 'text/html; charset=utf-8'}
+
+
+@app.route('/api/receipt/receipt.css', methods=['GET'])
+def receipt_css():
+    """Receipt stylesheet; the ?v= fingerprint lets browsers cache it forever"""
+    response = Response(RECEIPT_CSS, mimetype='text/css')
+    response.set_etag(RECEIPT_CSS_VERSION)
+    if request.args.get('v') == RECEIPT_CSS_VERSION:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response.make_conditional(request)
+
+
 @app.route('/api/receipt/html', methods=['POST'])
 def generate_html_receipt():
-    """Generate HTML receipt for browser printing"""
+    """Generate HTML receipt for browser printing.
+
+    With a payment_id the stored payment is printed (same as
+    GET /api/receipt/html/N) and any other fields sent are ignored;
+    without one the posted fields are rendered as-is, for receipts that
+    only exist in the browser.
+    """
     try:
         data = request.json
-        
-        receipt_num = data.get('receipt_number', 'N/A')
-        payment_date = data.get('payment_date', datetime.now().strftime('%d-%m-%Y'))
-        student_name = data.get('student_name', 'N/A')
-        roll_no = data.get('roll_no', 'N/A')
-        amount = data.get('amount', 0)
-        method = data.get('payment_method', 'N/A')
-        purpose = data.get('purpose', 'School Fee')
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <title>Receipt #{receipt_num}</title>
-            <style>
-                * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-                body {{ 
-                    font-family: 'Courier New', monospace; 
-                    background: white;
-                    padding: 20px;
-                }}
-                .receipt {{
-                    width: 80mm;
-                    max-width: 100%;
-                    margin: 0 auto;
-                    border: 1px solid #333;
-                    padding: 15px;
-                    background: white;
-                    line-height: 1.6;
-                    font-size: 12px;
-                }}
-                .header {{
-                    text-align: center;
-                    margin-bottom: 10px;
-                    border-bottom: 1px dashed #333;
-                    padding-bottom: 10px;
-                }}
-                .header h1 {{
-                    font-size: 14px;
-                    font-weight: bold;
-                    margin-bottom: 5px;
-                }}
-                .header p {{
-                    font-size: 11px;
-                    margin: 2px 0;
-                }}
-                .details {{
-                    margin: 10px 0;
-                }}
-                .detail-row {{
-                    display: flex;
-                    justify-content: space-between;
-                    margin: 4px 0;
-                    font-size: 11px;
-                }}
-                .label {{
-                    font-weight: bold;
-                    width: 60%;
-                }}
-                .value {{
-                    text-align: right;
-                    width: 40%;
-                }}
-                .separator {{
-                    border-top: 1px dashed #333;
-                    margin: 10px 0;
-                }}
-                .amount-section {{
-                    margin: 10px 0;
-                    text-align: center;
-                    font-weight: bold;
-                }}
-                .amount {{
-                    font-size: 16px;
-                    margin: 5px 0;
-                }}
-                .footer {{
-                    text-align: center;
-                    margin-top: 15px;
-                    font-size: 10px;
-                    border-top: 1px dashed #333;
-                    padding-top: 10px;
-                }}
-                .original {{
-                    text-align: center;
-                    font-size: 9px;
-                    margin-top: 5px;
-                    font-weight: bold;
-                }}
-                @media print {{
-                    body {{ padding: 0; }}
-                    .receipt {{ border: none; width: 80mm; margin: 0; }}
-                    .no-print {{ display: none; }}
-                }}
-                .print-button {{
-                    display: block;
-                    margin: 20px auto;
-                    padding: 10px 20px;
-                    background: #007bff;
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    cursor: pointer;
-                    font-size: 14px;
-                }}
-                .print-button:hover {{
-                    background: #0056b3;
-                }}
-            </style>
-        </head>
-        <body>
-            <button class="print-button no-print" onclick="window.print()">Print Receipt</button>
-            
-            <div class="receipt">
-                <div class="header">
-                    <h1>KHUSHI PUBLIC SCHOOL</h1>
-                    <p>Fee Receipt</p>
-                </div>
-                
-                <div class="details">
-                    <div class="detail-row">
-                        <span class="label">Receipt No.:</span>
-                        <span class="value">{receipt_num}</span>
-                    </div>
-                    <div class="detail-row">
-                        <span class="label">Date:</span>
-                        <span class="value">{payment_date}</span>
-                    </div>
-                </div>
-                
-                <div class="separator"></div>
-                
-                <div class="details">
-                    <div class="detail-row">
-                        <span class="label">Student Name:</span>
-                        <span class="value">{student_name}</span>
-                    </div>
-                    <div class="detail-row">
-                        <span class="label">Admission No.:</span>
-                        <span class="value">{roll_no}</span>
-                    </div>
-                </div>
-                
-                <div class="separator"></div>
-                
-                <div class="details">
-                    <div class="detail-row">
-                        <span class="label">Purpose:</span>
-                        <span class="value">{purpose}</span>
-                    </div>
-                    <div class="detail-row">
-                        <span class="label">Method:</span>
-                        <span class="value">{method}</span>
-                    </div>
-                </div>
-                
-                <div class="separator"></div>
-                
-                <div class="amount-section">
-                    <div>Amount Paid</div>
-                    <div class="amount">Rs. {amount:,.2f}</div>
-                </div>
-                
-                <div class="footer">
-                    <p>Thank You For Payment</p>
-                    <div class="original">(Original Receipt)</div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html_content, 200, {'Content-Type': 'text/html; charset=utf-8'}
+        payment_id = _requested_payment_id(data)
+        if payment_id is not None:
+            return get_html_receipt(payment_id)
+
+        fields = _receipt_fields(data)
+        return _receipt_page([RECEIPT_TEMPLATE.render(fields)], f"Receipt #{fields['receipt_number']}")
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+
+@app.route('/api/receipt/html/<int:payment_id>', methods=['GET'])
+def get_html_receipt(payment_id):
+    """Printable receipt for a stored payment"""
+    conn = get_db()
+    record = _load_receipts(conn, [payment_id]).get(payment_id)
+    conn.close()
+    if not record:
+        return jsonify({'error': 'Payment not found'}), 404
+    return _receipt_page([_render_receipt(record)], f"Receipt #RCP-{payment_id:05d}")
+
+
+@app.route('/api/receipt/html/range', methods=['GET'])
+def get_html_receipt_range():
+    """One printable page with every payment between ?from= and ?to= (inclusive)"""
+    date_from = request.args.get('from')
+    date_to = request.args.get('to') or date_from
+    if not date_from:
+        return jsonify({'error': 'from (YYYY-MM-DD) is required'}), 400
+
+    conn = get_db()
+    rows = conn.execute(f"{_RECEIPT_QUERY} WHERE p.payment_date BETWEEN ? AND ? ORDER BY p.payment_date, p.id LIMIT ?",
+                        (date_from, date_to, RECEIPT_BATCH_MAX + 1)).fetchall()
+    conn.close()
+    if len(rows) > RECEIPT_BATCH_MAX:
+        return jsonify({'error': f'More than {RECEIPT_BATCH_MAX} payments in range; narrow the dates'}), 400
+    if not rows:
+        return jsonify({'error': 'No payments in range'}), 404
+    return _receipt_page([_render_receipt(dict(row)) for row in rows], f"Receipts {date_from} to {date_to}")
+
 @app.route('/', methods=['GET'])
 def index():
     return jsonify({
@@ -1191,7 +4166,9 @@ def index():
         'docs': 'See DATABASE_API.md for API documentation'
     })
 
+# create tables/indexes at import so gunicorn workers get them too
+init_db()
+
 if __name__ == '__main__':
-    init_db()
     port = int(os.environ.get('PORT', 5000))
     app.run(port=port, debug=os.environ.get('FLASK_ENV') == 'development')
@@ -0,0 +1,254 @@
+"""
+ASGI entry point for the school API.
+
+Serves the Flask app from 01_app.py from an asyncio server (uvicorn).
+Accepting connections, reading request bodies and writing responses all
+happen on the event loop, so an idle keep-alive connection or a client on a
+slow mobile link costs a socket and a few KB instead of a whole worker.
+Only the Flask handler itself runs on a bounded thread pool (ASGI_THREADS,
+default DB_POOL_SIZE), which also bounds how many requests use SQLite at
+once.  A thread is held while a response chunk is being produced, never
+while a client reads it.  Request bodies up to ASGI_BUFFER_BODY bytes
+(default 1 MiB, which covers every JSON and form request) are read on the
+event loop before the handler is dispatched, so a slow client does not hold
+a thread while it sends them.  Larger bodies are handed to Flask as they
+arrive, so streamed CSV imports stay streamed; the limit is that the pool
+thread then waits on the client for the rest of the upload, so at most
+ASGI_THREADS slow large uploads can be in progress before other requests
+queue.  /api/events subscribers are served from the event loop entirely
+once Flask has produced the opening frames.
+
+This is an opt-in alternative to the default `gunicorn 01_app:app` in the
+Procfile.  Run (from backend/):
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker -w 2 --bind 0.0.0.0:$PORT
+
+`python benchmark.py serve` compares this with the default sync workers.
+"""
+
+import asyncio
+import contextvars
+import importlib
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+school_app = importlib.import_module('01_app')
+flask_app = school_app.app
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', school_app.DB_POOL_SIZE))
+# request body bytes read on the event loop before a pool thread is used
+ASGI_BUFFER_BODY = int(os.environ.get('ASGI_BUFFER_BODY', 1024 * 1024))
+
+_executor = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix='asgi')
+_DONE = object()
+
+
+class _RequestBody(io.RawIOBase):
+    """wsgi.input that pulls http.request messages from the event loop as Flask reads.
+
+    buffer() first takes up to ASGI_BUFFER_BODY bytes on the event loop.
+    Whatever is left is read on a pool thread; each refill waits for the
+    next chunk the client sends, so a large upload is never held in memory
+    whole.
+    """
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._chunk = memoryview(b'')
+        self.done = False
+
+    def readable(self):
+        return True
+
+    async def buffer(self, limit):
+        """Receive up to `limit` bytes (the whole body if smaller) on the event loop.
+
+        Returns False if the client disconnected before that.
+        """
+        chunks = []
+        size = 0
+        while not self.done and size < limit:
+            message = await self._receive()
+            if message['type'] == 'http.disconnect':
+                self.done = True
+                return False
+            chunks.append(message.get('body', b''))
+            size += len(chunks[-1])
+            self.done = not message.get('more_body', False)
+        self._chunk = memoryview(b''.join(chunks))
+        return True
+
+    def _fill(self):
+        message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+        if message['type'] == 'http.disconnect':
+            # a half-received import must fail (and roll back), not look complete
+            self.done = True
+            raise OSError('client disconnected while sending the request body')
+        self._chunk = memoryview(message.get('body', b''))
+        self.done = not message.get('more_body', False)
+
+    def readinto(self, buffer):
+        while not self._chunk and not self.done:
+            self._fill()
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+
+def _environ(scope, body):
+    """WSGI environ for an ASGI http scope; `body` is its _RequestBody"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI carries paths as latin-1 decoded bytes
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BufferedReader(body, 64 * 1024),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        # tells event_stream() that _stream_events() will take over
+        'school.async_events': True,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    if 'CONTENT_LENGTH' not in environ:
+        # chunked upload: the stream ends with the last http.request message
+        environ['wsgi.input_terminated'] = True
+    return environ
+
+
+def _start(environ):
+    """Call the Flask app and pull its first body chunk (runs on the pool)"""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+    result = flask_app(environ, start_response)
+    iterator = iter(result)
+    return started, result, iterator, next(iterator, _DONE)
+
+
+async def _stream_events(send, disconnected, cursor):
+    """Push school_app.events to one /api/events client until it leaves or the stream expires"""
+    bus = school_app.events
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+
+    def listener():
+        loop.call_soon_threadsafe(wake.set)
+
+    bus.subscribe(listener)
+    deadline = loop.time() + school_app.EVENTS_STREAM_SECONDS
+    try:
+        while not disconnected.done() and loop.time() < deadline:
+            wake.clear()
+            pending, cursor, lost = bus.since(cursor)
+            if pending or lost:
+                await send({'type': 'http.response.body', 'body': bus.frames(pending, cursor, lost), 'more_body': True})
+                continue
+            woken = asyncio.ensure_future(wake.wait())
+            await asyncio.wait((woken, disconnected), return_when=asyncio.FIRST_COMPLETED,
+                               timeout=max(0, min(school_app.EVENTS_HEARTBEAT, deadline - loop.time())))
+            if not woken.done():
+                woken.cancel()
+                if not disconnected.done():
+                    await send({'type': 'http.response.body', 'body': bus.frames([], cursor, False), 'more_body': True})
+    finally:
+        bus.unsubscribe(listener)
+
+
+async def _wait_disconnect(receive, body):
+    """Resolves when the client goes away; drops any body Flask left unread"""
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.done = True
+            return
+
+
+async def _close(call, result):
+    # ends the Flask request context (teardown handlers, pooled connections)
+    if hasattr(result, 'close'):
+        await call(result.close)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            _executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    loop = asyncio.get_running_loop()
+    body = _RequestBody(receive, loop)
+    # every step of one request runs in the same context, whichever pool
+    # thread picks it up: Flask's request context lives in context variables
+    context = contextvars.copy_context()
+
+    def call(fn, *args):
+        return loop.run_in_executor(_executor, context.run, fn, *args)
+
+    if not await body.buffer(ASGI_BUFFER_BODY):
+        return  # nobody left to answer
+    started, result, iterator, chunk = await call(_start, _environ(scope, body))
+    # uvicorn drops writes to a closed connection silently; stop producing a
+    # streamed list as soon as the client goes away.  Only started now: until
+    # Flask has answered, receive() belongs to the request body.
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive, body))
+    # event_stream() hands /api/events over to _stream_events() with this header
+    event_cursor = dict(started['headers']).get(b'x-event-cursor')
+    if event_cursor is not None:
+        started['headers'] = [(k, v) for k, v in started['headers'] if k not in (b'x-event-cursor', b'content-length')]
+        event_cursor = int(event_cursor)
+    try:
+        await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+        while chunk is not _DONE and not disconnected.done():
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            chunk = await call(next, iterator, _DONE)
+        if event_cursor is not None:
+            await _close(call, result)
+            result = None
+            await _stream_events(send, disconnected, event_cursor)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnected.cancel()
+        await _close(call, result)
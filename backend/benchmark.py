@@ -0,0 +1,464 @@
+"""
+Micro-benchmarks for the school API.
+
+Each scenario loads 01_app.py against a throw-away SQLite file seeded with
+synthetic data and drives it in-process through Flask's test client, so the
+numbers reflect handler + database cost without network noise.
+
+Usage:
+    python benchmark.py pool [--students 2000] [--payments 10000] [--threads 8] [--seconds 5]
+    python benchmark.py stream [--students 2000] [--payments 50000] [--days 100]
+    python benchmark.py login [--users 20] [--login-threads 8] [--read-threads 4] [--seconds 5]
+    python benchmark.py compress [--students 2000] [--payments 10000] [--days 20] [--requests 20]
+    python benchmark.py serve [--students 2000] [--payments 10000] [--slow 500] [--seconds 10] [--modes sync gthread asgi]
+    python benchmark.py events [--subscribers 1000] [--writes 20]
+
+`serve` and `events` are the exceptions: they start real gunicorn servers
+(see asgi.py) and talk to them over sockets, because what they measure is
+the server model.
+"""
+
+import argparse
+import datetime
+import http.client
+import importlib.util
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_app(db_path, **env):
+    """Import 01_app.py with DATABASE_URL pointed at db_path (the schema is created on import)"""
+    os.environ['DATABASE_URL'] = db_path
+    for key, value in env.items():
+        os.environ[key] = str(value)
+    spec = importlib.util.spec_from_file_location("school_app", os.path.join(HERE, "01_app.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def seed(db_path, students, payments, attendance_days=0):
+    conn = sqlite3.connect(db_path)
+    rng = random.Random(42)
+    conn.executemany(
+        """INSERT INTO students (roll_no, name, email, phone, class_name, section,
+               address, father_name, mother_name, admission_date, status)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'Active')""",
+        [(f"R{i:06d}", f"Student {i}", f"s{i}@school.com", f"98{i:08d}",
+          str(rng.randint(1, 12)), rng.choice('ABCD'), f"{i} Main Road",
+          f"Father {i}", f"Mother {i}", "2024-04-01") for i in range(1, students + 1)])
+    conn.executemany(
+        """INSERT INTO payments (student_id, amount, payment_date, payment_method,
+               transaction_id, purpose, status)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        [(rng.randint(1, students), rng.choice([500, 1000, 2500, 5000]),
+          f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", rng.choice(['Cash', 'UPI']),
+          f"TXN{i:07d}", "Tuition Fee", rng.choice(['Completed', 'Completed', 'Pending']))
+         for i in range(1, payments + 1)])
+    start = datetime.date(2025, 1, 1)
+    for day in range(attendance_days):
+        date = (start + datetime.timedelta(days=day)).isoformat()
+        conn.executemany(
+            "INSERT INTO attendance (student_id, attendance_date, status) VALUES (?, ?, ?)",
+            [(sid, date, rng.choice(['Present'] * 8 + ['Absent', 'Leave']))
+             for sid in range(1, students + 1)])
+    conn.commit()
+    conn.close()
+
+
+def legacy_get_db(mod):
+    """The original connect-per-call get_db(), for before/after comparisons"""
+    def get_db():
+        conn = sqlite3.connect(mod.DB_PATH, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+    return get_db
+
+
+def measure(app, path, threads, seconds):
+    """Hammer `path` from `threads` workers for `seconds`; return requests/sec"""
+    stop = time.perf_counter() + seconds
+    counts = [0] * threads
+
+    def worker(idx):
+        client = app.test_client()
+        while time.perf_counter() < stop:
+            resp = client.get(path)
+            assert resp.status_code == 200, resp.status_code
+            counts[idx] += 1
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return sum(counts) / (time.perf_counter() - started)
+
+
+def bench_pool(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        mod = load_app(db_path, DB_POOL_SIZE=args.threads)
+        seed(db_path, args.students, args.payments)
+        pooled_get_db = mod.get_db
+
+        print(f"{args.students} students, {args.payments} payments, "
+              f"{args.threads} threads, {args.seconds}s per run\n")
+        print(f"{'endpoint':<20}{'before req/s':>15}{'after req/s':>15}{'speedup':>10}")
+        for path in args.paths:
+            mod.get_db = legacy_get_db(mod)
+            before = measure(mod.app, path, args.threads, args.seconds)
+            mod.get_db = pooled_get_db
+            after = measure(mod.app, path, args.threads, args.seconds)
+            print(f"{path:<20}{before:>15.1f}{after:>15.1f}{after / before:>9.2f}x")
+        mod._pool.close_all()
+
+
+def peak_memory(app, path, headers=None):
+    """Fetch `path`, consuming the body chunk by chunk; return (peak bytes, body bytes)"""
+    client = app.test_client()
+    tracemalloc.start()
+    resp = client.get(path, headers=headers or {}, buffered=False)
+    size = 0
+    for chunk in resp.response:
+        size += len(chunk)
+    resp.close()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, size
+
+
+def bench_stream(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        mod = load_app(db_path)
+        seed(db_path, args.students, args.payments, args.days)
+
+        print(f"{args.students} students, {args.payments} payments, {args.days} days of attendance\n")
+        print(f"{'endpoint':<20}{'body MB':>10}{'buffered peak MB':>20}{'streamed peak MB':>20}")
+        for path in ('/api/students', '/api/attendance', '/api/payments'):
+            buffered, size = peak_memory(mod.app, path)
+            streamed, _ = peak_memory(mod.app, path, {'Accept': 'application/x-ndjson'})
+            print(f"{path:<20}{size / 2**20:>10.1f}{buffered / 2**20:>20.1f}{streamed / 2**20:>20.1f}")
+        mod._pool.close_all()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return float('nan')
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def login_storm(mod, users, login_threads, read_threads, seconds):
+    """Log in continuously while readers hit a cheap endpoint; return latency samples (ms)"""
+    stop = time.perf_counter() + seconds
+    logins, reads, busy = [], [], [0]
+
+    def login_worker(idx):
+        client = mod.app.test_client()
+        while time.perf_counter() < stop:
+            user = f"user{(idx + len(logins)) % users}"
+            started = time.perf_counter()
+            resp = client.post('/api/auth/login', json={'username': user, 'password': 'password1'})
+            if resp.status_code == 503:
+                busy[0] += 1
+                continue
+            assert resp.status_code == 200, resp.status_code
+            logins.append((time.perf_counter() - started) * 1000)
+
+    def read_worker():
+        client = mod.app.test_client()
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            assert client.get('/api/students/1').status_code == 200
+            reads.append((time.perf_counter() - started) * 1000)
+
+    pool = [threading.Thread(target=login_worker, args=(i,)) for i in range(login_threads)]
+    pool += [threading.Thread(target=read_worker) for _ in range(read_threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return logins, reads, busy[0]
+
+
+def bench_login(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        mod = load_app(db_path, ENTITY_CACHE_SIZE=0)
+        seed(db_path, 100, 0)
+        client = mod.app.test_client()
+        for i in range(args.users):
+            client.post('/api/auth/register', json={'username': f"user{i}", 'email': f"user{i}@school.com",
+                                                    'password': 'password1'})
+        bounded = mod._run_password_job
+
+        print(f"{args.login_threads} login threads, {args.read_threads} reader threads, {args.seconds}s per run, "
+              f"{mod.PASSWORD_HASH_WORKERS} hash workers\n")
+        print(f"{'hashing':<10}{'logins':>8}{'503s':>6}{'login p50':>11}{'login p99':>11}"
+              f"{'read p50':>10}{'read p99':>10}")
+        for label, runner in (('inline', lambda fn, *a: fn(*a)), ('bounded', bounded)):
+            mod._run_password_job = runner
+            logins, reads, busy = login_storm(mod, args.users, args.login_threads, args.read_threads, args.seconds)
+            print(f"{label:<10}{len(logins):>8}{busy:>6}{percentile(logins, 50):>9.1f}ms{percentile(logins, 99):>9.1f}ms"
+                  f"{percentile(reads, 50):>8.1f}ms{percentile(reads, 99):>8.1f}ms")
+        mod._run_password_job = bounded
+        mod._pool.close_all()
+
+
+def bench_compress(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        mod = load_app(db_path, ENTITY_CACHE_SIZE=0)
+        seed(db_path, args.students, args.payments, args.days)
+        client = mod.app.test_client()
+
+        print(f"{args.students} students, {args.payments} payments, {args.days} days of attendance, "
+              f"{args.requests} requests per cell (CPU = process time per request)\n")
+        print(f"{'endpoint':<20}{'encoding':<10}{'KB on wire':>12}{'ratio':>8}{'CPU ms':>10}{'+ms':>8}")
+        for path in ('/api/students', '/api/attendance', '/api/payments'):
+            baseline = None
+            for encoding in ('identity',) + mod.COMPRESS_ENCODINGS:
+                headers = {'Accept-Encoding': encoding}
+                size = len(client.get(path, headers=headers).data)
+                started = time.process_time()
+                for _ in range(args.requests):
+                    client.get(path, headers=headers).close()
+                cpu = (time.process_time() - started) * 1000 / args.requests
+                if baseline is None:
+                    baseline, full = cpu, size
+                print(f"{path:<20}{encoding:<10}{size / 1024:>12.1f}{full / size:>7.1f}x{cpu:>10.1f}{cpu - baseline:>8.1f}")
+        mod._pool.close_all()
+
+
+# gunicorn command lines compared by `serve`; all run two worker processes
+SERVE_MODES = {
+    'sync': ['gunicorn', '-w', '2', '01_app:app'],
+    'gthread': ['gunicorn', '-w', '2', '-k', 'gthread', '--threads', '8', '01_app:app'],
+    'asgi': ['gunicorn', '-w', '2', '-k', 'uvicorn.workers.UvicornWorker', 'asgi:app'],
+}
+
+
+def process_tree_rss(pid):
+    """Resident memory (bytes) of pid and all its descendants, from /proc"""
+    total, pending = 0, [pid]
+    while pending:
+        pid = pending.pop()
+        try:
+            with open(f"/proc/{pid}/status") as fh:
+                total += next(int(line.split()[1]) * 1024 for line in fh if line.startswith('VmRSS:'))
+            for task in os.listdir(f"/proc/{pid}/task"):
+                with open(f"/proc/{pid}/task/{task}/children") as fh:
+                    pending += [int(child) for child in fh.read().split()]
+        except (OSError, StopIteration):
+            pass
+    return total
+
+
+def wait_for_server(port, proc, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+def slow_clients(port, count, stop):
+    """Open `count` connections that trickle a never-ending request header, one line per second"""
+    socks = []
+    for i in range(count):
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\n")
+        socks.append(sock)
+
+    def trickle():
+        while not stop.wait(1):
+            for sock in socks:
+                try:
+                    sock.sendall(b"X-Slow: 1\r\n")
+                except OSError:
+                    pass
+        for sock in socks:
+            sock.close()
+
+    thread = threading.Thread(target=trickle)
+    thread.start()
+    return thread
+
+
+def probe(port, path, seconds, timeout=5):
+    """Fetch `path` on fresh connections for `seconds`; return (latencies ms, failures)"""
+    latencies, failures = [], 0
+    stop = time.perf_counter() + seconds
+    while time.perf_counter() < stop:
+        started = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+            conn.request('GET', path)
+            resp = conn.getresponse()
+            resp.read()
+            conn.close()
+            if resp.status != 200:
+                raise OSError(resp.status)
+            latencies.append((time.perf_counter() - started) * 1000)
+        except OSError:
+            failures += 1
+    return latencies, failures
+
+
+def bench_serve(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        mod = load_app(db_path)
+        seed(db_path, args.students, args.payments)
+        mod._pool.close_all()
+
+        print(f"{args.students} students, {args.payments} payments; {args.slow} slow clients trickling headers "
+              f"while {args.path} is fetched for {args.seconds}s (5s timeout)\n")
+        print(f"{'server':<10}{'idle MB':>9}{'loaded MB':>11}{'ok':>6}{'failed':>8}{'p50 ms':>9}{'p99 ms':>9}")
+        for port, name in enumerate(args.modes, start=args.port):
+            proc = subprocess.Popen(SERVE_MODES[name] + ['--bind', f"127.0.0.1:{port}"], cwd=HERE,
+                                    env=dict(os.environ, DATABASE_URL=db_path),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_for_server(port, proc)
+                idle = process_tree_rss(proc.pid)
+                stop = threading.Event()
+                trickler = slow_clients(port, args.slow, stop)
+                time.sleep(2)
+                latencies, failures = probe(port, args.path, args.seconds)
+                loaded = process_tree_rss(proc.pid)
+                stop.set()
+                trickler.join()
+            finally:
+                proc.terminate()
+                proc.wait()
+            print(f"{name:<10}{idle / 2**20:>9.1f}{loaded / 2**20:>11.1f}{len(latencies):>6}{failures:>8}"
+                  f"{percentile(latencies, 50):>9.1f}{percentile(latencies, 99):>9.1f}")
+
+
+def bench_events(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        mod = load_app(db_path)
+        seed(db_path, 100, 0)
+        mod._pool.close_all()
+
+        port = args.port
+        # one worker: the event bus is per process
+        proc = subprocess.Popen(SERVE_MODES['asgi'] + ['-w', '1', '--bind', f"127.0.0.1:{port}"], cwd=HERE,
+                                env=dict(os.environ, DATABASE_URL=db_path),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_server(port, proc)
+            idle = process_tree_rss(proc.pid)
+            socks = []
+            for _ in range(args.subscribers):
+                sock = socket.create_connection(('127.0.0.1', port))
+                sock.sendall(b"GET /api/events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                socks.append(sock)
+            for sock in socks:
+                while b'event: hello' not in sock.recv(65536):
+                    pass
+            loaded = process_tree_rss(proc.pid)
+
+            writer = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            delays = []
+            for i in range(args.writes):
+                started = time.perf_counter()
+                writer.request('POST', '/api/payments', body=json.dumps({
+                    'student_id': 1, 'amount': 500, 'payment_date': '2025-06-01',
+                    'transaction_id': f"EVT{i}", 'purpose': 'Tuition Fee'}),
+                    headers={'Content-Type': 'application/json'})
+                writer.getresponse().read()
+                for sock in socks:
+                    while b'payment.created' not in sock.recv(65536):
+                        pass
+                delays.append((time.perf_counter() - started) * 1000)
+            for sock in socks:
+                sock.close()
+        finally:
+            proc.terminate()
+            proc.wait()
+
+        print(f"asgi server (-w 1), {args.subscribers} open /api/events streams, {args.writes} payments\n")
+        print(f"{'idle MB':>9}{'subscribed MB':>15}{'KB/subscriber':>15}{'fan-out p50 ms':>16}{'p99 ms':>9}")
+        print(f"{idle / 2**20:>9.1f}{loaded / 2**20:>15.1f}{(loaded - idle) / 1024 / args.subscribers:>15.1f}"
+              f"{percentile(delays, 50):>16.1f}{percentile(delays, 99):>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='scenario', required=True)
+
+    pool = sub.add_parser('pool', help='connect-per-request vs pooled WAL connections')
+    pool.add_argument('--students', type=int, default=2000)
+    pool.add_argument('--payments', type=int, default=10000)
+    pool.add_argument('--threads', type=int, default=8)
+    pool.add_argument('--seconds', type=float, default=5)
+    pool.add_argument('--paths', nargs='+', default=['/api/students', '/api/payments'])
+    pool.set_defaults(func=bench_pool)
+
+    stream = sub.add_parser('stream', help='peak memory of buffered vs streamed list responses')
+    stream.add_argument('--students', type=int, default=2000)
+    stream.add_argument('--payments', type=int, default=50000)
+    stream.add_argument('--days', type=int, default=100)
+    stream.set_defaults(func=bench_stream)
+
+    login = sub.add_parser('login', help='login latency and read latency with inline vs bounded password hashing')
+    login.add_argument('--users', type=int, default=20)
+    login.add_argument('--login-threads', type=int, default=8)
+    login.add_argument('--read-threads', type=int, default=4)
+    login.add_argument('--seconds', type=float, default=5)
+    login.set_defaults(func=bench_login)
+
+    compress = sub.add_parser('compress', help='bytes on the wire and CPU per request for each Content-Encoding')
+    compress.add_argument('--students', type=int, default=2000)
+    compress.add_argument('--payments', type=int, default=10000)
+    compress.add_argument('--days', type=int, default=20)
+    compress.add_argument('--requests', type=int, default=20)
+    compress.set_defaults(func=bench_compress)
+
+    serve = sub.add_parser('serve', help='fast requests while slow clients hold connections, per server model')
+    serve.add_argument('--students', type=int, default=2000)
+    serve.add_argument('--payments', type=int, default=10000)
+    serve.add_argument('--slow', type=int, default=500)
+    serve.add_argument('--seconds', type=float, default=10)
+    serve.add_argument('--path', default='/api/stats/dashboard')
+    serve.add_argument('--port', type=int, default=5100)
+    serve.add_argument('--modes', nargs='+', default=list(SERVE_MODES), choices=list(SERVE_MODES))
+    serve.set_defaults(func=bench_serve)
+
+    events = sub.add_parser('events', help='memory per /api/events subscriber and time to reach all of them')
+    events.add_argument('--subscribers', type=int, default=1000)
+    events.add_argument('--writes', type=int, default=20)
+    events.add_argument('--port', type=int, default=5100)
+    events.set_defaults(func=bench_events)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
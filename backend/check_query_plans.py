@@ -0,0 +1,186 @@
+"""
+Query-plan regression check for 01_app.py.
+
+Builds a large synthetic database, drives the API endpoints listed in
+ENDPOINTS through Flask's test client while tracing every SQL statement the
+handlers run, then runs EXPLAIN QUERY PLAN on each statement.  Exits
+non-zero if a hot query does a full SCAN (of the table or of a whole
+index) instead of an index SEARCH, i.e. an index in INDEXES (01_app.py)
+is missing or a query stopped being able to use one.
+
+Usage:
+    python check_query_plans.py [--students 20000] [--payments 100000] [--days 60] [-v]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+
+from benchmark import load_app, seed
+
+# (method, path, json body, tables allowed to be scanned in full)
+# Full-list endpoints legitimately read a whole table; everything else must
+# be served by an index.
+ENDPOINTS = [
+    ('GET', '/api/students', None, {'students'}),
+    # first page walks the roll_no index but stops after LIMIT rows
+    ('GET', '/api/students?limit=50', None, {'students'}),
+    ('GET', '/api/students?limit=50&cursor=UjAwNTAwMA==', None, set()),
+    ('GET', '/api/students?limit=50&class_name=10&section=A', None, set()),
+    ('GET', '/api/students/1', None, set()),
+    ('GET', '/api/parents', None, {'parents'}),
+    ('GET', '/api/parents/1', None, set()),
+    ('GET', '/api/teachers', None, {'teachers'}),
+    ('GET', '/api/teachers/1', None, set()),
+    ('GET', '/api/attendance?date=2025-01-15', None, set()),
+    ('GET', '/api/attendance?student_id=7', None, set()),
+    ('GET', '/api/payments', None, {'payments'}),
+    ('GET', '/api/payments?status=Pending', None, set()),
+    ('GET', '/api/payments?student_id=7', None, set()),
+    ('GET', '/api/payments/1', None, set()),
+    # stats_counters is a handful of rows maintained by triggers
+    ('GET', '/api/stats/dashboard', None, {'stats_counters'}),
+    ('PUT', '/api/payments/1', {'amount': 10, 'payment_date': '2025-01-01', 'status': 'Completed'}, set()),
+    ('PUT', '/api/attendance/1', {'status': 'Present'}, set()),
+    ('POST', '/api/attendance/batch', {'class_name': '10', 'section': 'A', 'attendance_date': '2025-01-15',
+                                       'default_status': 'P'}, set()),
+    ('POST', '/api/receipt/thermal/batch', {'payment_ids': [1, 2, 3]}, set()),
+    ('POST', '/api/receipt/thermal/batch', {'payment_date': '2025-01-15'}, set()),
+    ('GET', '/api/receipt/html/1', None, set()),
+    ('GET', '/api/receipt/html/range?from=2025-01-15&to=2025-01-16', None, set()),
+    # whole months come from the (small) attendance_monthly rollup
+    ('GET', '/api/attendance/summary?group_by=month&from=2025-01-10&to=2025-02-20', None, {'attendance_monthly'}),
+    ('GET', '/api/attendance/summary?group_by=class', None, {'attendance_monthly', 'students'}),
+    ('GET', '/api/attendance/summary?group_by=student&class_name=10&section=A&from=2025-01-10', None, set()),
+    ('GET', '/api/attendance/summary?group_by=month&student_id=7', None, set()),
+    ('GET', '/api/fees/ledger/7', None, set()),
+    ('GET', '/api/fees/dues?class_name=10', None, set()),
+    ('GET', '/api/fees/dues?class_name=10&section=A&from=2025-01&to=2025-03', None, set()),
+    # walks idx_fee_balances_due from the top and stops after LIMIT rows
+    ('GET', '/api/fees/defaulters?limit=50', None, {'fee_balances'}),
+    ('GET', '/api/fees/defaulters?class_name=10&limit=50', None, set()),
+    # FTS5 lookups always plan as a SCAN of the virtual table, even when
+    # they use its index
+    ('GET', '/api/search?q=stud&limit=8', None, {'search_index'}),
+    ('GET', '/api/sync?since=100&limit=500', None, set()),
+    # aggregate tables (a few rows per class), one day of attendance, and
+    # payments/admissions walked newest-first from their indexes until LIMIT
+    ('GET', '/api/dashboard/bootstrap?date=2025-01-15', None,
+     {'stats_counters', 'stats_student_groups', 'payments', 'students'}),
+    # the roll_no index is built from one pass over students; existing
+    # payments are found through idx_payments_transaction
+    ('POST', '/api/payments/bulk?dry_run=1', [
+        {'transaction_id': 'TXN0000007', 'status': 'Completed'},
+        {'transaction_id': 'NEW0000001', 'roll_no': 'R000007', 'amount': 10, 'payment_date': '2025-01-15'},
+    ], {'students'}),
+    ('DELETE', '/api/parents/1', None, set()),
+]
+
+SKIP_PREFIXES = ('PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK', 'CREATE', 'INSERT', 'SAVEPOINT', 'RELEASE')
+
+
+def capture_statements(mod, method, path, body):
+    """Run one request and return the SQL statements it executed"""
+    statements = []
+    connect = mod._pool._connect
+
+    def traced_connect():
+        conn = connect()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    # drop idle connections so every statement goes through a traced one
+    mod._pool.close_all()
+    mod._pool._connect = traced_connect
+    try:
+        resp = mod.app.test_client().open(path, method=method, json=body)
+    finally:
+        mod._pool._connect = connect
+        mod._pool.close_all()
+    if resp.status_code >= 500:
+        raise RuntimeError(f"{method} {path} -> {resp.status_code}")
+    # "-- ..." lines are statements run internally by triggers and virtual
+    # tables; FTS5 also reads its small config table ('main'.'..._config')
+    return [sql for sql in statements
+            if not sql.lstrip().upper().startswith(SKIP_PREFIXES)
+            and not sql.startswith('--') and "FROM 'main'." not in sql]
+
+
+def full_scans(conn, sql):
+    """Return (plan lines, tables/aliases read by a full scan) for a statement"""
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    scanned = set()
+    # reading a subquery's or CTE's own (already filtered) result is not a table scan
+    derived = {detail.split()[1] for detail in plan if detail.split()[0] in ('CO-ROUTINE', 'MATERIALIZE')}
+    aliases = table_aliases(sql)
+    for detail in plan:
+        words = detail.split()
+        # any SCAN walks the whole table or a whole index; SEARCH is a seek
+        if words[:1] == ['SCAN'] and not {words[1], aliases.get(words[1])} & derived:
+            scanned.add(words[1])
+    return plan, scanned
+
+
+def table_aliases(sql):
+    """Map aliases used in the statement ("p", "s") back to table names"""
+    words = sql.replace(',', ' ').split()
+    aliases = {}
+    for i, word in enumerate(words[:-1]):
+        if word.upper() in ('FROM', 'JOIN', 'UPDATE'):
+            table = words[i + 1]
+            aliases[table] = table
+            if i + 2 < len(words) and words[i + 2].upper() not in ('WHERE', 'ON', 'JOIN', 'ORDER', 'SET', 'GROUP', 'LIMIT'):
+                aliases[words[i + 2]] = table
+    return aliases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--payments', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=60, help='days of attendance to generate')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print every query plan')
+    args = parser.parse_args(argv)
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "plans.db")
+        mod = load_app(db_path)
+        seed(db_path, args.students, args.payments, args.days)
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO parents (name) VALUES ('Parent 1')")
+        conn.execute("UPDATE students SET parent_id = 1 WHERE id IN (1, 2)")
+        conn.executemany(
+            "INSERT INTO fee_structures (class_name, fee_head, amount, frequency, start_month) VALUES (?, ?, ?, ?, ?)",
+            [(str(n), head, amount, frequency, '2024-04') for n in range(1, 13)
+             for head, amount, frequency in (('Tuition', 1500, 'monthly'), ('Exam', 500, 'quarterly'))])
+        conn.commit()
+        # same statistics a long-running deployment would have
+        conn.execute("ANALYZE")
+
+        for method, path, body, allowed in ENDPOINTS:
+            for sql in capture_statements(mod, method, path, body):
+                plan, scanned = full_scans(conn, sql)
+                aliases = table_aliases(sql)
+                bad = {aliases.get(t, t) for t in scanned} - allowed
+                status = 'FAIL' if bad else 'ok'
+                if bad or args.verbose:
+                    print(f"[{status}] {method} {path}\n    {' '.join(sql.split())}")
+                    for line in plan:
+                        print(f"      {line}")
+                if bad:
+                    failures += 1
+                    print(f"    full table scan on: {', '.join(sorted(bad))}\n")
+        conn.close()
+
+    if failures:
+        print(f"\n❌ {failures} hot quer{'y' if failures == 1 else 'ies'} fell back to a full table scan")
+        return 1
+    print(f"✅ All queries for {len(ENDPOINTS)} endpoints use indexes")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
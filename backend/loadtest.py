@@ -0,0 +1,268 @@
+"""
+Load-test harness for the school API.
+
+Replays a weighted mix of realistic user actions (dashboard loads, attendance
+bursts, fee entry at the counter, CSV imports, student lookups) from a pool
+of closed-loop worker threads, then reports throughput and latency
+percentiles per action.  A scenario's latency covers all of its requests,
+the way a user experiences it.
+
+By default the app is loaded in-process against a throw-away database filled
+by database/load_sample_data.py.  Pass --url to drive a running server
+(gunicorn, Railway...) over HTTP instead; its existing data is used.
+
+Usage:
+    python loadtest.py [--mix school-day] [--threads 8] [--seconds 30] [--students 2000] [--years 1]
+    python loadtest.py --url http://localhost:5000 --mix fee-counter --threads 16 --seconds 60
+    python loadtest.py --list
+"""
+
+import argparse
+import datetime
+import http.client
+import importlib.util
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from benchmark import load_app, percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# action -> weight; weights are relative within a mix
+MIXES = {
+    'school-day': {'dashboard': 15, 'student_lookup': 40, 'attendance_burst': 10, 'fee_entry': 25,
+                   'payment_history': 9, 'csv_import': 1},
+    'morning-attendance': {'attendance_burst': 70, 'dashboard': 20, 'student_lookup': 10},
+    'fee-counter': {'fee_entry': 60, 'payment_history': 20, 'student_lookup': 15, 'dashboard': 5},
+    'admissions': {'csv_import': 10, 'student_lookup': 60, 'dashboard': 30},
+}
+
+CSV_IMPORT_ROWS = 200
+
+
+class LocalClient:
+    """Flask test client with the same interface as HttpClient"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, content_type='application/json'):
+        data = json.dumps(body) if content_type == 'application/json' and body is not None else body
+        resp = self.client.open(path, method=method, data=data, content_type=content_type)
+        payload = resp.get_data()
+        return resp.status_code, payload
+
+
+class HttpClient:
+    """Keep-alive HTTP/1.1 connection to a running server"""
+
+    def __init__(self, base_url):
+        url = urllib.parse.urlsplit(base_url)
+        self.conn_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = url.netloc
+        self.prefix = url.path.rstrip('/')
+        self.conn = None
+
+    def request(self, method, path, body=None, content_type='application/json'):
+        if body is not None and content_type == 'application/json':
+            body = json.dumps(body)
+        headers = {'Content-Type': content_type} if body is not None else {}
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = self.conn_class(self.netloc, timeout=30)
+            try:
+                self.conn.request(method, self.prefix + path, body=body, headers=headers)
+                resp = self.conn.getresponse()
+                return resp.status, resp.read()
+            except (http.client.HTTPException, OSError):
+                # server closed the keep-alive connection; reconnect once
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+class Context:
+    """What the scenarios need to know about the dataset"""
+
+    def __init__(self, client):
+        status, body = client.request('GET', '/api/students')
+        if status != 200:
+            raise RuntimeError(f"GET /api/students -> {status}")
+        self.students = json.loads(body)
+        if not self.students:
+            raise RuntimeError("the target has no students; load data first")
+        self.rosters = {}
+        for s in self.students:
+            self.rosters.setdefault((s['class_name'], s['section']), []).append(s['roll_no'])
+        self.sections = sorted(k for k in self.rosters if k[0] and k[1])
+        self.today = datetime.date.today().isoformat()
+        self.txn = 0
+        self.lock = threading.Lock()
+
+    def next_txn(self):
+        with self.lock:
+            self.txn += 1
+            return f"LT{os.getpid()}-{time.time_ns()}-{self.txn}"
+
+
+# Each scenario returns the status codes of the requests it made.
+
+def dashboard(client, ctx, rng):
+    # what loadDashboardData() in script.js fetches
+    return [client.request('GET', f'/api/dashboard/bootstrap?date={ctx.today}')[0]]
+
+
+def student_lookup(client, ctx, rng):
+    class_name, section = rng.choice(ctx.sections)
+    student = rng.choice(ctx.students)
+    return [
+        client.request('GET', f'/api/students?limit=50&class_name={class_name}&section={section}')[0],
+        client.request('GET', f"/api/students/{student['id']}")[0],
+    ]
+
+
+def attendance_burst(client, ctx, rng):
+    class_name, section = rng.choice(ctx.sections)
+    absent = rng.sample(ctx.rosters[(class_name, section)], k=min(3, len(ctx.rosters[(class_name, section)])))
+    return [client.request('POST', '/api/attendance/batch', {
+        'class_name': class_name, 'section': section, 'attendance_date': ctx.today,
+        'default_status': 'P', 'statuses': {roll: 'A' for roll in absent}})[0]]
+
+
+def fee_entry(client, ctx, rng):
+    student = rng.choice(ctx.students)
+    statuses = [client.request('GET', f"/api/students/{student['id']}")[0]]
+    status, body = client.request('POST', '/api/payments', {
+        'student_id': student['id'], 'amount': rng.choice([1500, 2000, 2500]), 'payment_date': ctx.today,
+        'payment_method': rng.choice(['Cash', 'UPI']), 'transaction_id': ctx.next_txn(),
+        'purpose': 'Tuition Fee', 'status': 'Completed'})
+    statuses.append(status)
+    if status == 201:
+        statuses.append(client.request('GET', f"/api/receipt/html/{json.loads(body)['id']}")[0])
+    return statuses
+
+
+def payment_history(client, ctx, rng):
+    student = rng.choice(ctx.students)
+    return [client.request('GET', f"/api/payments?student_id={student['id']}")[0]]
+
+
+def csv_import(client, ctx, rng):
+    # re-import a slice of existing students with updated phone numbers
+    rows = rng.sample(ctx.students, k=min(CSV_IMPORT_ROWS, len(ctx.students)))
+    lines = ['roll_no,name,class_name,section,phone']
+    lines += [f"{s['roll_no']},{s['name']},{s['class_name']},{s['section']},9{rng.randint(100000000, 999999999)}"
+              for s in rows]
+    return [client.request('POST', '/api/students/bulk', '\n'.join(lines), content_type='text/csv')[0]]
+
+
+SCENARIOS = {fn.__name__: fn for fn in (dashboard, student_lookup, attendance_burst, fee_entry,
+                                        payment_history, csv_import)}
+
+
+def run(make_client, mix, threads, seconds, seed=0):
+    """Drive `mix` from `threads` workers; return ({scenario: [ms]}, {scenario: errors}, wall seconds)"""
+    ctx = Context(make_client())
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def worker(idx):
+        rng = random.Random(seed * 1000 + idx)
+        client = make_client()
+        while time.perf_counter() < stop:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                failed = any(status >= 400 for status in SCENARIOS[name](client, ctx, rng))
+            except Exception:
+                failed = True
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies[name].append(elapsed)
+                errors[name] += failed
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def report(latencies, errors, wall):
+    print(f"{'scenario':<20}{'count':>8}{'errors':>8}{'per s':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    everything = []
+    for name, samples in latencies.items():
+        everything += samples
+        if not samples:
+            continue
+        print(f"{name:<20}{len(samples):>8}{errors[name]:>8}{len(samples) / wall:>8.1f}"
+              f"{percentile(samples, 50):>9.1f}{percentile(samples, 90):>9.1f}{percentile(samples, 99):>9.1f}"
+              f"{max(samples):>9.1f}")
+    print(f"{'TOTAL':<20}{len(everything):>8}{sum(errors.values()):>8}{len(everything) / wall:>8.1f}"
+          f"{percentile(everything, 50):>9.1f}{percentile(everything, 90):>9.1f}{percentile(everything, 99):>9.1f}"
+          f"{max(everything, default=0):>9.1f}")
+
+
+def load_generator():
+    path = os.path.join(HERE, '..', 'database', 'load_sample_data.py')
+    spec = importlib.util.spec_from_file_location("load_sample_data", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mix', default='school-day', choices=sorted(MIXES))
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--url', help='base URL of a running server (default: in-process)')
+    parser.add_argument('--students', type=int, default=2000, help='in-process dataset size')
+    parser.add_argument('--years', type=int, default=1, help='in-process attendance/fee history')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--list', action='store_true', help='show the traffic mixes and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, mix in MIXES.items():
+            total = sum(mix.values())
+            print(f"{name}: " + ', '.join(f"{s} {w * 100 / total:.0f}%" for s, w in mix.items()))
+        return 0
+
+    mix = MIXES[args.mix]
+    if args.url:
+        print(f"mix {args.mix}, {args.threads} threads, {args.seconds}s against {args.url}\n")
+        report(*run(lambda: HttpClient(args.url), mix, args.threads, args.seconds, args.seed))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "load.db")
+        mod = load_app(db_path, DB_POOL_SIZE=args.threads)
+        conn = sqlite3.connect(db_path)
+        with conn:
+            counts = load_generator().generate(conn, args.students, args.years, args.seed or 42)
+        conn.execute("ANALYZE")
+        conn.close()
+        print(f"mix {args.mix}, {args.threads} threads, {args.seconds}s in-process; dataset: "
+              + ', '.join(f"{n:,} {t}" for t, n in counts.items()) + "\n")
+        report(*run(lambda: LocalClient(mod.app), mix, args.threads, args.seconds, args.seed))
+        mod._pool.close_all()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from benchmark import load_app  # noqa: E402
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Load 01_app.py against a throw-away database; each call is a separate
+    app instance (its own pool and caches), like another gunicorn worker"""
+    db_path = str(tmp_path / 'school.db')
+    monkeypatch.setenv('DATABASE_URL', db_path)
+    monkeypatch.setenv('PASSWORD_ITERATIONS', '1000')
+    loaded = []
+
+    def factory():
+        mod = load_app(db_path)
+        loaded.append(mod)
+        return mod
+
+    yield factory
+    for mod in loaded:
+        mod._pool.close_all()
@@ -0,0 +1,83 @@
+import asyncio
+import importlib
+import json
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def asgi(make_app, monkeypatch):
+    # make_app points DATABASE_URL at a throw-away database
+    for name in ('asgi', '01_app'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module('asgi')
+    yield module
+    module.school_app._pool.close_all()
+
+
+def _request(asgi, body_chunks, disconnect_after=None):
+    """POST a student through asgi.app; returns (messages sent, whether Flask was called)"""
+    scope = {'type': 'http', 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+             'path': '/api/students', 'root_path': '', 'query_string': b'',
+             'headers': [(b'content-type', b'application/json')]}
+    sent = []
+    flask_called = []
+    start = asgi._start
+
+    def recording_start(environ):
+        # how much of the body had arrived when a pool thread took over
+        flask_called.append(environ['wsgi.input'].raw.done)
+        return start(environ)
+
+    async def run():
+        messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(body_chunks) - 1}
+                    for i, chunk in enumerate(body_chunks)]
+        gone = asyncio.Event()
+        if disconnect_after is not None:
+            messages = messages[:disconnect_after]
+            gone.set()
+
+        async def receive():
+            if messages:
+                await asyncio.sleep(0.01)  # a slow client
+                return messages.pop(0)
+            await gone.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body'):
+                gone.set()
+
+        await asgi.app(scope, receive, send)
+
+    asgi._start = recording_start
+    try:
+        asyncio.run(run())
+    finally:
+        asgi._start = start
+    return sent, flask_called
+
+
+def _json_chunks(size):
+    body = json.dumps({'roll_no': 'R1', 'name': 'Priya', 'class_name': '5', 'section': 'A'}).encode()
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def test_small_body_is_read_before_dispatch(asgi):
+    sent, flask_called = _request(asgi, _json_chunks(8))
+    assert flask_called == [True]
+    assert sent[0]['status'] == 201
+
+
+def test_large_body_is_streamed_to_flask(asgi, monkeypatch):
+    monkeypatch.setattr(asgi, 'ASGI_BUFFER_BODY', 16)
+    sent, flask_called = _request(asgi, _json_chunks(8))
+    assert flask_called == [False]
+    assert sent[0]['status'] == 201
+
+
+def test_disconnect_while_buffering_skips_the_handler(asgi):
+    sent, flask_called = _request(asgi, _json_chunks(8), disconnect_after=2)
+    assert sent == [] and flask_called == []
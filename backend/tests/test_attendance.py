@@ -0,0 +1,43 @@
+import pytest
+
+
+@pytest.fixture
+def client(make_app):
+    client = make_app().app.test_client()
+    for roll_no in ('1001', '1002'):
+        client.post('/api/students', json={'roll_no': roll_no, 'name': f'Student {roll_no}',
+                                           'class_name': 'X', 'section': 'A', 'status': 'Active'})
+    return client
+
+
+def _remarks(client, date):
+    rows = client.get(f'/api/attendance?date={date}').get_json()
+    return {row['roll_no']: (row['status'], row['remarks']) for row in rows}
+
+
+def test_batch_remark_survives_re_marking_without_remarks(client):
+    register = {'class_name': 'X', 'section': 'A', 'attendance_date': '2026-02-26', 'default_status': 'P'}
+    first = client.post('/api/attendance/batch', json={**register, 'statuses': {'1002': 'L'},
+                                                       'remarks': {'1002': 'Medical'}})
+    assert first.get_json()['inserted'] == 2
+
+    again = client.post('/api/attendance/batch', json={**register, 'statuses': {'1002': 'A'}})
+    assert again.get_json()['updated'] == 1
+    assert again.get_json()['unchanged'] == 1
+    assert _remarks(client, '2026-02-26')['1002'] == ('Absent', 'Medical')
+
+    client.post('/api/attendance/batch', json={**register, 'statuses': {'1002': 'A'}, 'remarks': {'1002': ''}})
+    assert _remarks(client, '2026-02-26')['1002'] == ('Absent', '')
+
+
+@pytest.mark.parametrize('attendance_date', ['2026-2-26', '26/02/2026', '2026-02-30', '20260226', 'today'])
+def test_batch_rejects_non_iso_dates(client, attendance_date):
+    response = client.post('/api/attendance/batch', json={'class_name': 'X', 'attendance_date': attendance_date,
+                                                          'default_status': 'P'})
+    assert response.status_code == 400
+
+
+def test_batch_accepts_day_first_dates(client):
+    response = client.post('/api/attendance/batch', json={'class_name': 'X', 'attendance_date': '26-02-2026',
+                                                          'default_status': 'P'})
+    assert response.get_json()['attendance_date'] == '2026-02-26'
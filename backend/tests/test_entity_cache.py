@@ -0,0 +1,36 @@
+STUDENT = {'roll_no': 'R1', 'name': 'Priya', 'class_name': '5', 'section': 'A', 'status': 'Active'}
+
+
+def test_write_from_another_worker_is_not_served_stale(make_app):
+    worker_a, worker_b = make_app(), make_app()
+    a, b = worker_a.app.test_client(), worker_b.app.test_client()
+    student_id = a.post('/api/students', json=STUDENT).get_json()['id']
+
+    first = a.get(f'/api/students/{student_id}')
+    assert first.get_json()['name'] == 'Priya'
+    # worker A's cache never hears about this write
+    assert b.put(f'/api/students/{student_id}', json={**STUDENT, 'name': 'Priya Kumari'}).status_code == 200
+
+    second = a.get(f'/api/students/{student_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.get_json()['name'] == 'Priya Kumari'
+    assert second.headers['ETag'] != first.headers['ETag']
+
+    # a client that did not revalidate gets the new body too, never the old
+    # one under the new tag
+    fresh = a.get(f'/api/students/{student_id}')
+    assert fresh.get_json()['name'] == 'Priya Kumari'
+    assert fresh.headers['ETag'] == second.headers['ETag']
+    assert a.get(f'/api/students/{student_id}', headers={'If-None-Match': fresh.headers['ETag']}).status_code == 304
+
+
+def test_embedded_student_change_reaches_cached_payment(make_app):
+    worker_a, worker_b = make_app(), make_app()
+    a, b = worker_a.app.test_client(), worker_b.app.test_client()
+    student_id = a.post('/api/students', json=STUDENT).get_json()['id']
+    payment_id = a.post('/api/payments', json={'student_id': student_id, 'amount': 500,
+                                               'payment_date': '2025-06-01'}).get_json()['id']
+    assert a.get(f'/api/payments/{payment_id}').get_json()['name'] == 'Priya'
+
+    b.put(f'/api/students/{student_id}', json={**STUDENT, 'name': 'Priya Kumari'})
+    assert a.get(f'/api/payments/{payment_id}').get_json()['name'] == 'Priya Kumari'
@@ -0,0 +1,34 @@
+import sqlite3
+from datetime import date
+
+from loadtest import load_generator
+
+END = date(2026, 2, 28)
+
+
+def test_generate_again_after_deletes(make_app, tmp_path):
+    make_app()  # creates the schema
+    generator = load_generator()
+    conn = sqlite3.connect(tmp_path / 'school.db')
+    with conn:
+        generator.generate(conn, students=50, years=0.1, seed=1, end=END)
+        # drop rows from the middle so COUNT(*) no longer matches the numbering
+        conn.execute("DELETE FROM attendance WHERE student_id IN (SELECT id FROM students WHERE roll_no <= 'R000010')")
+        conn.execute("DELETE FROM payments WHERE student_id IN (SELECT id FROM students WHERE roll_no <= 'R000010')")
+        conn.execute("DELETE FROM students WHERE roll_no <= 'R000010'")
+        conn.execute("DELETE FROM teachers WHERE emp_id = 'T0001'")
+        # a hand-entered student whose roll_no sorts after the generated ones
+        conn.execute("INSERT INTO students (roll_no, name, class_name) VALUES ('Z1', 'Walk-in', '5')")
+
+        counts = generator.generate(conn, students=50, years=0.1, seed=2, end=END)
+
+    rolls = [row[0] for row in conn.execute("SELECT roll_no FROM students WHERE roll_no GLOB 'R*' ORDER BY roll_no")]
+    assert rolls == [f"R{n:06d}" for n in range(11, 101)]
+    assert [row[0] for row in conn.execute("SELECT emp_id FROM teachers ORDER BY emp_id")] == ['T0002', 'T0003', 'T0004']
+    # only the new students get attendance and fees from the second run
+    walk_in = conn.execute("SELECT id FROM students WHERE roll_no = 'Z1'").fetchone()[0]
+    assert not conn.execute("SELECT 1 FROM attendance WHERE student_id = ?", (walk_in,)).fetchone()
+    new_students = conn.execute("SELECT COUNT(DISTINCT student_id) FROM payments WHERE student_id > ?",
+                                (walk_in,)).fetchone()[0]
+    assert new_students == counts['students'] == 50
+    conn.close()
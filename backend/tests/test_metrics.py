@@ -0,0 +1,34 @@
+import sqlite3
+
+ADMIN = {'username': 'admin', 'email': 'admin@school.com', 'password': 'secret123', 'full_name': 'Admin'}
+
+
+def _login(client, tmp_path, role='admin'):
+    client.post('/api/auth/register', json=ADMIN)
+    if role != 'admin':
+        with sqlite3.connect(tmp_path / 'school.db') as conn:
+            conn.execute("UPDATE users SET role = ?", (role,))
+    assert client.post('/api/auth/login', json={'username': 'admin', 'password': 'secret123'}).status_code == 200
+
+
+def test_metrics_needs_an_admin(make_app, tmp_path):
+    client = make_app().app.test_client()
+    assert client.get('/metrics').status_code == 401
+    _login(client, tmp_path)
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert b'http_requests_total' in response.data
+
+
+def test_metrics_rejects_other_roles(make_app, tmp_path):
+    client = make_app().app.test_client()
+    _login(client, tmp_path, role='teacher')
+    assert client.get('/metrics').status_code == 403
+
+
+def test_metrics_bearer_token(make_app, monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 's3cret')
+    client = make_app().app.test_client()
+    assert client.get('/metrics', headers={'Authorization': 'Bearer s3cret'}).status_code == 200
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer s3cret…'}).status_code == 401
@@ -0,0 +1,8 @@
+import check_query_plans
+
+
+def test_hot_queries_use_indexes(capsys):
+    # full-size tables so the planner chooses as it would in production;
+    # fewer attendance days keep the run short
+    status = check_query_plans.main(['--days', '10'])
+    assert status == 0, capsys.readouterr().out
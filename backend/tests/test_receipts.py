@@ -0,0 +1,63 @@
+import pytest
+
+STUDENT = {'roll_no': 'R1', 'name': 'Zoë Müller', 'class_name': '5', 'section': 'A', 'status': 'Active'}
+
+
+@pytest.fixture
+def client_and_payment(make_app):
+    client = make_app().app.test_client()
+    student_id = client.post('/api/students', json=STUDENT).get_json()['id']
+    payment_id = client.post('/api/payments', json={'student_id': student_id, 'amount': 500,
+                                                    'payment_date': '2025-06-01',
+                                                    'payment_method': 'Cash'}).get_json()['id']
+    return client, payment_id
+
+
+def test_thermal_receipt_prints_the_stored_payment(client_and_payment):
+    client, payment_id = client_and_payment
+    # a string id, and client fields that disagree with the record
+    response = client.post('/api/receipt/thermal?format=raw',
+                           json={'payment_id': str(payment_id), 'student_name': 'Someone Else', 'amount': 1})
+    assert response.status_code == 200
+    receipt = response.data.decode('cp437')
+    assert f'Receipt No.: RCP-{payment_id:05d}' in receipt
+    assert 'Student: Zoë Müller' in receipt
+    assert 'Amount: Rs. 500.00' in receipt
+    assert 'Someone Else' not in receipt
+
+
+def test_thermal_receipt_rejects_bad_ids(client_and_payment):
+    client, payment_id = client_and_payment
+    assert client.post('/api/receipt/thermal', json={'payment_id': 'abc'}).status_code == 400
+    assert client.post('/api/receipt/thermal', json={'payment_id': payment_id + 1}).status_code == 404
+
+
+def test_thermal_receipt_json_matches_the_printed_text(client_and_payment):
+    client, payment_id = client_and_payment
+    raw = client.post('/api/receipt/thermal?format=raw', json={'payment_id': payment_id}).data
+    text = client.post('/api/receipt/thermal', json={'payment_id': payment_id}).get_json()['receipt']
+    assert 'Student: Zoë Müller' in text
+    assert text.encode('cp437') == raw
+
+
+def test_thermal_receipt_without_payment_id_prints_posted_fields(client_and_payment):
+    client, _ = client_and_payment
+    receipt = client.post('/api/receipt/thermal?format=raw',
+                          json={'student_name': 'Walk-in ₹', 'amount': 20}).data.decode('cp437')
+    assert 'Student: Walk-in ?' in receipt
+    assert 'Receipt No.: N/A' in receipt
+
+
+def test_html_receipt_with_payment_id_uses_the_stored_payment(client_and_payment):
+    client, payment_id = client_and_payment
+    response = client.post('/api/receipt/html', json={'payment_id': payment_id, 'student_name': 'Someone Else',
+                                                      'roll_no': 'X9', 'amount': 1})
+    assert response.status_code == 200
+    assert response.data == client.get(f'/api/receipt/html/{payment_id}').data
+    page = response.get_data(as_text=True)
+    assert 'Zoë Müller' in page
+    assert 'Someone Else' not in page
+
+    assert client.post('/api/receipt/html', json={'payment_id': 'abc', 'student_name': 'x'}).status_code == 400
+    assert client.post('/api/receipt/html', json={'payment_id': payment_id + 1,
+                                                  'student_name': 'x'}).status_code == 404
@@ -0,0 +1,33 @@
+import sqlite3
+
+STUDENT = {'roll_no': 'R1', 'name': 'Priya', 'class_name': '5', 'section': 'A', 'status': 'Active'}
+
+
+def test_sync_lists_only_student_changes(make_app):
+    client = make_app().app.test_client()
+    token = client.get('/api/sync').get_json()['token']
+    student_id = client.post('/api/students', json=STUDENT).get_json()['id']
+    client.post('/api/payments', json={'student_id': student_id, 'amount': 500, 'payment_date': '2025-06-01'})
+    client.post('/api/attendance/batch', json={'class_name': '5', 'attendance_date': '2025-06-02',
+                                               'default_status': 'P'})
+
+    data = client.get(f'/api/sync?since={token}').get_json()
+    assert list(data['changes']) == ['students']
+    assert [row['id'] for row in data['changes']['students']['upserts']] == [student_id]
+
+
+def test_triggers_for_tables_no_longer_synced_are_dropped(make_app, tmp_path):
+    first = make_app()
+    conn = sqlite3.connect(tmp_path / 'school.db')
+    with conn:
+        # what an older version left behind
+        for stmt in first._sync_triggers('payments').values():
+            conn.execute(stmt)
+        conn.execute("INSERT INTO change_log (entity, entity_id, op) VALUES ('payments', 1, 'upsert')")
+
+    make_app()
+    triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert not {name for name in triggers if name.startswith('trg_sync_payments')}
+    assert {name for name in triggers if name.startswith('trg_sync_students')}
+    assert conn.execute("SELECT COUNT(*) FROM change_log WHERE entity != 'students'").fetchone()[0] == 0
+    conn.close()
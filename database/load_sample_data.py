@@ -1,124 +1,284 @@
 """
-Sample data loader for testing the school-admin-portal database
-Run this script to populate the database with demo data
+Synthetic data generator for the school-admin-portal database.
+
+Creates a realistic, reproducible dataset of any size for demos and capacity
+planning: students spread over classes and sections, parents with one to
+three children, teachers, daily attendance for every school day of the last
+N years, and monthly fee payments.  Rows are written with executemany() in
+chunks inside a single transaction.
+
+Usage:
+    python load_sample_data.py                          # 200 students, 1 year
+    python load_sample_data.py --students 5000 --years 3 --reset
+    python load_sample_data.py --db /tmp/load.db --students 20000 --seed 7
 """
 
+import argparse
+import importlib.util
+import os
+import random
 import sqlite3
-import json
-from datetime import datetime, timedelta
+import time
+from datetime import date, timedelta
 
-def load_sample_data():
-    conn = sqlite3.connect('../database/school.db')
-    cursor = conn.cursor()
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(HERE, 'school.db')
+APP_FILE = os.path.join(HERE, '..', 'backend', '01_app.py')
 
-    print("Loading sample data...\n")
-
-    # Sample Students
-    students_data = [
-        ('A001', 'Aarav Singh', 'aarav@school.com', '9876543210', '10', 'A', '2008-05-15', '123 Main St', 'Rajesh Singh', '9876543211'),
-        ('A002', 'Priya Sharma', 'priya@school.com', '9876543212', '10', 'A', '2008-07-22', '456 Oak Ave', 'Sunita Sharma', '9876543213'),
-        ('A003', 'Rohan Patel', 'rohan@school.com', '9876543214', '10', 'B', '2008-03-10', '789 Pine Rd', 'Amit Patel', '9876543215'),
-        ('A004', 'Sara Khan', 'sara@school.com', '9876543216', '9', 'A', '2009-11-05', '321 Elm St', 'Fatima Khan', '9876543217'),
-        ('A005', 'Vikram Verma', 'vikram@school.com', '9876543218', '9', 'B', '2009-01-30', '654 Maple Dr', 'Suresh Verma', '9876543219'),
-    ]
-
-    try:
-        for student in students_data:
-            cursor.execute("""
-                INSERT INTO students (roll_no, name, email, phone, class_name, section, 
-                                     date_of_birth, address, parent_name, parent_phone)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, student)
-        print(f"✓ Added {len(students_data)} sample students")
-    except sqlite3.IntegrityError as e:
-        print(f"⚠ Students already exist: {e}")
-
-    # Sample Teachers
-    teachers_data = [
-        ('T001', 'Mrs. Sharma', 'sharma@school.com', '9876543220', 'Mathematics', 'B.Ed, M.Sc', '2015-06-01', '456 Oak Ave'),
-        ('T002', 'Mr. Verma', 'verma@school.com', '9876543221', 'English', 'B.Ed, M.A', '2017-07-15', '789 Pine Rd'),
-        ('T003', 'Ms. Patel', 'patel@school.com', '9876543222', 'Science', 'B.Ed, B.Sc', '2018-08-20', '321 Elm St'),
-        ('T004', 'Mr. Singh', 'singh@school.com', '9876543223', 'Social Studies', 'B.Ed, M.A Hist', '2019-09-10', '654 Maple Dr'),
-        ('T005', 'Mrs. Khan', 'khan@school.com', '9876543224', 'Hindi', 'B.Ed, M.A Hindi', '2020-10-05', '987 Cedar Ln'),
-    ]
-
-    try:
-        for teacher in teachers_data:
-            cursor.execute("""
-                INSERT INTO teachers (emp_id, name, email, phone, subject, qualification, 
-                                     date_of_joining, address)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, teacher)
-        print(f"✓ Added {len(teachers_data)} sample teachers")
-    except sqlite3.IntegrityError as e:
-        print(f"⚠ Teachers already exist: {e}")
-
-    # Sample Attendance (Last 7 days)
-    attendance_data = []
-    today = datetime.now()
-    statuses = ['Present', 'Absent', 'Leave']
-
-    try:
-        for student_id in range(1, 6):
-            for day_offset in range(7):
-                attendance_date = (today - timedelta(days=day_offset)).strftime('%Y-%m-%d')
-                status = statuses[(student_id + day_offset) % 3]
-                cursor.execute("""
-                    INSERT INTO attendance (student_id, attendance_date, status, remarks)
-                    VALUES (?, ?, ?, ?)
-                """, (student_id, attendance_date, status, 'Regular' if status == 'Present' else ''))
-        print(f"✓ Added attendance records for 35 days (5 students x 7 days)")
-    except sqlite3.IntegrityError as e:
-        print(f"⚠ Attendance records already exist: {e}")
-
-    # Sample Payments
-    payments_data = [
-        (1, 5000, '2024-02-01', 'Bank Transfer', 'TXN001', 'Tuition Fee - January', 'Completed', ''),
-        (1, 5000, '2024-02-26', 'Cash', 'TXN002', 'Tuition Fee - February', 'Completed', 'February fees'),
-        (2, 5000, '2024-02-20', 'UPI', 'TXN003', 'Tuition Fee - February', 'Completed', ''),
-        (3, 5000, '2024-02-15', 'Bank Transfer', 'TXN004', 'Tuition Fee - February', 'Pending', 'Under process'),
-        (4, 1000, '2024-02-25', 'Cash', 'TXN005', 'Exam Fee', 'Completed', ''),
-        (5, 5000, '2024-02-10', 'Online', 'TXN006', 'Tuition Fee - February', 'Failed', 'Retry needed'),
-    ]
-
-    try:
-        for payment in payments_data:
-            cursor.execute("""
-                INSERT INTO payments (student_id, amount, payment_date, payment_method, 
-                                     transaction_id, purpose, status, remarks)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, payment)
-        print(f"✓ Added {len(payments_data)} sample payments")
-    except sqlite3.IntegrityError as e:
-        print(f"⚠ Payments already exist: {e}")
-
-    conn.commit()
-    conn.close()
+CHUNK_SIZE = 5000
+
+CLASSES = [str(n) for n in range(1, 13)]
+SECTIONS = 'ABCD'
+# monthly tuition by class band
+MONTHLY_FEE = {**{c: 1500 for c in CLASSES[:5]}, **{c: 2000 for c in CLASSES[5:10]}, **{c: 2500 for c in CLASSES[10:]}}
+EXAM_FEE = 500
+EXAM_MONTHS = (9, 3)
+
+FIRST_NAMES_M = ['Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Krishna', 'Ishaan', 'Rohan',
+                 'Kabir', 'Ayaan', 'Dhruv', 'Rahul', 'Vikram', 'Aman', 'Karan', 'Nikhil', 'Yash', 'Harsh']
+FIRST_NAMES_F = ['Priya', 'Ananya', 'Diya', 'Saanvi', 'Aadhya', 'Kavya', 'Isha', 'Myra', 'Anika', 'Sara',
+                 'Riya', 'Neha', 'Pooja', 'Sneha', 'Meera', 'Aisha', 'Tanvi', 'Khushi', 'Nisha', 'Simran']
+SURNAMES = ['Sharma', 'Verma', 'Singh', 'Kumar', 'Patel', 'Gupta', 'Khan', 'Yadav', 'Jha', 'Mishra',
+            'Reddy', 'Das', 'Nair', 'Joshi', 'Chauhan', 'Thakur', 'Pandey', 'Sinha', 'Mehta', 'Rao']
+STREETS = ['Main Road', 'Station Road', 'Gandhi Nagar', 'Nehru Colony', 'Civil Lines', 'Ram Nagar',
+           'Shastri Path', 'Patel Chowk', 'Subhash Marg', 'Ashok Vihar']
+SUBJECTS = ['Mathematics', 'English', 'Science', 'Social Studies', 'Hindi', 'Computer Science',
+            'Physics', 'Chemistry', 'Biology', 'Physical Education', 'Art', 'Music']
+QUALIFICATIONS = ['B.Ed, M.Sc', 'B.Ed, M.A', 'B.Ed, B.Sc', 'M.Ed', 'B.Ed, M.Com', 'Ph.D']
+PAYMENT_METHODS = ['Cash'] * 4 + ['UPI'] * 4 + ['Bank Transfer', 'Cheque']
+
+
+def ensure_schema(db_path):
+    """Create tables, indexes and triggers by importing the app against db_path"""
+    os.environ['DATABASE_URL'] = os.path.abspath(db_path)
+    spec = importlib.util.spec_from_file_location("school_app", APP_FILE)
+    app_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app_module)
+    app_module._pool.close_all()
+
+
+def school_days(start, end):
+    """Every Monday-Saturday from start to end inclusive"""
+    day = start
+    while day <= end:
+        if day.weekday() != 6:
+            yield day
+        day += timedelta(days=1)
+
+
+def month_starts(start, end):
+    month = date(start.year, start.month, 1)
+    while month <= end:
+        yield month
+        month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def insert_chunks(conn, sql, rows):
+    """executemany() in CHUNK_SIZE batches; returns the number of rows written"""
+    total = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            conn.executemany(sql, chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        conn.executemany(sql, chunk)
+        total += len(chunk)
+    return total
+
+
+def next_number(conn, table, column, prefix):
+    """One past the highest generated id (prefix + digits) in table.column.
+
+    Counting rows would reuse numbers once some have been deleted.
+    """
+    highest = conn.execute(
+        f"SELECT MAX(CAST(SUBSTR({column}, ?) AS INTEGER)) FROM {table} WHERE {column} GLOB ?",
+        (len(prefix) + 1, f"{prefix}[0-9]*")).fetchone()[0]
+    return (highest or 0) + 1
+
+
+def generate(conn, students=200, years=1, seed=42, end=None):
+    """Write a synthetic dataset; returns {table: rows inserted}"""
+    rng = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=365 * years)
+    counts = {}
+
+    # continue numbering after any rows already present
+    first_roll = next_number(conn, 'students', 'roll_no', 'R')
+    txn_base = next_number(conn, 'payments', 'transaction_id', 'TXN')
+
+    # families: 1-3 children sharing a surname, address and phone
+    families = []
+    remaining = students
+    while remaining > 0:
+        size = min(remaining, rng.choices([1, 2, 3], weights=[60, 30, 10])[0])
+        surname = rng.choice(SURNAMES)
+        families.append({
+            'father': f"{rng.choice(FIRST_NAMES_M)} {surname}",
+            'mother': f"{rng.choice(FIRST_NAMES_F)} {surname}",
+            'surname': surname,
+            'phone': f"9{rng.randint(100000000, 999999999)}",
+            'address': f"{rng.randint(1, 999)} {rng.choice(STREETS)}",
+            'children': size,
+        })
+        remaining -= size
+
+    parent_ids = []
+    for family in families:
+        cur = conn.execute(
+            "INSERT INTO parents (name, email, phone, address, relation) VALUES (?, ?, ?, ?, 'Father')",
+            (family['father'], f"{family['father'].lower().replace(' ', '.')}@mail.com",
+             family['phone'], family['address']))
+        parent_ids.append(cur.lastrowid)
+    counts['parents'] = len(families)
+
+    # new students get ids above every existing one (we hold the write lock)
+    last_student_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM students").fetchone()[0]
+    student_rows = []
+    roll = first_roll
+    for family, parent_id in zip(families, parent_ids):
+        for _ in range(family['children']):
+            klass = rng.choice(CLASSES)
+            age = int(klass) + 5
+            female = rng.random() < 0.5
+            first = rng.choice(FIRST_NAMES_F if female else FIRST_NAMES_M)
+            admitted = start - timedelta(days=rng.randint(0, 365 * 3))
+            student_rows.append((
+                f"R{roll:06d}", f"{first} {family['surname']}", f"{first.lower()}{roll}@school.com",
+                family['phone'], klass, rng.choice(SECTIONS),
+                date(end.year - age, rng.randint(1, 12), rng.randint(1, 28)).isoformat(),
+                family['address'], family['father'], family['phone'],
+                f"{rng.randint(10 ** 11, 10 ** 12 - 1)}", admitted.isoformat(),
+                family['father'], family['mother'], 'Active', parent_id))
+            roll += 1
+    counts['students'] = insert_chunks(conn, """
+        INSERT INTO students (roll_no, name, email, phone, class_name, section, date_of_birth,
+                              address, parent_name, parent_phone, aadhar_number, admission_date,
+                              father_name, mother_name, status, parent_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", student_rows)
+
+    enrolled = conn.execute(
+        "SELECT id, class_name FROM students WHERE id > ? ORDER BY id", (last_student_id,)).fetchall()
+
+    teachers = max(1, students // 25)
+    first_emp = next_number(conn, 'teachers', 'emp_id', 'T')
+    counts['teachers'] = insert_chunks(conn, """
+        INSERT INTO teachers (emp_id, name, email, phone, subject, qualification, date_of_joining, address)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", (
+        (f"T{n:04d}", f"{rng.choice(['Mr.', 'Mrs.', 'Ms.'])} {rng.choice(SURNAMES)}", f"t{n}@school.com",
+         f"8{rng.randint(100000000, 999999999)}", rng.choice(SUBJECTS), rng.choice(QUALIFICATIONS),
+         (end - timedelta(days=rng.randint(180, 365 * 15))).isoformat(),
+         f"{rng.randint(1, 999)} {rng.choice(STREETS)}")
+        for n in range(first_emp, first_emp + teachers)))
+
+    # each student has their own absence rate, so some are chronic absentees
+    absence = {sid: rng.choice([0.02, 0.04, 0.06, 0.1, 0.25]) for sid, _ in enrolled}
+    days = [d.isoformat() for d in school_days(start, end)]
+
+    def attendance_rows():
+        for day in days:
+            for sid, _ in enrolled:
+                roll_die = rng.random()
+                if roll_die < absence[sid]:
+                    yield sid, day, 'Absent' if roll_die < absence[sid] * 0.7 else 'Leave'
+                else:
+                    yield sid, day, 'Present'
+
+    counts['attendance'] = insert_chunks(
+        conn, "INSERT OR IGNORE INTO attendance (student_id, attendance_date, status) VALUES (?, ?, ?)",
+        attendance_rows())
+
+    def payment_rows():
+        txn = txn_base
+        months = list(month_starts(start, end))
+        for sid, klass in enrolled:
+            late_payer = rng.random() < 0.15
+            for month in months:
+                label = month.strftime('%B %Y')
+                paid_on = month + timedelta(days=rng.randint(0, 25 if late_payer else 9))
+                if paid_on > end:
+                    continue
+                status = 'Completed'
+                if month.year == end.year and month.month == end.month and late_payer:
+                    status = 'Pending'
+                elif rng.random() < 0.01:
+                    status = 'Failed'
+                yield (sid, MONTHLY_FEE[klass], paid_on.isoformat(), rng.choice(PAYMENT_METHODS),
+                       f"TXN{txn:08d}", f"Tuition Fee - {label}", status)
+                txn += 1
+                if month.month in EXAM_MONTHS:
+                    yield (sid, EXAM_FEE, paid_on.isoformat(), rng.choice(PAYMENT_METHODS),
+                           f"TXN{txn:08d}", f"Exam Fee - {label}", 'Completed')
+                    txn += 1
+
+    counts['payments'] = insert_chunks(conn, """
+        INSERT INTO payments (student_id, amount, payment_date, payment_method, transaction_id, purpose, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?)""", payment_rows())
+    return counts
+
+
+def reset(conn):
+    for table in ('attendance', 'payments', 'students', 'parents', 'teachers'):
+        conn.execute(f"DELETE FROM {table}")
+
+
+def load_sample_data(db_path=DEFAULT_DB, students=200, years=1, seed=42, clear=False):
+    ensure_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    # a one-off bulk load doesn't need per-commit durability
+    conn.execute("PRAGMA synchronous=OFF")
+
+    print(f"Generating {students} students, {years} year(s) of attendance and fees...\n")
+    started = time.perf_counter()
+    with conn:
+        if clear:
+            reset(conn)
+        counts = generate(conn, students, years, seed)
+    conn.execute("ANALYZE")
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f"✓ Added {count:,} {table}")
+    total = sum(counts.values())
+    print(f"\n{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
 
     # Display stats
     print("\n" + "="*50)
     print("Sample Data Loaded Successfully!")
     print("="*50)
-    
-    conn = sqlite3.connect('../database/school.db')
+
     cursor = conn.cursor()
-    
     total_students = cursor.execute("SELECT COUNT(*) FROM students").fetchone()[0]
     total_teachers = cursor.execute("SELECT COUNT(*) FROM teachers").fetchone()[0]
     total_attendance = cursor.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
     total_payments = cursor.execute("SELECT COUNT(*) FROM payments").fetchone()[0]
     total_revenue = cursor.execute("SELECT COALESCE(SUM(amount), 0) FROM payments WHERE status='Completed'").fetchone()[0]
-    
+
     print(f"\nDatabase Statistics:")
     print(f"  • Total Students: {total_students}")
     print(f"  • Total Teachers: {total_teachers}")
     print(f"  • Attendance Records: {total_attendance}")
     print(f"  • Payment Records: {total_payments}")
     print(f"  • Total Revenue (Completed): ₹{total_revenue:,.2f}")
-    
+
     conn.close()
 
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite file to fill (created if missing)')
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--years', type=int, default=1, help='years of attendance and fee history')
+    parser.add_argument('--seed', type=int, default=42, help='random seed (same seed, same data)')
+    parser.add_argument('--reset', action='store_true', help='delete existing students, staff, attendance and payments first')
+    args = parser.parse_args(argv)
+    load_sample_data(args.db, args.students, args.years, args.seed, args.reset)
+
+
 if __name__ == '__main__':
-    load_sample_data()
+    main()
     print("\n✅ Ready to test the API!")
     print("Start the server with: python 01_app.py")
@@ -177,33 +177,41 @@ function mergeReceipts(serverReceipts = []) {
   return Array.from(map.values());
 }
 
+// Map a database student row to the AppState format
+function mapBackendStudent(s) {
+  return {
+    id: s.id,
+    roll: s.roll_no,               // Map roll_no to roll
+    admission_date: s.admission_date || '',
+    aadhar: s.aadhar_number || '',
+    name: s.name,
+    email: s.email || '',
+    phone: s.phone || '',
+    class: s.class_name || '',     // Map class_name to class
+    section: s.section || '',
+    dob: s.date_of_birth || '',
+    address: s.address || '',
+    father_name: s.father_name || '',
+    mother_name: s.mother_name || '',
+    status: s.status || 'Active',  // Persisted status or default
+    created_at: s.created_at,
+    updated_at: s.updated_at
+  };
+}
+
 // Fetch students from backend API and update AppState.students
 async function fetchStudentsFromBackend() {
   try {
     console.log('[API] Fetching students from:', API_URL + '/students');
+    // take the sync token first so the next delta covers anything written
+    // while the full list is downloading
+    const syncToken = await fetchSyncToken();
     const response = await fetchWithTimeout(`${API_URL}/students`, {}, 8000);
     if (!response || !response.ok) throw new Error(`Failed to fetch students: ${response?.status || 'no response'}`);
     const students = await response.json();
     
     // Map database fields to AppState format
-    const backendList = students.map(s => ({
-      id: s.id,
-      roll: s.roll_no,               // Map roll_no to roll
-      admission_date: s.admission_date || '',
-      aadhar: s.aadhar_number || '',
-      name: s.name,
-      email: s.email || '',
-      phone: s.phone || '',
-      class: s.class_name || '',     // Map class_name to class
-      section: s.section || '',
-      dob: s.date_of_birth || '',
-      address: s.address || '',
-      father_name: s.father_name || '',
-      mother_name: s.mother_name || '',
-      status: s.status || 'Active',  // Persisted status or default
-      created_at: s.created_at,
-      updated_at: s.updated_at
-    }));
+    const backendList = students.map(mapBackendStudent);
     // if there are any students already in local state that the backend
     // did not return (e.g. added while offline), keep them so they don't
     // vanish unexpectedly.
@@ -229,6 +237,7 @@ async function fetchStudentsFromBackend() {
     });
 
     AppState.students = backendList.concat(localOnly);
+    AppState.syncToken = syncToken;
     
     AppState.kpi.totalStudents = AppState.students.length;
     console.log('Loaded students from backend:', AppState.students);
@@ -239,6 +248,54 @@ async function fetchStudentsFromBackend() {
   }
 }
 
+// Current change-log position on the server, or null if unavailable
+async function fetchSyncToken() {
+  try {
+    const response = await fetchWithTimeout(`${API_URL}/sync`, {}, 5000);
+    if (!response || !response.ok) return null;
+    return (await response.json()).token;
+  } catch (e) {
+    return null;
+  }
+}
+
+// Bring the cached AppState.students up to date with only the rows that
+// changed since the last load (/api/sync). Falls back to a full fetch when
+// there is no token yet or the server no longer recognises it.
+async function syncStudentsFromBackend() {
+  if (AppState.syncToken == null || !AppState.students.length) return fetchStudentsFromBackend();
+  try {
+    let since = AppState.syncToken;
+    let more = true;
+    while (more) {
+      const response = await fetchWithTimeout(`${API_URL}/sync?since=${encodeURIComponent(since)}`, {}, 8000);
+      if (!response || !response.ok) throw new Error(`Sync failed: ${response?.status || 'no response'}`);
+      const data = await response.json();
+      if (data.reset) return fetchStudentsFromBackend();
+      const changes = data.changes.students;
+      if (changes) {
+        const index = new Map(AppState.students.map((s, i) => [s.id, i]));
+        changes.upserts.forEach(row => {
+          const student = mapBackendStudent(row);
+          if (index.has(row.id)) AppState.students[index.get(row.id)] = student;
+          else AppState.students.push(student);
+        });
+        const deleted = new Set(changes.deletes);
+        AppState.students = AppState.students.filter(s => s.id == null || !deleted.has(s.id));
+      }
+      since = data.token;
+      more = data.more;
+    }
+    AppState.syncToken = since;
+    AppState.kpi.totalStudents = AppState.students.length;
+    console.log('Synced students from backend up to', since);
+    return AppState.students;
+  } catch (e) {
+    console.warn('Delta sync failed, reloading all students:', e);
+    return fetchStudentsFromBackend();
+  }
+}
+
 // ---------- Server Connection Check ----------
 let serverStatusCheckInterval = null;
 let isServerConnected = false;
@@ -263,6 +320,17 @@ async function checkServerConnection() {
     const isConnected = response && response.ok;
     updateServerStatus(isConnected);
     console.log('Server check:', isConnected ? 'Connected ✓' : 'Disconnected ✗');
+
+    // while monitoring, switch from polling to the event stream once the
+    // server says it can hold one open (the ASGI server, see asgi.py)
+    if (isConnected && serverStatusCheckInterval && !serverEvents && typeof EventSource !== 'undefined') {
+      const health = await response.json().catch(() => ({}));
+      if (health.events) {
+        clearInterval(serverStatusCheckInterval);
+        serverStatusCheckInterval = null;
+        openServerEvents();
+      }
+    }
   } catch (e) {
     console.warn('Server connection check failed:', e.message);
     updateServerStatus(false);
@@ -315,13 +383,102 @@ function updateServerStatus(isConnected) {
   }
 }
 
+// Connection status and live updates come from the /api/events stream
+// (Server-Sent Events): the open connection itself says the server is up,
+// pings arrive every few seconds, and other tabs' writes show up as events.
+// The stream is only opened when /health advertises it; sync gunicorn
+// workers can't afford one held connection per tab, so there (and in
+// browsers without EventSource) we poll /health instead.
+let serverEvents = null;
+let serverEventsWatchdog = null;
+let lastServerEventId = '';
+let liveRefreshTimer = null;
+let liveStudentsChanged = false;
+const LIVE_EVENT_TYPES = [
+  'student.created', 'student.updated', 'student.deleted', 'student.imported',
+  'attendance.created', 'attendance.updated', 'attendance.deleted', 'attendance.marked',
+  'payment.created', 'payment.updated', 'payment.deleted', 'payment.imported'
+];
+
+// Coalesce a burst of events (e.g. a class being marked) into one refresh
+function scheduleLiveRefresh(studentsChanged) {
+  liveStudentsChanged = liveStudentsChanged || studentsChanged;
+  clearTimeout(liveRefreshTimer);
+  liveRefreshTimer = setTimeout(async () => {
+    const syncStudents = liveStudentsChanged;
+    liveStudentsChanged = false;
+    if (syncStudents) {
+      await syncStudentsFromBackend();
+      if (AppState.view === 'students') renderStudents();
+    }
+    if (AppState.view === 'dashboard') loadDashboardData();
+  }, 500);
+}
+
+function openServerEvents() {
+  let heartbeatMs = 15000;
+  // a new EventSource doesn't send Last-Event-ID, so pass it along ourselves
+  const query = lastServerEventId ? '?last_event_id=' + encodeURIComponent(lastServerEventId) : '';
+  const source = new EventSource(API_URL + '/events' + query);
+  serverEvents = source;
+
+  // a silently dropped connection (laptop sleep, proxy) never fires onerror
+  const armWatchdog = () => {
+    clearTimeout(serverEventsWatchdog);
+    serverEventsWatchdog = setTimeout(() => {
+      console.warn('No ping from /api/events, reconnecting');
+      updateServerStatus(false);
+      source.close();
+      if (serverEvents === source) openServerEvents();
+    }, heartbeatMs * 2.5);
+  };
+
+  source.onopen = () => {
+    updateServerStatus(true);
+    armWatchdog();
+  };
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED) {
+      // refused (503, or a proxy error during a deploy): the browser won't
+      // retry, so go back to polling until /health offers the stream again
+      if (serverEvents === source) {
+        serverEvents = null;
+        clearTimeout(serverEventsWatchdog);
+        startServerStatusCheck();
+      }
+      return;
+    }
+    // EventSource reconnects by itself and resumes with Last-Event-ID; only
+    // report offline if that fails, not every time a stream rolls over
+    setTimeout(() => {
+      if (source.readyState !== EventSource.OPEN) updateServerStatus(false);
+    }, 5000);
+  };
+  source.addEventListener('hello', e => {
+    lastServerEventId = e.lastEventId;
+    heartbeatMs = JSON.parse(e.data).heartbeat * 1000;
+    armWatchdog();
+  });
+  source.addEventListener('ping', armWatchdog);
+  source.addEventListener('reset', e => {
+    lastServerEventId = e.lastEventId;
+    scheduleLiveRefresh(true);
+  });
+  LIVE_EVENT_TYPES.forEach(type => source.addEventListener(type, e => {
+    lastServerEventId = e.lastEventId;
+    armWatchdog();
+    scheduleLiveRefresh(type.startsWith('student.'));
+  }));
+}
+
 function startServerStatusCheck() {
-  // Initial check
-  checkServerConnection();
-  
-  // Check every 10 seconds
+  // renderDashboard() calls this on every render; keep the open stream
+  if (serverEvents && serverEvents.readyState !== EventSource.CLOSED) return;
+  // Check every 10 seconds, starting now; checkServerConnection() moves
+  // over to the event stream if /health offers it
   if (serverStatusCheckInterval) clearInterval(serverStatusCheckInterval);
   serverStatusCheckInterval = setInterval(checkServerConnection, 10000);
+  checkServerConnection();
 }
 
 function stopServerStatusCheck() {
@@ -329,6 +486,11 @@ function stopServerStatusCheck() {
     clearInterval(serverStatusCheckInterval);
     serverStatusCheckInterval = null;
   }
+  if (serverEvents) {
+    serverEvents.close();
+    serverEvents = null;
+  }
+  clearTimeout(serverEventsWatchdog);
 }
 
 function loadState() {
@@ -357,9 +519,10 @@ function loadState() {
   }
   
   // IMPORTANT: Always fetch fresh data from database on page reload
-  // This ensures data is always up-to-date, not stale from cache
+  // This ensures data is always up-to-date, not stale from cache; with a
+  // cached copy only the rows changed since the last load are downloaded
   console.log('📡 Fetching fresh data from database on page reload...');
-  fetchStudentsFromBackend()
+  syncStudentsFromBackend()
     .then(() => {
       console.log('✅ Fresh data loaded from database');
       // After fetching backend data, save it to localStorage as backup
@@ -1005,8 +1168,10 @@ function processRazorpayPayment(student, amount, receiptData, modal) {
  */
 async function printThermalReceipt(paymentId, studentName, rollNo, amount, paymentMethod, purpose) {
   try {
+    // Only a backend payment id prints the stored payment; receipts that
+    // haven't synced yet are printed from the fields below
     const receiptData = {
-      payment_id: paymentId,
+      payment_id: Number.isInteger(paymentId) ? paymentId : null,
       student_name: studentName,
       roll_no: rollNo,
       amount: parseFloat(amount),
@@ -1016,21 +1181,21 @@ async function printThermalReceipt(paymentId, studentName, rollNo, amount, payme
       payment_date: todayYYYYMMDD()
     };
     
+    // Ask for the raw ESC/POS bytes so nothing is re-encoded on the way to the printer
     const response = await fetch(`${API_URL}/receipt/thermal`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', 'Accept': 'application/octet-stream' },
       body: JSON.stringify(receiptData)
     });
     
     if (!response.ok) throw new Error('Failed to generate receipt');
     
-    const result = await response.json();
+    const receiptBytes = new Uint8Array(await response.arrayBuffer());
     
-    // Convert string back to bytes and send to printer
-    if (result.receipt) {
+    if (receiptBytes.length) {
       // Check if Web Serial API is available (for direct USB/Serial thermal printer)
       if (navigator.serial) {
-        await sendToSerialPrinter(result.receipt);
+        await sendToSerialPrinter(receiptBytes);
       } else {
         alert('⚠️ Web Serial API not available.\n\nReceipt generated. Please use the Print option from your printer settings.');
         printHTMLReceipt(receiptData);
@@ -1047,11 +1212,15 @@ async function printThermalReceipt(paymentId, studentName, rollNo, amount, payme
  */
 async function printHTMLReceipt(receiptData) {
   try {
-    const response = await fetch('http://localhost:5000/api/receipt/html', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify(receiptData)
-    });
+    // Stored payments print from the backend record; browser-only receipts
+    // are rendered from the fields sent
+    const response = receiptData.payment_id != null
+      ? await fetch(`${API_URL}/receipt/html/${receiptData.payment_id}`)
+      : await fetch(`${API_URL}/receipt/html`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(receiptData)
+        });
     
     if (!response.ok) throw new Error('Failed to generate HTML receipt');
     
@@ -1085,9 +1254,8 @@ async function sendToSerialPrinter(receiptData) {
     
     const writer = port.writable.getWriter();
     
-    // Convert string to bytes
-    const encoder = new TextEncoder();
-    const data = encoder.encode(receiptData);
+    // Raw bytes from the server are sent as-is; strings are UTF-8 encoded
+    const data = typeof receiptData === 'string' ? new TextEncoder().encode(receiptData) : receiptData;
     
     // Send to printer
     await writer.write(data);
@@ -1115,7 +1283,7 @@ function printPaymentReceipt(paymentIndex) {
   }
   
   printThermalReceipt(
-    paymentIndex,
+    payment.synced ? payment.id : null,
     payment.name,
     payment.roll,
     payment.amount,
@@ -1707,31 +1875,30 @@ function switchView(viewId) {
 let admissionsChart, attendanceChart;
 let chartRenderInProgress = false;
 
-// Fetch dashboard statistics from database (with timeout)
-async function fetchDashboardStats() {
+// Everything the dashboard shows in one request: KPIs, per-class/status
+// counts, today's attendance and the latest payments (with timeout)
+async function fetchDashboardBootstrap() {
   try {
-    const response = await fetchWithTimeout(`${API_URL}/stats/dashboard`, {}, 8000);
-    if (!response || !response.ok) throw new Error('Failed to fetch dashboard stats');
-    const stats = await response.json();
-    return stats;
+    const today = new Date().toISOString().split('T')[0];
+    const response = await fetchWithTimeout(`${API_URL}/dashboard/bootstrap?date=${today}`, {}, 8000);
+    if (!response || !response.ok) throw new Error('Failed to fetch dashboard');
+    return await response.json();
   } catch (e) {
-    console.error('Error fetching dashboard stats:', e);
+    console.error('Error fetching dashboard:', e);
     return null;
   }
 }
 
-// Fetch attendance data for today (with timeout)
-async function fetchTodayAttendance() {
-  try {
-    const today = new Date().toISOString().split('T')[0];
-    const response = await fetchWithTimeout(`${API_URL}/attendance?date=${today}`, {}, 8000);
-    if (!response || !response.ok) throw new Error('Failed to fetch attendance');
-    const attendance = await response.json();
-    return attendance;
-  } catch (e) {
-    console.error('Error fetching attendance:', e);
-    return [];
-  }
+// Student counts by status and by class from the cached list, for when the
+// server is unreachable
+function countCachedStudents() {
+  const byStatus = {};
+  const byClass = {};
+  AppState.students.forEach(s => {
+    byStatus[s.status || ''] = (byStatus[s.status || ''] || 0) + 1;
+    byClass[s.class || ''] = (byClass[s.class || ''] || 0) + 1;
+  });
+  return { by_status: byStatus, by_class: byClass };
 }
 
 // Fetch all students
@@ -1798,12 +1965,11 @@ function renderDashboard(){
   if (btnPrint) btnPrint.onclick = ()=> window.print();
 }
 
-function renderStudentStatusOverview(students = []) {
+// statusCounts: {status: number of students}
+function renderStudentStatusOverview(statusCounts = {}) {
   const container = qs('#studentStatusContainer');
   if (!container) return;
 
-  // Count students by status
-  const statusCounts = {};
   const statusIcons = {
     'Active': '✓',
     'Alumni': '🎓',
@@ -1820,13 +1986,9 @@ function renderStudentStatusOverview(students = []) {
     'Left': '#6b7280'
   };
 
-  students.forEach(s => {
-    const status = s.status || 'Unknown';
-    statusCounts[status] = (statusCounts[status] || 0) + 1;
-  });
-
   // Generate HTML for status cards
   const statusHTML = Object.entries(statusCounts)
+    .map(([status, count]) => [status || 'Unknown', count])
     .sort((a, b) => b[1] - a[1]) // Sort by count descending
     .map(([status, count]) => `
       <div style="
@@ -1868,48 +2030,32 @@ function renderStudentStatusOverview(students = []) {
 
 
 async function loadDashboardData() {
-  // Fetch all data in parallel, but don't let one slow request block everything
-  const [statsRes, attendanceRes, studentsRes, paymentsRes] = await Promise.allSettled([
-    fetchDashboardStats(),
-    fetchTodayAttendance(),
-    fetchAllStudents(),
-    fetchAllPayments()
-  ]);
+  const boot = await fetchDashboardBootstrap();
+  const stats = boot ? boot.kpis : null;
+  const studentCounts = boot ? boot.students : countCachedStudents();
+  const attendance = boot ? boot.attendance : { counts: {}, by_class: {} };
 
-  const stats = statsRes.status === 'fulfilled' ? statsRes.value : null;
-  const todayAttendance = attendanceRes.status === 'fulfilled' ? attendanceRes.value : [];
-  const allStudents = studentsRes.status === 'fulfilled' ? studentsRes.value : [];
-  const allPayments = paymentsRes.status === 'fulfilled' ? paymentsRes.value : [];
-
-  if (statsRes.status === 'rejected') console.warn('Dashboard stats failed:', statsRes.reason);
-  if (attendanceRes.status === 'rejected') console.warn('Attendance fetch failed:', attendanceRes.reason);
-  if (studentsRes.status === 'rejected') console.warn('Students fetch failed:', studentsRes.reason);
-  if (paymentsRes.status === 'rejected') console.warn('Payments fetch failed:', paymentsRes.reason);
-
-  // Map backend payments into AppState.receipts so fee KPIs use real data
-  try {
-    const studentById = {};
-    allStudents.forEach(s => { studentById[s.id] = s; });
-    const serverReceipts = (allPayments || []).map(p => {
-      const student = studentById[p.student_id] || {};
-      return {
+  // Map the latest backend payments into AppState.receipts so fee KPIs use real data
+  if (boot) {
+    try {
+      const serverReceipts = boot.recent_payments.map(p => ({
         id: p.id,
         no: p.id,
         date: p.payment_date,
-        roll: student.roll_no || student.roll || '',
-        name: student.name || '',
-        method: p.payment_method || p.method || '',
+        roll: p.roll_no || '',
+        name: p.name || '',
+        method: p.payment_method || '',
         amount: Number(p.amount || 0),
-        ref: p.transaction_id || p.ref || '',
+        ref: p.transaction_id || '',
         status: p.status || ''
-      };
-    });
+      }));
 
-    // merge server receipts with any local unsynced entries
-    AppState.receipts = mergeReceipts(serverReceipts);
-    saveState();
-  } catch (e) {
-    console.warn('Failed to map payments to receipts:', e);
+      // merge server receipts with any local unsynced entries
+      AppState.receipts = mergeReceipts(serverReceipts);
+      saveState();
+    } catch (e) {
+      console.warn('Failed to map payments to receipts:', e);
+    }
   }
 
   // Update KPI cards with real data
@@ -1936,16 +2082,15 @@ async function loadDashboardData() {
   }
 
   // Calculate attendance percentage
-  if (todayAttendance && todayAttendance.length > 0 && allStudents.length > 0) {
-    const presentCount = todayAttendance.filter(a => a.status === 'Present').length;
-    const attendancePercent = (presentCount / allStudents.length) * 100;
+  if (stats && attendance.marked > 0 && stats.total_students > 0) {
+    const attendancePercent = ((attendance.counts.Present || 0) / stats.total_students) * 100;
     if (kpiAttendance) kpiAttendance.textContent = attendancePercent.toFixed(1) + '%';
   } else if (kpiAttendance) {
     kpiAttendance.textContent = '0%';
   }
 
   // Render student status overview
-  renderStudentStatusOverview(allStudents);
+  renderStudentStatusOverview(studentCounts.by_status);
 
   // Update fees view KPIs if visible
   if (AppState.view === 'fees' || qs('#view-fees') && !qs('#view-fees').classList.contains('hidden')) {
@@ -1955,13 +2100,14 @@ async function loadDashboardData() {
   // Render charts with real data
   requestAnimationFrame(() => {
     chartRenderInProgress = true;
-    initAdmissionsChart(allStudents);
-    initAttendanceChart(allStudents, todayAttendance);
+    initAdmissionsChart(studentCounts.by_class);
+    initAttendanceChart(studentCounts.by_class, attendance.by_class);
     chartRenderInProgress = false;
   });
 }
 
-function initAdmissionsChart(students = []){
+// studentsByClass: {class_name: number of students}
+function initAdmissionsChart(studentsByClass = {}){
   const ctx = qs('#chartAdmissions');
   if (!ctx) return;
   
@@ -1971,21 +2117,15 @@ function initAdmissionsChart(students = []){
       admissionsChart = null;
     }
 
-    // Group students by class to show distribution
-    const classDistribution = {};
-    students.forEach(s => {
-      const cls = s.class_name || 'Unknown';
-      classDistribution[cls] = (classDistribution[cls] || 0) + 1;
-    });
-
-    const classes = Object.keys(classDistribution).sort();
-    const data = classes.map(cls => classDistribution[cls]);
+    // Distribution of students by class
+    const classes = Object.keys(studentsByClass).sort();
+    const data = classes.map(cls => studentsByClass[cls]);
     const animate = !!(AppState.settings?.chartAnimation);
 
     admissionsChart = new Chart(ctx, {
       type: 'line',
       data: {
-        labels: classes,
+        labels: classes.map(cls => cls || 'Unknown'),
         datasets: [{
           label: 'Students per Class',
           data,
@@ -2010,7 +2150,7 @@ function initAdmissionsChart(students = []){
     if (rangeSel) {
       rangeSel.onchange = (e) => {
         // For now, just redraw the same chart
-        initAdmissionsChart(students);
+        initAdmissionsChart(studentsByClass);
       };
     }
   } catch (e) {
@@ -2018,7 +2158,8 @@ function initAdmissionsChart(students = []){
   }
 }
 
-function initAttendanceChart(students = [], attendanceData = []){
+// attendanceByClass: {class_name: {Present, Absent, Leave}} for today
+function initAttendanceChart(studentsByClass = {}, attendanceByClass = {}){
   const ctx = qs('#chartAttendance');
   if (!ctx) return;
 
@@ -2028,31 +2169,11 @@ function initAttendanceChart(students = [], attendanceData = []){
       attendanceChart = null;
     }
 
-    // Group attendance by class
-    const classAttendance = {};
-    students.forEach(s => {
-      const cls = s.class_name || 'Unknown';
-      if (!classAttendance[cls]) {
-        classAttendance[cls] = { present: 0, total: 0 };
-      }
-      classAttendance[cls].total++;
-    });
-
-    // Count present students by class
-    attendanceData.forEach(a => {
-      const student = students.find(s => s.id === a.student_id);
-      if (student) {
-        const cls = student.class_name || 'Unknown';
-        if (classAttendance[cls] && a.status === 'Present') {
-          classAttendance[cls].present++;
-        }
-      }
-    });
-
-    const classes = Object.keys(classAttendance).sort();
-    const data = classes.map(cls => 
-      classAttendance[cls].total > 0 
-        ? Math.round((classAttendance[cls].present / classAttendance[cls].total) * 100)
+    // Share of each class marked present today
+    const classes = Object.keys(studentsByClass).sort();
+    const data = classes.map(cls =>
+      studentsByClass[cls] > 0
+        ? Math.round((((attendanceByClass[cls] || {}).Present || 0) / studentsByClass[cls]) * 100)
         : 0
     );
     
@@ -2061,7 +2182,7 @@ function initAttendanceChart(students = [], attendanceData = []){
     attendanceChart = new Chart(ctx, {
       type: 'bar',
       data: {
-        labels: classes,
+        labels: classes.map(cls => cls || 'Unknown'),
         datasets: [{
           label: 'Attendance %',
           data,
@@ -2647,6 +2768,34 @@ function initImportCSVModal(){
     const file=fileInput.files?.[0];
     if(!file){ alert('Please select a CSV file.'); return; }
     const text=await file.text();
+
+    // When the backend is reachable, send the whole file in one request:
+    // the server validates each row and upserts on roll_no in a single
+    // transaction, then we reload the list once.
+    if (isServerConnected) {
+      try {
+        const resp = await fetch(`${API_URL}/students/bulk`, {
+          method: 'POST',
+          headers: {'Content-Type':'text/csv'},
+          body: text
+        });
+        const report = await resp.json();
+        if(!resp.ok) throw new Error(report.error || resp.statusText);
+        await fetchStudentsFromBackend();
+        saveState(); form.parentElement.close();
+        if(AppState.view==='students') renderStudents();
+        let msg = `Imported ${report.inserted} new and updated ${report.updated} existing students.`;
+        if (report.failed) {
+          msg += `\n${report.failed} row(s) skipped:\n` +
+            report.errors.slice(0, 10).map(e => `  row ${e.row}${e.roll_no ? ' ('+e.roll_no+')' : ''}: ${e.error}`).join('\n');
+        }
+        alert(msg);
+      } catch(err) {
+        alert('Unable to import students: '+err.message);
+      }
+      return;
+    }
+
     const rows=text.trim().split(/\r?\n/).map(line=>
       line.split(',').map(cell=> cell.replace(/^"|"$/g,'').replace(/""/g,'"'))
     );
@@ -2720,20 +2869,47 @@ function initRecordPaymentModal(){
   if (rpLateFee) rpLateFee.oninput = () => updateTotals();
   if (rpPayNow) rpPayNow.oninput = () => { validatePayNow(); updateTotals(); };
 
-  // Search dropdown (safe: handle missing fields) and keyboard shortcuts
-  search.oninput = () => {
-    const q = (search.value || '').trim().toLowerCase();
-    if (!q) { list.style.display = 'none'; return; }
-    const matches = AppState.students.filter(s =>
+  // Search dropdown (safe: handle missing fields) and keyboard shortcuts.
+  // Matches come from the server's ranked prefix search (/api/search); the
+  // locally loaded students are only used when the backend is unreachable.
+  let searchTimer = null;
+  let searchSeq = 0;
+
+  function localStudentMatches(q) {
+    q = q.toLowerCase();
+    return AppState.students.filter(s =>
       ((s.roll || '') + '').toLowerCase().includes(q) ||
       ((s.name || '') + '').toLowerCase().includes(q) ||
       ((s.phone || '') + '').toLowerCase().includes(q)
-    ).slice(0, 8);
-    list.innerHTML = matches.map(s => ` <button type="button" class="dropdown__item" data-roll="${s.roll}">${s.roll || ''} · ${s.name || ''} · ${s.class || ''}-${s.section || ''}</button>`).join('');
-    list.style.display = matches.length ? 'block' : 'none';
-    qsa('#rpStudentList .dropdown__item').forEach(btn => {
-      btn.onclick = () => { rpRoll.value = btn.getAttribute('data-roll'); fillStudentInfo(); list.style.display = 'none'; };
-    });
+    ).slice(0, 8).map(s => ({ roll: s.roll, name: s.name, detail: `${s.class || ''}-${s.section || ''}` }));
+  }
+
+  async function searchStudents(q) {
+    try {
+      const response = await fetchWithTimeout(`${API_URL}/search?kind=student&limit=8&q=${encodeURIComponent(q)}`, {}, 3000);
+      if (!response || !response.ok) throw new Error(`Search failed: ${response?.status || 'no response'}`);
+      const { results } = await response.json();
+      return results.map(r => ({ roll: r.code, name: r.name, detail: r.detail || '' }));
+    } catch (e) {
+      console.warn('[API] search unavailable, filtering locally:', e);
+      return localStudentMatches(q);
+    }
+  }
+
+  search.oninput = () => {
+    const q = (search.value || '').trim();
+    clearTimeout(searchTimer);
+    if (!q) { searchSeq++; list.style.display = 'none'; return; }
+    searchTimer = setTimeout(async () => {
+      const seq = ++searchSeq;
+      const matches = await searchStudents(q);
+      if (seq !== searchSeq) return; // a later keystroke already answered
+      list.innerHTML = matches.map(s => ` <button type="button" class="dropdown__item" data-roll="${s.roll}">${s.roll || ''} · ${s.name || ''} · ${s.detail}</button>`).join('');
+      list.style.display = matches.length ? 'block' : 'none';
+      qsa('#rpStudentList .dropdown__item').forEach(btn => {
+        btn.onclick = () => { rpRoll.value = btn.getAttribute('data-roll'); fillStudentInfo(); list.style.display = 'none'; };
+      });
+    }, 120);
   };
 
   // Open list with ArrowDown and select with Enter (when focused on search)
@@ -3263,7 +3439,7 @@ function printReceipt(no){
   if (choice) {
     // Thermal printer
     printThermalReceipt(
-      r.no,
+      r.synced ? r.id : null,
       r.name,
       r.roll,
       r.amount,